@@ -1,10 +1,22 @@
-from pygame import mixer
-from threading import Thread
+from threading import Thread, Lock
 from gd_constants import GDConstants
 from logger import Logger
 import time
 
-mixer.init()
+mixer = None
+""" pygame's mixer module, once `init_mixer` has been called. Importing pygame takes a good chunk of startup,
+so it's done in the background while the main menu is up (see `Startup`) """
+
+_mixer_lock = Lock()
+
+def init_mixer() -> None:
+    """ Imports and initializes pygame's mixer, if that hasn't been done yet. Safe to call from any thread. """
+    global mixer
+    with _mixer_lock:
+        if mixer is None:
+            from pygame import mixer as pygame_mixer
+            pygame_mixer.init()
+            mixer = pygame_mixer
 
 class AudioHandler:
     """ Does music/sfx related stuff in the game loop. Objects of this class contain a dedicated music thread,
@@ -27,6 +39,7 @@ class AudioHandler:
         self.thread: Thread = None
         """ The thread object the music is playing on. Is None until begin_playing_song is called at least once. """
         
+        init_mixer()
         mixer.music.set_volume(GDConstants.AUDIO_VOLUME)
 
     def begin_playing_song(self) -> None:
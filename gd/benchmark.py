@@ -0,0 +1,367 @@
+"""
+Headless, deterministic benchmark for the renderer and the physics engine.
+
+Loads levels, runs `Game`'s physics with a fixed timestep while replaying a scripted input tape, and renders
+through `Camera.render` into an in-memory sink (nothing gets printed) at whatever terminal sizes are given.
+Every (level, terminal size, render backend) combination runs the exact same workload, so the backends in
+`CameraFrame.RENDER_BACKENDS` can be compared directly.
+
+Run from the `gd` folder, e.g.:
+```
+python benchmark.py
+python benchmark.py --backends damage vectorized --sizes 120x35 240x70 --frames 1200
+python benchmark.py --levels levels/created/ship_test.json --tape my_inputs.json --json results.json
+```
+
+A tape is a json list of `[tick, "keydown" | "keyup"]` pairs (tick = physics tick index from the start of the run).
+If none is given, the jump key gets tapped at a fixed interval (see `get_default_tape`).
+"""
+
+import os
+os.environ.setdefault("PYNPUT_BACKEND", "dummy") # no display needed, we never listen to the real keyboard
+
+from typing import Dict, List, Literal, Tuple
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+
+from blessed import Terminal
+from gd_constants import GDConstants
+
+class BenchmarkTerminal(Terminal):
+    """ Terminal with a fixed size, regardless of what (if anything) stdout is attached to.
+    Styling is forced on so `move_xy` etc. still produce escape codes when there's no tty. """
+
+    def __init__(self, width: int, height: int) -> None:
+        super().__init__(force_styling=True)
+        self.size = (width, height)
+
+    @property
+    def width(self) -> int:
+        return self.size[0]
+
+    @property
+    def height(self) -> int:
+        return self.size[1]
+
+# needs to be set before importing anything from render/, since some constants are computed from the terminal size on import
+GDConstants.term = BenchmarkTerminal(120, 35)
+
+from profiler import Profiler
+from level import Level
+from render.camera import Camera
+from render.camera_frame import CameraFrame
+from render.constants import CameraConstants
+from engine.constants import EngineConstants
+from engine.player import Player
+from engine.collision_handler import CollisionHandler
+from keyboard.keyboard_listener import KeyboardListener
+from game import Game
+
+DEFAULT_LEVELS = ["levels/official/_stereo_madness.json", "levels/created/Acheron.json"]
+DEFAULT_SIZES = [(120, 35), (240, 70)]
+
+JUMP_KEY = GDConstants.JUMP_KEYS[0]
+""" Key that the tape presses. The ship/wave tick functions check whether this is held """
+
+InputTape = List[Tuple[int, Literal["keydown", "keyup"]]]
+""" (physics tick index, event) pairs, sorted by tick """
+
+class ByteCounter:
+    """ Binary stream that just counts what gets written to it """
+
+    def __init__(self) -> None:
+        self.bytes_written = 0
+
+    def write(self, data: bytes) -> int:
+        self.bytes_written += len(data)
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+class OutputSink:
+    """ Stands in for `sys.stdout` during a benchmark run. Text writes (`print3` etc.) get encoded
+    and counted along with the byte writes (`print3_bytes`), so `bytes_written` is what a real terminal would have received. """
+
+    def __init__(self) -> None:
+        self.buffer = ByteCounter()
+
+    @property
+    def bytes_written(self) -> int:
+        return self.buffer.bytes_written
+
+    def write(self, text: str) -> int:
+        self.buffer.write(text.encode())
+        return len(text)
+
+    def flush(self) -> None:
+        pass
+
+class HeadlessGame(Game):
+    """
+    `Game` without threads, audio, sleeps or a keyboard listener. Physics runs through the same `Game` methods
+    (`advance_physics`, `press_jump`, etc.), just driven by `BenchmarkRun` with a fixed timestep instead of the wall clock.
+    Crashing/finishing the level restarts it immediately.
+    """
+
+    def __init__(self, level_path: str) -> None:
+        # not calling Game.__init__, since that sets up audio, practice mode etc.
+        self.level = Level.parse_from_file(level_path)
+        self.camera = Camera(self.level)
+        self.collision_handler = CollisionHandler(self)
+        self.player = Player(self, self.level.metadata["start_settings"])
+
+        self.running = True
+        self.exiting = False
+        self.is_crashed = False
+        self.practice_mode = False
+        self.attempt_number = 1
+        self.activated_objects = []
+        self.physics_accumulator = 0
+        self.highest_percent_this_session = 0
+
+        self.crashes = 0
+        self.completions = 0
+
+    def get_player_render_pos(self) -> List[float]:
+        """ Frames are always rendered right after a tick, so there's nothing to interpolate """
+        return self.player.pos
+
+    def crash(self) -> None:
+        self.crashes += 1
+        self.reset_level()
+
+    def complete_level(self) -> None:
+        self.completions += 1
+        self.reset_level()
+
+    def reset_level(self) -> None:
+        """ `Game.reset_level` minus the audio and timing stuff """
+
+        self.is_crashed = False
+        self.player.reset_physics()
+        for obj in self.activated_objects:
+            obj.has_been_activated = False
+        self.activated_objects.clear()
+        self.player.clear_wave_pivots()
+
+        self.camera.camera_bottom = -CameraConstants.GROUND_HEIGHT
+        self.camera.player_y_info = {
+            "physics_pos": self.player.ORIGINAL_START_POS[1],
+            "screen_pos": self.camera.px_height - CameraConstants.GROUND_HEIGHT*CameraConstants.BLOCK_HEIGHT - CameraConstants.BLOCK_HEIGHT
+        }
+
+        self.level.reset_colors()
+        self.level.reset_color_trigger_cache()
+        self.attempt_number += 1
+        self.physics_accumulator = 0
+
+    def press(self) -> None:
+        KeyboardListener.keys[JUMP_KEY] = True
+        self.press_jump()
+
+    def release(self) -> None:
+        KeyboardListener.keys[JUMP_KEY] = False
+        self.release_jump()
+
+def get_default_tape(num_ticks: int, tick_rate: int, interval: float = 0.6, hold: float = 0.15) -> InputTape:
+    """ Taps the jump key every `interval` seconds, holding it for `hold` seconds (so ship/wave sections get some input too) """
+
+    tape = []
+    interval_ticks = max(2, round(interval * tick_rate))
+    hold_ticks = max(1, min(interval_ticks-1, round(hold * tick_rate)))
+    for tick in range(interval_ticks, num_ticks, interval_ticks):
+        tape.append((tick, "keydown"))
+        tape.append((tick + hold_ticks, "keyup"))
+    return tape
+
+def load_tape(filepath: str) -> InputTape:
+    with open(filepath, encoding='utf-8') as f:
+        return sorted((int(tick), event) for tick, event in json.load(f))
+
+def set_terminal_size(width: int, height: int) -> None:
+    """ Resizes the fake terminal and recomputes the constants that depend on the terminal size """
+    GDConstants.term.size = (width, height)
+    CameraConstants.CAMERA_LEFT_OFFSET = int(width * 0.3 / CameraConstants.BLOCK_WIDTH)
+
+class BenchmarkRun:
+    """ Runs one (level, terminal size, backend) combination and collects its results """
+
+    def __init__(
+        self,
+        level_path: str,
+        size: Tuple[int, int],
+        backend: str,
+        tape: InputTape,
+        frames: int,
+        ticks_per_frame: int,
+        tick_rate: int,
+        warmup_frames: int,
+        alloc_frames: int
+        ) -> None:
+        self.level_path = level_path
+        self.size = size
+        self.backend = backend
+        self.tape = tape
+        self.frames = frames
+        self.ticks_per_frame = ticks_per_frame
+        self.dt = 1 / tick_rate
+        self.warmup_frames = warmup_frames
+        self.alloc_frames = alloc_frames
+
+        self.tape_index = 0
+        self.tick = 0
+
+    def advance(self, game: HeadlessGame) -> None:
+        """ Runs the physics for one frame, feeding in the tape events that fall in it """
+
+        for _ in range(self.ticks_per_frame):
+            while self.tape_index < len(self.tape) and self.tape[self.tape_index][0] <= self.tick:
+                if self.tape[self.tape_index][1] == "keydown":
+                    game.press()
+                else:
+                    game.release()
+                self.tape_index += 1
+
+            game.advance_physics(self.dt, self.dt)
+            if game.exiting:
+                raise RuntimeError(f"physics tick {self.tick} failed (see the log)")
+            self.tick += 1
+
+    def run(self) -> Dict:
+        set_terminal_size(*self.size)
+        CameraConstants.RENDER_BACKEND = self.backend
+        KeyboardListener.keys = {}
+
+        game = HeadlessGame(self.level_path)
+        Profiler.set_label(f"benchmark/{game.level.metadata['name']}/{self.size[0]}x{self.size[1]}/{self.backend}")
+
+        sink = OutputSink()
+        real_stdout = sys.stdout
+        sys.stdout = sink
+        try:
+            game.camera.render_init()
+            for _ in range(self.warmup_frames):
+                self.advance(game)
+                game.camera.render(game)
+
+            # timed pass
+            physics_ns = 0
+            render_ns = 0
+            bytes_before = sink.bytes_written
+            for _ in range(self.frames):
+                start_time = time.perf_counter_ns()
+                self.advance(game)
+                physics_ns += time.perf_counter_ns() - start_time
+
+                start_time = time.perf_counter_ns()
+                game.camera.render(game)
+                render_ns += time.perf_counter_ns() - start_time
+            bytes_emitted = sink.bytes_written - bytes_before
+
+            # allocation pass (separate, since tracemalloc slows everything down a lot)
+            allocated_blocks = 0
+            peak_bytes = 0
+            if self.alloc_frames > 0:
+                tracemalloc.start()
+                for _ in range(self.alloc_frames):
+                    before = tracemalloc.take_snapshot()
+                    tracemalloc.reset_peak()
+                    memory_before = tracemalloc.get_traced_memory()[0]
+
+                    self.advance(game)
+                    game.camera.render(game)
+
+                    peak_bytes += tracemalloc.get_traced_memory()[1] - memory_before
+                    after = tracemalloc.take_snapshot()
+                    allocated_blocks += sum(max(0, stat.count_diff) for stat in after.compare_to(before, "lineno"))
+                tracemalloc.stop()
+        finally:
+            sys.stdout = real_stdout
+
+        render_summary = Profiler.stages.get(Profiler.label, {}).get("render/total")
+        return {
+            "level": game.level.metadata["name"],
+            "level_path": self.level_path,
+            "size": f"{self.size[0]}x{self.size[1]}",
+            "backend": self.backend,
+            "frames": self.frames,
+            "physics_ticks": self.frames * self.ticks_per_frame,
+            "fps": self.frames / (render_ns / 1e9) if render_ns else 0,
+            "render_p95_ms": render_summary.summary()["p95_ms"] if render_summary is not None else 0,
+            "bytes_per_frame": bytes_emitted / self.frames if self.frames else 0,
+            "physics_ticks_per_sec": self.frames * self.ticks_per_frame / (physics_ns / 1e9) if physics_ns else 0,
+            "alloc_blocks_per_frame": allocated_blocks / self.alloc_frames if self.alloc_frames else None,
+            "alloc_peak_kb_per_frame": peak_bytes / 1024 / self.alloc_frames if self.alloc_frames else None,
+            "crashes": game.crashes,
+            "completions": game.completions,
+        }
+
+def print_results(results: List[Dict]) -> None:
+    columns = [
+        ("level", "level", "{}"),
+        ("size", "size", "{}"),
+        ("backend", "backend", "{}"),
+        ("fps", "fps", "{:.1f}"),
+        ("render_p95_ms", "p95 ms", "{:.2f}"),
+        ("bytes_per_frame", "bytes/frame", "{:.0f}"),
+        ("physics_ticks_per_sec", "ticks/s", "{:.0f}"),
+        ("alloc_blocks_per_frame", "allocs/frame", "{:.1f}"),
+        ("alloc_peak_kb_per_frame", "peak KB/frame", "{:.1f}"),
+        ("crashes", "crashes", "{}"),
+    ]
+
+    rows = [[header for _, header, _ in columns]]
+    for result in results:
+        rows.append([fmt.format(result[key]) if result[key] is not None else "-" for key, _, fmt in columns])
+
+    widths = [max(len(row[i]) for row in rows) for i in range(len(columns))]
+    for row in rows:
+        print("  ".join(cell.ljust(width) for cell, width in zip(row, widths)))
+
+def parse_size(size: str) -> Tuple[int, int]:
+    width, height = size.lower().split("x")
+    return int(width), int(height)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Headless benchmark of the renderer backends and physics engine.")
+    parser.add_argument("--levels", nargs="+", default=DEFAULT_LEVELS, help="level json files to play")
+    parser.add_argument("--sizes", nargs="+", type=parse_size, default=DEFAULT_SIZES, help="terminal sizes (in cells), e.g. 120x35")
+    parser.add_argument("--backends", nargs="+", default=list(CameraFrame.RENDER_BACKENDS), choices=list(CameraFrame.RENDER_BACKENDS))
+    parser.add_argument("--frames", type=int, default=600, help="number of timed frames per run")
+    parser.add_argument("--warmup", type=int, default=30, help="frames rendered before timing starts")
+    parser.add_argument("--alloc-frames", type=int, default=30, help="frames rendered under tracemalloc after the timed ones (0 to skip)")
+    parser.add_argument("--tick-rate", type=int, default=EngineConstants.PHYSICS_TICK_RATE, help="physics ticks per simulated second (the fixed timestep is 1/tick-rate)")
+    parser.add_argument("--fps", type=int, default=60, help="simulated frames per second (physics runs tick-rate/fps ticks between frames)")
+    parser.add_argument("--discrete", action="store_true", help="turn off swept collisions (see EngineConstants.SWEPT_COLLISIONS)")
+    parser.add_argument("--tape", help="json input tape, see the module docstring. Defaults to tapping jump at a fixed interval")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    EngineConstants.SWEPT_COLLISIONS = not args.discrete
+
+    ticks_per_frame = max(1, round(args.tick_rate / args.fps))
+    total_ticks = (args.warmup + args.frames + args.alloc_frames) * ticks_per_frame
+    tape = load_tape(args.tape) if args.tape else get_default_tape(total_ticks, args.tick_rate)
+
+    results = []
+    for level_path in args.levels:
+        for size in args.sizes:
+            for backend in args.backends:
+                results.append(BenchmarkRun(
+                    level_path, size, backend, tape, args.frames, ticks_per_frame, args.tick_rate, args.warmup, args.alloc_frames
+                ).run())
+                print(f"\x1b[0m[{len(results)}] {results[-1]['level']} {results[-1]['size']} {backend}: {results[-1]['fps']:.1f} fps")
+
+    print_results(results)
+
+    if args.json:
+        with open(args.json, "w", encoding='utf-8') as f:
+            json.dump({"timestamp": time.time(), "tick_rate": args.tick_rate, "swept_collisions": EngineConstants.SWEPT_COLLISIONS, "ticks_per_frame": ticks_per_frame, "results": results}, f, indent=4)
+        print(f"Wrote {len(results)} results to {args.json}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+from typing import Dict, List, NamedTuple, Tuple, TYPE_CHECKING
+
+from render.constants import CameraConstants
+
+if TYPE_CHECKING:
+    from level import Level
+
+class ColorTrigger(NamedTuple):
+    x: int
+    y: int
+    channel: str | int
+    color: CameraConstants.RGBTuple
+    fade: float
+    """ Seconds the channel takes to fade from its current color to `color`. 0 = instant """
+
+class ColorFade(NamedTuple):
+    start_color: CameraConstants.RGBTuple
+    end_color: CameraConstants.RGBTuple
+    start_time: float
+    duration: float
+
+class ColorTimeline:
+    """
+    The color triggers of a level, sorted by x, with a cursor at the next one the player hasn't passed yet.
+    So checking triggers every physics tick is just comparing the player x against the trigger at the cursor.
+
+    Triggers can have a fade duration (optional 5th value in `Level.color_trigger_locs`, in seconds), in which case
+    the channel gets blended towards the new color over that many seconds of physics time instead of switching instantly.
+    A new trigger for a channel that's still fading takes over from whatever color the channel is at.
+    """
+
+    def __init__(self, level: "Level") -> None:
+        self.level = level
+        self.triggers: List[ColorTrigger] = []
+        self.cursor = 0
+        """ Index of the next trigger in `triggers` that hasn't been activated """
+        self.fades: Dict[str | int, ColorFade] = {}
+        """ channel id -> the fade it's currently in the middle of """
+        self.rebuild()
+
+    def rebuild(self) -> None:
+        """ Re-reads the triggers from `level.color_trigger_locs` (e.g. after editing) and moves the cursor back to the start """
+
+        triggers = [
+            ColorTrigger(x, y, value[0], tuple(value[1:4]), float(value[4]) if len(value) > 4 else 0)
+            for (x, y), value in self.level.color_trigger_locs.items()
+        ]
+        # triggers at the same x run in reverse order of color_trigger_locs, same as they always have (so the first one wins)
+        self.triggers = sorted(reversed(triggers), key=lambda trigger: trigger.x)
+        self.reset()
+
+    def reset(self) -> None:
+        """ Back to the start of the level (doesn't touch the colors themselves, see `Level.reset_colors`) """
+        self.cursor = 0
+        self.fades.clear()
+
+    def is_fading(self, channel: str | int) -> bool:
+        return channel in self.fades
+
+    def advance(self, player_x: float, time: float) -> None:
+        """ Activates every trigger the player has passed since the last call, and steps the fades that are in progress.
+        `time` is in seconds, on the same clock every call (e.g. `Player.physics_time`). """
+
+        while self.cursor < len(self.triggers) and player_x >= self.triggers[self.cursor].x:
+            trigger = self.triggers[self.cursor]
+            self.cursor += 1
+
+            if trigger.fade > 0:
+                self.fades[trigger.channel] = ColorFade(self.level.get_color_channel(trigger.channel), trigger.color, time, trigger.fade)
+            else:
+                self.fades.pop(trigger.channel, None)
+                self.level.set_color_channel(trigger.channel, trigger.color)
+
+        if len(self.fades) == 0:
+            return
+
+        for channel, fade in list(self.fades.items()):
+            progress = (time - fade.start_time) / fade.duration
+            if progress >= 1:
+                del self.fades[channel] # before setting the color, so listeners see the final color as settled
+                self.level.set_color_channel(channel, fade.end_color)
+                continue
+
+            color = _mix(fade.start_color, fade.end_color, progress)
+            if color != self.level.get_color_channel(channel): # only notify when the color actually changes
+                self.level.set_color_channel(channel, color)
+
+def _mix(start: CameraConstants.RGBTuple, end: CameraConstants.RGBTuple, progress: float) -> Tuple[int, int, int]:
+    return tuple(round(a + (b - a) * progress) for a, b in zip(start, end))
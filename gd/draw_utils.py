@@ -225,6 +225,18 @@ def print3(text: str) -> None:
     """ Slightly faster (?) print3, which uses sys.stdout.write instead of print. Still adds the reset code at the end. """
     sys.stdout.write(text + '\r\x1b[0m')
 
+def print3_bytes(data: bytes) -> None:
+    """ Same as print3, but for already-encoded output (skips the str -> utf-8 encode step).
+    Writes straight to the underlying binary buffer of stdout. """
+    buffer = getattr(sys.stdout, 'buffer', None)
+    if buffer is None: # stdout was swapped for something text-only
+        sys.stdout.write(data.decode() + '\r\x1b[0m')
+        return
+    
+    sys.stdout.flush() # anything already written with print3 has to go out first
+    buffer.write(data + b'\r\x1b[0m')
+    buffer.flush()
+
 def convert_to_chars(container_dim: int, dimvalue: int | str | None) -> int | None:
     """
     Returns the actual value of the dimension (in characters) based on the container size,
@@ -0,0 +1,114 @@
+from time import monotonic
+from typing import Callable, Set, Tuple
+import threading
+import numpy as np
+
+from logger import Logger
+from level import Level, LevelSnapshot
+from level_grid import LevelGrid
+from level_index import LevelIndex
+
+class Autosave:
+    """
+    Writes a level to its file on a worker thread, so saving never holds up the editor.
+
+    The level itself only ever gets touched on the editor's thread: `save` takes a snapshot there, which is cheap since
+    only the chunks of columns that were edited since the last snapshot get copied (see `Level.snapshot`), and the worker
+    just writes snapshots. Level files are written to a temp file and then `os.replace`d (see `Level.write_to_file`).
+
+    Besides explicit saves, the editor calls `poll` all the time, which autosaves once edits have settled down
+    (`DELAY` seconds without any), or every `MAX_DELAY` seconds during a long burst of edits. Saves that come in while
+    the worker is still busy get coalesced - only the newest snapshot gets written.
+    """
+
+    DELAY = 2.0
+    """ Seconds without any edits before autosaving """
+    MAX_DELAY = 30.0
+    """ Max seconds between the first unsaved edit and an autosave, even if the edits never stop """
+
+    def __init__(self, level: Level, filepath: str, on_saved: Callable[[int], None] | None = None) -> None:
+        self.level = level
+        self.filepath = filepath
+        self.on_saved = on_saved
+        """ Called (on the worker thread) with the tag passed to `save` once that save has been written """
+
+        self.dirty = False
+        """ Whether the level was edited since the last snapshot """
+        self.dirty_chunks: Set[int] = set()
+        """ Indices of the `LevelGrid.SNAPSHOT_CHUNK_WIDTH` wide chunks of columns that were edited since the last snapshot """
+        self.first_edit_time = 0.0
+        """ `monotonic()` of the first edit since the last snapshot """
+        self.last_edit_time = 0.0
+
+        self.last_snapshot: LevelSnapshot | None = None
+        """ The newest snapshot. Chunks that aren't dirty are shared with the next one. """
+
+        self.lock = threading.Lock()
+        self.worker: threading.Thread | None = None
+        self.pending: Tuple[int, LevelSnapshot] | None = None
+        """ (tag, snapshot) of the newest save that the worker hasn't started writing yet """
+
+    def mark_dirty(self, xs: np.ndarray | None = None) -> None:
+        """ Call after every edit, with the x coordinates of the cells it changed (None for edits that only change colors/metadata) """
+
+        now = monotonic()
+        if not self.dirty:
+            self.dirty = True
+            self.first_edit_time = now
+        self.last_edit_time = now
+
+        if xs is not None and len(xs) > 0:
+            self.dirty_chunks.update(np.unique(xs // LevelGrid.SNAPSHOT_CHUNK_WIDTH).tolist())
+
+    def is_due(self) -> bool:
+        """ Whether an autosave should happen now """
+        if not self.dirty:
+            return False
+        now = monotonic()
+        return now - self.last_edit_time >= Autosave.DELAY or now - self.first_edit_time >= Autosave.MAX_DELAY
+
+    def poll(self, tag: int = 0) -> bool:
+        """ Autosaves if it's due (see `is_due`). Returns whether it did. Call from the thread that edits the level. """
+        if not self.is_due():
+            return False
+        self.save(tag)
+        return True
+
+    def save(self, tag: int = 0) -> None:
+        """ Snapshots the level and has the worker write it. Returns right away. Call from the thread that edits the level.
+        `tag` is passed to `on_saved` once it's written. """
+
+        self.last_snapshot = self.level.snapshot(self.last_snapshot, self.dirty_chunks)
+        self.dirty = False
+        self.dirty_chunks.clear()
+
+        with self.lock:
+            self.pending = (tag, self.last_snapshot)
+            if self.worker is None:
+                self.worker = threading.Thread(target=self.run_worker, name="autosave", daemon=True)
+                self.worker.start()
+
+    def run_worker(self) -> None:
+        while True:
+            with self.lock:
+                if self.pending is None:
+                    self.worker = None
+                    return
+                tag, snapshot = self.pending
+                self.pending = None
+
+            try:
+                snapshot.to_level().write_to_file(self.filepath)
+                LevelIndex.update(self.filepath, snapshot.metadata)
+            except OSError as e:
+                Logger.log(f"[Autosave/run_worker]: couldn't write {self.filepath} ({e!r})")
+                continue
+
+            if self.on_saved is not None:
+                self.on_saved(tag)
+
+    def wait(self) -> None:
+        """ Blocks until every save so far has been written """
+        worker = self.worker
+        if worker is not None:
+            worker.join()
@@ -3,6 +3,7 @@ from typing import Literal, TYPE_CHECKING, Callable, Tuple, Any
 from logger import Logger
 from render.texture_manager import TextureManager
 from render.camera_frame import CameraFrame
+from render.frame_pool import FramePool
 from render.constants import CameraConstants
 from gd_constants import GDConstants
 if TYPE_CHECKING:
@@ -48,6 +49,8 @@ class EditColorPopup:
         self.make_legal()
 
         self.last_frame = frame
+        self.frame_pool = FramePool((frame.width, frame.height), frame.pos)
+        """ Buffers the popup is drawn into on each render (on top of a copy of the last frame) """
 
         self.selected_option = 0 
         """ 0 for editing channel#, 1 for R, 2 for G, 3 for B. represents which option the user is currently editing. """
@@ -82,7 +85,7 @@ class EditColorPopup:
         #Logger.log(f"{self.width=}, {self.height=}, {self.horiz_center=}, {self.vert_center=}")
         
         # add box and title
-        new_frame = self.last_frame.copy()
+        new_frame = self.last_frame.copy(into=self.frame_pool.acquire(avoid=self.last_frame))
         new_frame.add_rect(
             EditColorPopup.BG_COLOR,
             self.left, self.top, self.width, self.height,
@@ -0,0 +1,391 @@
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, NamedTuple, Tuple
+import base64
+import json
+import os
+import threading
+import zlib
+import numpy as np
+
+from logger import Logger
+from level import Level
+from level_grid import LevelGrid
+from editor.autosave import Autosave
+from render.constants import CameraConstants
+
+ColorChannelId = str | int
+
+class CellValues(NamedTuple):
+    """ The contents of some cells of a level (the cells themselves are listed by the `CellEdit` this belongs to) """
+    arrays: Dict[str, np.ndarray]
+    """ per-cell array name (see `LevelGrid.ARRAYS`) -> the value of each cell """
+    triggers: Dict[Tuple[int, int], tuple]
+    """ The `LevelGrid.triggers` entries of the cells (cells without one have the default trigger values) """
+    color_trigger_locs: Dict[Tuple[int, int], tuple]
+    """ The `Level.color_trigger_locs` entries of the cells """
+
+class CellEdit(NamedTuple):
+    """ A command that changed some cells of the level. Only has the cells that actually changed, with their values from before and after. """
+    name: str
+    xs: np.ndarray
+    ys: np.ndarray
+    before: CellValues
+    after: CellValues
+
+    def get_bounds(self) -> Tuple[int, int, int, int]:
+        """ (x0, y0, x1, y1) of the smallest rectangle (end exclusive) containing every changed cell """
+        return int(self.xs.min()), int(self.ys.min()), int(self.xs.max()) + 1, int(self.ys.max()) + 1
+
+class ColorEdit(NamedTuple):
+    """ A command that changed the (default) colors of some color channels. None = the channel didn't exist """
+    name: str
+    before: Dict[ColorChannelId, CameraConstants.RGBTuple | None]
+    after: Dict[ColorChannelId, CameraConstants.RGBTuple | None]
+
+EditCommand = CellEdit | ColorEdit
+
+class CellSnapshot(NamedTuple):
+    """ Everything in a rectangle of cells at some point, to diff against later (see `EditJournal.record_cells`) """
+    x0: int
+    y0: int
+    x1: int
+    y1: int
+    arrays: Dict[str, np.ndarray]
+    triggers: Dict[Tuple[int, int], tuple]
+    color_trigger_locs: Dict[Tuple[int, int], tuple]
+
+class EditJournal:
+    """
+    Every edit made to a level in the editor, as small command records (`CellEdit`/`ColorEdit`) with the values from before
+    and after, so they can be undone and redone as many times as needed.
+
+    Every command is also appended to a journal file next to the level (`<level path>.journal`, one JSON record per line)
+    as soon as it happens, so saving doesn't need to rewrite the level file right away - the level file gets written
+    in the background instead (see `Autosave`, on `save` and whenever edits settle down), compacting the journal into it.
+    Anything that didn't make it into the level file (e.g. the game crashed) gets replayed from the journal
+    the next time the level is opened in the editor.
+
+    Records in the journal file only have the values after the edit (that's all replaying needs), undos and redos
+    are recorded as the edits they make.
+    """
+
+    JOURNAL_EXTENSION = ".journal"
+
+    def __init__(self, level: Level, filepath: str) -> None:
+        self.level = level
+        self.filepath = filepath
+        """ The level file the journal belongs to """
+        self.journal_filepath = filepath + EditJournal.JOURNAL_EXTENSION
+
+        self.undo_stack: List[EditCommand] = []
+        self.redo_stack: List[EditCommand] = []
+
+        self.seq = 0
+        """ Number of records appended to the journal so far (including replayed ones) """
+        self.uncompacted_records: List[Tuple[int, str]] = []
+        """ (seq, line) of the records in the journal file that aren't in the level file yet """
+
+        self.journal_file = None
+        self.lock = threading.Lock()
+        """ Guards the journal file and `uncompacted_records` (the autosave thread rewrites them) """
+
+        self.autosave = Autosave(level, filepath, on_saved=self.compact)
+        """ Writes the level file in the background. Saves are tagged with the `seq` they include. """
+
+        self.replay()
+
+    # --- recording edits
+
+    def snapshot_cells(self, x0: int, y0: int, x1: int, y1: int) -> CellSnapshot:
+        """ The current contents of the cells [x0, x1) x [y0, y1) (can go past the edges of the level) """
+
+        def in_rect(pos: Tuple[int, int]) -> bool:
+            return x0 <= pos[0] < x1 and y0 <= pos[1] < y1
+
+        return CellSnapshot(
+            x0, y0, x1, y1,
+            self.level.grid.get_cells(x0, y0, x1, y1),
+            {pos: value for pos, value in self.level.grid.triggers.items() if in_rect(pos)},
+            {pos: tuple(value) for pos, value in self.level.color_trigger_locs.items() if in_rect(pos)}
+        )
+
+    def record_cells(self, name: str, before: CellSnapshot) -> CellEdit | None:
+        """ Records whatever changed in the cells of `before` since it was taken, as one command. Returns it (None if nothing changed). """
+
+        after = self.snapshot_cells(before.x0, before.y0, before.x1, before.y1)
+
+        changed = np.zeros((before.y1 - before.y0, before.x1 - before.x0), dtype=bool)
+        for array_name, values in before.arrays.items():
+            changed |= values != after.arrays[array_name]
+        for table in ("triggers", "color_trigger_locs"):
+            before_table, after_table = getattr(before, table), getattr(after, table)
+            for x, y in before_table.keys() | after_table.keys():
+                if before_table.get((x, y)) != after_table.get((x, y)):
+                    changed[y - before.y0, x - before.x0] = True
+
+        ys, xs = np.nonzero(changed)
+        if len(xs) == 0:
+            return None
+
+        command = CellEdit(
+            name, xs + before.x0, ys + before.y0,
+            _get_cell_values(before, changed), _get_cell_values(after, changed)
+        )
+        self.push(command)
+        return command
+
+    @contextmanager
+    def edit_cells(self, name: str, x0: int, y0: int, x1: int, y1: int) -> Iterator[None]:
+        """ Records everything done to the cells [x0, x1) x [y0, y1) inside the `with` block as one command """
+        before = self.snapshot_cells(x0, y0, x1, y1)
+        yield
+        self.record_cells(name, before)
+
+    def snapshot_colors(self) -> Dict[ColorChannelId, CameraConstants.RGBTuple]:
+        """ The current default color of every color channel (the ones the editor edits) """
+        start_settings = self.level.metadata["start_settings"]
+        return {
+            "bg": tuple(start_settings["bg_color"]),
+            "grnd": tuple(start_settings["ground_color"]),
+            **{id: tuple(color) for id, color in start_settings["default_color_channels"].items()}
+        }
+
+    def record_colors(self, name: str, before: Dict[ColorChannelId, CameraConstants.RGBTuple]) -> ColorEdit | None:
+        """ Records the color channels that changed since `before` (from `snapshot_colors`) as one command. Returns it (None if nothing changed). """
+
+        after = self.snapshot_colors()
+        changed = [id for id in before.keys() | after.keys() if before.get(id) != after.get(id)]
+        if len(changed) == 0:
+            return None
+
+        command = ColorEdit(name, {id: before.get(id) for id in changed}, {id: after.get(id) for id in changed})
+        self.push(command)
+        return command
+
+    def push(self, command: EditCommand) -> None:
+        """ Adds a command that was just done to the undo history (and the journal file) """
+        self.undo_stack.append(command)
+        self.redo_stack.clear()
+        self.append_record(_encode_record(command, command.after))
+        self.autosave.mark_dirty(command.xs if isinstance(command, CellEdit) else None)
+
+    # --- undo/redo
+
+    def undo(self) -> EditCommand | None:
+        """ Reverts the last command. Returns it (None if there was nothing to undo) """
+        if len(self.undo_stack) == 0:
+            return None
+
+        command = self.undo_stack.pop()
+        self.apply(command, command.before)
+        self.redo_stack.append(command)
+        return command
+
+    def redo(self) -> EditCommand | None:
+        """ Does the last undone command again. Returns it (None if there was nothing to redo) """
+        if len(self.redo_stack) == 0:
+            return None
+
+        command = self.redo_stack.pop()
+        self.apply(command, command.after)
+        self.undo_stack.append(command)
+        return command
+
+    def apply(self, command: EditCommand, values: CellValues | Dict[ColorChannelId, CameraConstants.RGBTuple | None]) -> None:
+        """ Puts the cells/colors of `command` back to `values` (its before or after values), and journals that """
+        if isinstance(command, CellEdit):
+            _apply_cells(self.level, command.xs, command.ys, values)
+        else:
+            _apply_colors(self.level, values)
+        self.append_record(_encode_record(command, values))
+        self.autosave.mark_dirty(command.xs if isinstance(command, CellEdit) else None)
+
+    # --- journal file
+
+    def append_record(self, record: dict) -> None:
+        with self.lock:
+            self.seq += 1
+            line = json.dumps(record, separators=(",", ":"))
+            self.uncompacted_records.append((self.seq, line))
+
+            try:
+                if self.journal_file is None:
+                    self.journal_file = open(self.journal_filepath, 'a', encoding='utf-8')
+                self.journal_file.write(line + "\n")
+                self.journal_file.flush()
+            except OSError as e:
+                # the record is still in uncompacted_records, so it gets into the journal file again on the next compaction
+                Logger.log(f"[EditJournal/append_record]: couldn't write to {self.journal_filepath} ({e!r})")
+
+    def replay(self) -> None:
+        """ Applies the records in the journal file (edits that never made it into the level file) to the level """
+
+        try:
+            with open(self.journal_filepath, 'r', encoding='utf-8') as f:
+                lines = f.read().splitlines()
+        except FileNotFoundError:
+            return
+        except OSError as e:
+            Logger.log(f"[EditJournal/replay]: couldn't read {self.journal_filepath} ({e!r})")
+            return
+
+        for line in lines:
+            try:
+                _replay_record(self.level, json.loads(line))
+            except (ValueError, KeyError, TypeError) as e:
+                # most likely the last line, cut off by a crash while it was being written
+                Logger.log(f"[EditJournal/replay]: skipping broken record in {self.journal_filepath} ({e!r})")
+                continue
+            self.seq += 1
+            self.uncompacted_records.append((self.seq, line))
+
+        Logger.log(f"[EditJournal/replay]: replayed {len(self.uncompacted_records)} edits from {self.journal_filepath}")
+        self.autosave.mark_dirty() # the first snapshot copies the whole level anyway
+
+    def save(self) -> None:
+        """ Makes sure everything is saved: journals the metadata, then has the level file written in the background. Returns right away. """
+        self.append_record({"type": "metadata", "metadata": self.level.metadata})
+        self.autosave.save(self.seq)
+
+    def poll(self) -> None:
+        """ Call every so often from the thread that edits the level. Autosaves once edits settle down (see `Autosave.poll`). """
+        self.autosave.poll(self.seq)
+
+    def compact(self, seq: int) -> None:
+        """ Called by the autosave thread once the level file has everything up to record `seq`.
+        Drops those records from the journal file. """
+        with self.lock:
+            self.uncompacted_records = [(record_seq, line) for record_seq, line in self.uncompacted_records if record_seq > seq]
+            self.rewrite_journal_file()
+
+    def rewrite_journal_file(self) -> None:
+        """ Replaces the journal file with just `uncompacted_records` (deletes it if there aren't any). Call with `lock` held. """
+
+        if self.journal_file is not None:
+            self.journal_file.close()
+            self.journal_file = None
+
+        try:
+            if len(self.uncompacted_records) == 0:
+                if os.path.exists(self.journal_filepath):
+                    os.remove(self.journal_filepath)
+                return
+
+            temp_filepath = self.journal_filepath + ".tmp"
+            with open(temp_filepath, 'w', encoding='utf-8') as f:
+                f.write("".join(line + "\n" for _, line in self.uncompacted_records))
+            os.replace(temp_filepath, self.journal_filepath)
+        except OSError as e:
+            Logger.log(f"[EditJournal/rewrite_journal_file]: couldn't rewrite {self.journal_filepath} ({e!r})")
+
+    def close(self) -> None:
+        """ Waits for the level file to be written (if a save is in progress), and closes the journal file """
+
+        self.autosave.wait()
+
+        with self.lock:
+            if self.journal_file is not None:
+                self.journal_file.close()
+                self.journal_file = None
+
+def _get_cell_values(snapshot: CellSnapshot, changed: np.ndarray) -> CellValues:
+    """ The values of the cells where `changed` (indexed like the snapshot's arrays) is true, in row major order """
+    
+    def is_changed(pos: Tuple[int, int]) -> bool:
+        return changed[pos[1] - snapshot.y0, pos[0] - snapshot.x0]
+    
+    return CellValues(
+        {name: array[changed] for name, array in snapshot.arrays.items()},
+        {pos: value for pos, value in snapshot.triggers.items() if is_changed(pos)},
+        {pos: value for pos, value in snapshot.color_trigger_locs.items() if is_changed(pos)}
+    )
+
+def _apply_cells(level: Level, xs: np.ndarray, ys: np.ndarray, values: CellValues) -> None:
+    level.grid.set_cells(xs, ys, values.arrays)
+    for pos in zip(xs.tolist(), ys.tolist()):
+        level.grid.triggers.pop(pos, None)
+        level.color_trigger_locs.pop(pos, None)
+    level.grid.triggers.update(values.triggers)
+    level.color_trigger_locs.update(values.color_trigger_locs)
+
+def _apply_colors(level: Level, colors: Dict[ColorChannelId, CameraConstants.RGBTuple | None]) -> None:
+    for id, color in colors.items():
+        if color is not None:
+            level.set_color_channel(id, color, is_default=True)
+        else: # the channel was created by the edit, remove it again
+            level.metadata["start_settings"]["default_color_channels"].pop(id, None)
+            if level.color_channels.pop(id, None) is not None:
+                level.color_channel_versions[id] = level.color_channel_versions.get(id, 0) + 1
+                level.notify_color_channel_listeners(id)
+
+# journal file records. Cells are stored as a bitmask of the changed cells in their bounding box, plus their values
+# in row major order (zlib compressed and base64 encoded, so big bulk edits stay small). Object types/rotations/reflections
+# are stored as indices into a table of names, so journals stay valid if the ids in LevelGrid change.
+
+_NAMED_ARRAYS: Dict[str, List[str | None]] = {"type_ids": LevelGrid.TYPE_NAMES, "rotations": LevelGrid.ROTATIONS, "reflections": LevelGrid.REFLECTIONS}
+""" per-cell array name -> id -> name, for the arrays that are stored by name """
+
+def _encode_array(array: np.ndarray) -> str:
+    return base64.b64encode(zlib.compress(np.ascontiguousarray(array).tobytes())).decode("ascii")
+
+def _decode_array(encoded: str, dtype: type) -> np.ndarray:
+    return np.frombuffer(zlib.decompress(base64.b64decode(encoded)), dtype=dtype)
+
+def _encode_record(command: EditCommand, values: CellValues | Dict[ColorChannelId, CameraConstants.RGBTuple | None]) -> dict:
+    """ The journal file record for setting `command`'s cells/colors to `values` """
+
+    if isinstance(command, ColorEdit):
+        return {"type": "colors", "colors": [[id, color] for id, color in values.items()]}
+
+    x0, y0, x1, y1 = command.get_bounds()
+    mask = np.zeros((y1 - y0, x1 - x0), dtype=bool)
+    mask[command.ys - y0, command.xs - x0] = True
+
+    arrays, tables = {}, {}
+    for name, (dtype, _) in LevelGrid.ARRAYS.items():
+        array = values.arrays[name]
+        if name in _NAMED_ARRAYS:
+            ids, array = np.unique(array, return_inverse=True)
+            tables[name] = [_NAMED_ARRAYS[name][id] for id in ids.tolist()]
+        arrays[name] = _encode_array(array.astype(np.dtype(dtype).newbyteorder("<")))
+
+    return {
+        "type": "cells",
+        "x": x0, "y": y0, "length": x1 - x0, "height": y1 - y0,
+        "mask": _encode_array(np.packbits(mask)),
+        "arrays": arrays,
+        "tables": tables,
+        "triggers": [[x, y, target, list(color)] for (x, y), (target, color) in values.triggers.items()],
+        "color_trigger_locs": [[x, y, list(value)] for (x, y), value in values.color_trigger_locs.items()],
+    }
+
+def _replay_record(level: Level, record: dict) -> None:
+    match record["type"]:
+        case "cells":
+            length, height = record["length"], record["height"]
+            mask = np.unpackbits(_decode_array(record["mask"], np.uint8), count=length * height).reshape(height, length).astype(bool)
+            ys, xs = np.nonzero(mask)
+
+            arrays = {}
+            for name, (dtype, _) in LevelGrid.ARRAYS.items():
+                array = _decode_array(record["arrays"][name], np.dtype(dtype).newbyteorder("<")).astype(dtype)
+                if name in _NAMED_ARRAYS:
+                    # None (empty cell) is only ever in the type names, and is type id 0
+                    ids_by_name = {id_name: id for id, id_name in enumerate(_NAMED_ARRAYS[name])}
+                    array = np.array([ids_by_name[id_name] for id_name in record["tables"][name]], dtype=dtype)[array]
+                arrays[name] = array
+
+            values = CellValues(
+                arrays,
+                {(x, y): (target, tuple(color)) for x, y, target, color in record["triggers"]},
+                {(x, y): tuple(value) for x, y, value in record["color_trigger_locs"]}
+            )
+            _apply_cells(level, xs + record["x"], ys + record["y"], values)
+        case "colors":
+            # a list of pairs and not a dict, so the int channel ids don't turn into strings
+            _apply_colors(level, {id: tuple(color) if color is not None else None for id, color in record["colors"]})
+        case "metadata":
+            level.metadata = Level.parse_metadata(record["metadata"], level.filepath)
+            level.reset_colors()
+        case _:
+            raise ValueError(f"unknown record type {record['type']}")
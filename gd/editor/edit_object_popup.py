@@ -3,6 +3,7 @@ from typing import Literal, TYPE_CHECKING
 from logger import Logger
 from render.texture_manager import TextureManager
 from render.camera_frame import CameraFrame
+from render.frame_pool import FramePool
 from level import Level, LevelObject
 from render.constants import CameraConstants
 from gd_constants import GDConstants
@@ -52,6 +53,8 @@ class EditObjectPopup:
         self.obj = obj
         self.level = level
         self.last_frame = frame
+        self.frame_pool = FramePool((frame.width, frame.height), frame.pos)
+        """ Buffers the popup is drawn into on each render (on top of a copy of the last frame) """
         
         self.available_settings = [
             ('color1', 2),
@@ -79,7 +82,7 @@ class EditObjectPopup:
         """ Draws this popup to the center of the frame provided, and renders the frame. """
 
         # add box and title
-        new_frame = self.last_frame.copy()
+        new_frame = self.last_frame.copy(into=self.frame_pool.acquire(avoid=self.last_frame))
         new_frame.add_rect(
             EditObjectPopup.BG_COLOR,
             self.left, self.top, self.width, self.height,
@@ -1,4 +1,5 @@
-from typing import Tuple, Literal, TYPE_CHECKING
+from typing import Iterator, List, Tuple, Literal, TYPE_CHECKING
+from contextlib import contextmanager
 from math import floor, ceil
 import time
 import traceback
@@ -6,14 +7,17 @@ import traceback
 from logger import Logger
 from render.constants import CameraConstants
 from render.camera_frame import CameraFrame
+from render.frame_pool import FramePool
 from render.texture_manager import TextureManager
+from render.level_raster import OVERFLOW_BLOCKS
 from gd_constants import GDConstants
 from engine.objects import OBJECTS
-from level import Level, LevelObject, AbstractLevelObject
+from level import Level, LevelObject, AbstractLevelObject, LevelRegion
 from editor.edit_object_popup import EditObjectPopup
 from editor.edit_color_popup import EditColorPopup
 from editor.edit_color_trigger_popup import EditColorTriggerPopup
 from editor.level_settings_popup import LevelSettingsPopup
+from editor.edit_journal import EditJournal, CellEdit, ColorEdit, CellSnapshot
 
 if TYPE_CHECKING:
     from blessed.keyboard import Keystroke
@@ -27,6 +31,8 @@ class LevelEditor:
     BUILD_CURSOR_PREVIEW_OPACITY = 0.5 # fraction of 255
     EDIT_CURSOR_FILL_COLOR = (0, 255, 0, 120) 
     EDIT_CURSOR_OUTLINE_COLOR = (180, 255, 150, 220)
+    SELECTION_FILL_COLOR = (80, 160, 255, 70)
+    SELECTION_OUTLINE_COLOR = (150, 200, 255, 220)
     KEYBINDS = {
         "quit": ["q", "\x1b"], # q, esc
         "rotate_clockwise": ["e"],
@@ -35,7 +41,14 @@ class LevelEditor:
         "flip_object_vertical": ["v"],
         "delete_object": ["\x7f", "\x1b[3~"], # del, backspace
         "copy": ["\x03"], # ctrl c
+        "cut": ["\x18"], # ctrl x
         "paste": ["\x16"], # ctrl v
+        "select": ["x"], # start/stop selecting a rectangle (from here to the cursor)
+        "fill_selection": ["f"], # fill the selection with the build mode object
+        "move_selection_up": ["W"],
+        "move_selection_down": ["S"],
+        "move_selection_left": ["A"],
+        "move_selection_right": ["D"],
         "save": ["\x13"], # ctrl s
         "undo": ["\x1a"], # ctrl z
         "redo": ["\x19"], # ctrl y
@@ -70,10 +83,12 @@ class LevelEditor:
         Can edit object color channels, and select a range.
         """
         
-        self.clipboard: AbstractLevelObject | None = None
-        """ Abstract object that is copied to the clipboard. """
-        self.undo_stack = []
-        self.redo_stack = []
+        self.clipboard: LevelRegion | None = None
+        """ The cells that were last copied (the selection, or just the cell under the cursor) """
+        self.selection_anchor: Tuple[int, int] | None = None
+        """ The corner of the selection that doesn't move with the cursor (the other one is the cursor). None = nothing selected """
+        self.journal = EditJournal(self.level, filepath)
+        """ Every edit made in the editor, for undo/redo. Also what saves the level (see `save`). """
         
         self.cursor_position: Tuple[int, int] = (0, 0)
         """ Position of the CURSOR. This is independent of the screen position. """        
@@ -101,33 +116,115 @@ class LevelEditor:
         
         self.curr_main_frame: CameraFrame = None
         self.curr_bottom_menu_frame: CameraFrame = None
+        self.scene_frame = CameraFrame((self.camera_width, self.camera_height))
+        """ The editor view without the cursor (bg, objects, ground). Kept between frames and only partly redrawn (see `update_scene`) """
+        self.scene_camera: Tuple[int, int] | None = None
+        """ (camera_left, camera_bottom) that `scene_frame` is currently drawn for. None = needs a full redraw """
+        self.scene_dirty_cells: List[Tuple[int, int, int, int]] = []
+        """ (x0, y0, x1, y1) ranges of grid cells (end exclusive) that changed since `scene_frame` was last updated """
+        self.main_frame_pool = FramePool(size=(self.camera_width, self.camera_height))
+        self.bottom_menu_frame_pool = FramePool(size=(self.camera_width, LevelEditor.BOTTOM_MENU_HEIGHT+1), pos=(0, self.camera_height))
+        """ Preallocated buffers for the main editor and bottom menu frames (see FramePool) """
         self.focused_popup: "EditObjectPopup | EditColorPopup | LevelSettingsPopup | None" = None
         """ If true, the editor is currently in a popup window; disable general keybinds & pause main editor rendering. """
         self.rerender_needed = True
         """ If True, the editor will rerender the frame on the next keylistener loop. Set to true when anything on the screen changes. """
         self.showing_save_confirmation = False
         """ Whether or not to render "saved changes!" in the bottom bar instead of build/edit mode. Should be set on save, and unset on the next keypress. """
+        self.popup_snapshot: Tuple[CellSnapshot, dict] | None = None
+        """ (cursor cell, colors) from when the current popup was opened, to record what it changed as an edit when it closes """
         self.running = False
         
     def save(self) -> None:
+        """ Saves the level. Edits are already in the journal by now, so this only makes the journal rewrite the level file,
+        which happens in the background (see `EditJournal.save`). """
         self.level.metadata["modified_timestamp"] = time.time()
-        self.level.write_to_file(self.filepath)
+        self.journal.save()
         self.showing_save_confirmation = True
         self.render_bottom_menu()
         
     def undo(self) -> None:
-        pass # TODO
+        self.invalidate_edit(self.journal.undo())
     
     def redo(self) -> None:
-        pass # TODO
+        self.invalidate_edit(self.journal.redo())
+    
+    @contextmanager
+    def edit_cells(self, name: str, x0: int, y0: int, x1: int, y1: int) -> Iterator[None]:
+        """ Records everything done to the cells [x0, x1) x [y0, y1) inside the `with` block as one (undoable) edit,
+        and redraws them on the next render """
+        with self.journal.edit_cells(name, x0, y0, x1, y1):
+            yield
+        self.invalidate_cells(x0, y0, x1, y1)
+    
+    def get_cursor_cells(self) -> Tuple[int, int, int, int]:
+        """ The cell under the cursor as a (x0, y0, x1, y1) range, e.g. for `edit_cells` """
+        return (*self.cursor_position, self.cursor_position[0] + 1, self.cursor_position[1] + 1)
+    
+    def get_selection(self) -> Tuple[int, int, int, int] | None:
+        """ The selected rectangle as a (x0, y0, x1, y1) range (end exclusive), or None if nothing is selected """
+        if self.selection_anchor is None:
+            return None
+        (anchor_x, anchor_y), (cursor_x, cursor_y) = self.selection_anchor, self.cursor_position
+        return min(anchor_x, cursor_x), min(anchor_y, cursor_y), max(anchor_x, cursor_x) + 1, max(anchor_y, cursor_y) + 1
+    
+    def get_selected_cells(self) -> Tuple[int, int, int, int]:
+        """ What bulk operations (copy, delete, ...) work on: the selection, or the cell under the cursor if nothing is selected """
+        return self.get_selection() or self.get_cursor_cells()
+    
+    def move_selection(self, dx: int, dy: int) -> None:
+        """ Moves the objects in the selection (or under the cursor) by (dx, dy) cells, along with the selection and cursor.
+        Objects that were at the destination get overwritten. """
+        
+        x0, y0, x1, y1 = self.get_selected_cells()
+        if x0 + dx < 0 or y0 + dy < 0:
+            return
+        
+        with self.edit_cells("move", min(x0, x0 + dx), min(y0, y0 + dy), max(x1, x1 + dx), max(y1, y1 + dy)):
+            region = self.level.get_region(x0, y0, x1, y1)
+            self.level.clear_region(x0, y0, x1, y1)
+            self.level.paste_region(x0 + dx, y0 + dy, region)
+        
+        if self.selection_anchor is not None:
+            self.selection_anchor = (self.selection_anchor[0] + dx, self.selection_anchor[1] + dy)
+        self.cursor_position = (self.cursor_position[0] + dx, self.cursor_position[1] + dy)
+        self.scroll_to_cursor()
+    
+    def scroll_to_cursor(self) -> None:
+        """ Moves the camera so the cursor is on screen """
+        blocks_wide, blocks_tall = self.camera_width / CameraConstants.BLOCK_WIDTH, self.camera_height / CameraConstants.BLOCK_HEIGHT
+        self.camera_left = min(self.camera_left, self.cursor_position[0])
+        self.camera_left = max(self.camera_left, self.cursor_position[0] - floor(blocks_wide) + 1)
+        self.camera_bottom = min(self.camera_bottom, self.cursor_position[1])
+        self.camera_bottom = max(self.camera_bottom, self.cursor_position[1] - floor(blocks_tall) + 1)
+    
+    def invalidate_edit(self, command: CellEdit | ColorEdit | None) -> None:
+        """ Redraws whatever an edit changed on the next render """
+        if isinstance(command, CellEdit):
+            self.invalidate_cells(*command.get_bounds())
+        elif command is not None: # colors
+            self.invalidate_scene()
+    
+    def open_popup(self, popup: "EditObjectPopup | EditColorPopup | EditColorTriggerPopup | LevelSettingsPopup") -> None:
+        """ Shows a popup. Whatever it changes gets recorded as an edit when it's closed (see `close_popup`) """
+        self.focused_popup = popup
+        self.popup_snapshot = (self.journal.snapshot_cells(*self.get_cursor_cells()), self.journal.snapshot_colors())
+        popup.render()
+    
+    def close_popup(self) -> None:
+        self.focused_popup = None
+        if self.popup_snapshot is not None:
+            cells, colors = self.popup_snapshot
+            self.popup_snapshot = None
+            self.journal.record_cells("edit object", cells)
+            self.journal.record_colors("edit colors", colors)
+        self.invalidate_scene() # the popup drew over the level view
     
     def render_bottom_menu(self) -> None:
         """ Draws the bar at the bottom. It has a 1px border on the top. """
         
-        new_frame = CameraFrame(
-            size=(self.camera_width, LevelEditor.BOTTOM_MENU_HEIGHT+1), # +1 for the border
-            pos=(0, self.camera_height) # +1 for the border
-        ) # +1 for the border
+        new_frame = self.bottom_menu_frame_pool.acquire(avoid=self.curr_bottom_menu_frame)
+        new_frame.fill((0, 0, 0)) # buffer is reused, clear whatever was drawn last time
         
         # draw a 1px tall rectangle at the top to be the border
         new_frame.add_rect((255, 255, 255, 255), 0, 0, self.camera_width, 1)
@@ -153,6 +250,9 @@ class LevelEditor:
         
         # if edit mode, add text in bottom right that shows current cursor pos
         cursor_pos_str = f"{self.cursor_position[0]},{self.cursor_position[1]}"
+        selection = self.get_selection()
+        if selection is not None:
+            cursor_pos_str = f"{selection[2] - selection[0]}x{selection[3] - selection[1]} selected  {cursor_pos_str}"
         new_frame.add_text(self.camera_width-2, center_y, TextureManager.font_small1, cursor_pos_str, 'right')
     
         # render the new frame
@@ -163,59 +263,139 @@ class LevelEditor:
             
         self.curr_bottom_menu_frame = new_frame
     
+    def invalidate_scene(self) -> None:
+        """ Makes the next render redraw the whole level view (e.g. after colors changed) """
+        self.scene_camera = None
+        self.scene_dirty_cells.clear()
+    
+    def invalidate_cells(self, x0: int, y0: int, x1: int, y1: int) -> None:
+        """ Makes the next render redraw the grid cells [x0, x1) x [y0, y1), e.g. after placing/deleting objects there.
+        Their neighbours get redrawn too, since textures can stick out of their cell. """
+        self.scene_dirty_cells.append((x0, y0, x1, y1))
+    
+    def draw_scene(self, frame: CameraFrame, left_px: int = 0, top_px: int = 0) -> None:
+        """ Draws the level view (bg, objects, ground) for the current camera position onto `frame`,
+        where `frame` covers the part of the editor view starting `left_px`, `top_px` from its top left. """
+        
+        frame.fill(self.level.bg_color)
+        
+        # screen y of the top of the ground (= bottom of row 0), relative to the frame
+        ground_screen_y_pos = self.camera_bottom * CameraConstants.BLOCK_HEIGHT + self.camera_height - top_px
+        
+        # range of grid cells whose textures can show up in the frame (end exclusive)
+        visible_horiz_range = (
+            max(0, floor(self.camera_left + left_px / CameraConstants.BLOCK_WIDTH) - OVERFLOW_BLOCKS),
+            min(self.level.length, ceil(self.camera_left + (left_px + frame.width) / CameraConstants.BLOCK_WIDTH) + OVERFLOW_BLOCKS)
+        )
+        visible_vert_range = (
+            max(0, floor((ground_screen_y_pos - frame.height) / CameraConstants.BLOCK_HEIGHT) - OVERFLOW_BLOCKS),
+            min(self.level.height, ceil(ground_screen_y_pos / CameraConstants.BLOCK_HEIGHT) + OVERFLOW_BLOCKS)
+        )
+        
+        if visible_horiz_range[0] < visible_horiz_range[1]:
+            # bottom row first, left to right, so overlapping textures always stack the same way no matter what part is drawn
+            for row in range(*visible_vert_range):
+                # where the center of this row is on the frame
+                ypos_on_screen = ground_screen_y_pos - CameraConstants.BLOCK_HEIGHT*(1+row) + CameraConstants.BLOCK_HEIGHT // 2
+                
+                for x, obj in enumerate(self.level.get_row(row, *visible_horiz_range), visible_horiz_range[0]):
+                    if obj is not None:
+                        xpos_on_screen = round((x - self.camera_left) * CameraConstants.BLOCK_WIDTH) - left_px + CameraConstants.BLOCK_WIDTH // 2
+                        
+                        # get transformed texture, with rotations, color, etc. (attempts to use cache for optimization)
+                        obj_texture = TextureManager.get_transformed_texture(self.level, obj)
+                        frame.add_pixels_centered_at(xpos_on_screen, round(ypos_on_screen), obj_texture)
+        
+        # draw ground. The top of the ground ground should be at physics y=0.
+        frame.add_pixels_topleft(-left_px, round(ground_screen_y_pos), TextureManager.get_curr_ground_texture(self.level, self.camera_left))
+    
+    def redraw_scene_area(self, x0: int, y0: int, x1: int, y1: int) -> None:
+        """ Redraws the pixels [x0, x1) x [y0, y1) of `scene_frame` (clipped to the frame) """
+        
+        # frames have to be an even number of pixels tall
+        x0, x1 = max(0, x0), min(self.camera_width, x1)
+        y0, y1 = max(0, y0 - y0 % 2), min(self.camera_height, y1 + y1 % 2)
+        if x0 >= x1 or y0 >= y1:
+            return
+        
+        # draws straight into the scene frame's pixels
+        area = CameraFrame((x1 - x0, y1 - y0))
+        area.pixels = self.scene_frame.pixels[y0:y1, x0:x1]
+        self.draw_scene(area, x0, y0)
+        self.scene_frame.mark_dirty()
+    
+    def update_scene(self) -> None:
+        """
+        Brings `scene_frame` up to date with the camera position and the level, redrawing as little as possible:
+        - camera moves shift the old view over and only draw the newly visible columns/rows
+        - changed cells (see `invalidate_cells`) only redraw the area around them
+        """
+        
+        camera = (self.camera_left, self.camera_bottom)
+        
+        if self.scene_camera is not None and self.scene_camera != camera:
+            # how far the view moved, in px. content moves left when the camera moves right, and down when the camera moves up
+            dx = round((camera[0] - self.scene_camera[0]) * CameraConstants.BLOCK_WIDTH)
+            dy = round((camera[1] - self.scene_camera[1]) * CameraConstants.BLOCK_HEIGHT)
+            
+            if abs(dx) >= self.camera_width or abs(dy) >= self.camera_height:
+                self.scene_camera = None # nothing left to reuse
+            else:
+                pixels = self.scene_frame.pixels
+                width, height = self.camera_width, self.camera_height
+                pixels[max(0, dy):height + min(0, dy), max(0, -dx):width + min(0, -dx)] = pixels[max(0, -dy):height + min(0, -dy), max(0, dx):width + min(0, dx)]
+                self.scene_frame.mark_dirty()
+                self.scene_camera = camera
+                
+                if dx > 0:
+                    self.redraw_scene_area(width - dx, 0, width, height)
+                elif dx < 0:
+                    self.redraw_scene_area(0, 0, -dx, height)
+                if dy > 0:
+                    self.redraw_scene_area(0, 0, width, dy)
+                elif dy < 0:
+                    self.redraw_scene_area(0, height + dy, width, height)
+                
+                if dx != 0:
+                    # the ground texture is only so wide and its offset depends on camera_left, so it doesn't just shift over
+                    ground_screen_y_pos = self.camera_bottom * CameraConstants.BLOCK_HEIGHT + self.camera_height
+                    self.redraw_scene_area(0, ground_screen_y_pos, width, ground_screen_y_pos + TextureManager.base_textures["ground"].shape[0])
+        
+        if self.scene_camera is None:
+            self.draw_scene(self.scene_frame)
+            self.scene_camera = camera
+            self.scene_dirty_cells.clear()
+            return
+        
+        for x0, y0, x1, y1 in self.scene_dirty_cells:
+            left, top = CameraConstants.get_screen_coordinates(self.camera_left, self.camera_bottom, self.camera_height, x0 - OVERFLOW_BLOCKS, y1 - 1 + OVERFLOW_BLOCKS)
+            right, bottom = CameraConstants.get_screen_coordinates(self.camera_left, self.camera_bottom, self.camera_height, x1 + OVERFLOW_BLOCKS, y0 - 1 - OVERFLOW_BLOCKS)
+            self.redraw_scene_area(left, top, right, bottom)
+        self.scene_dirty_cells.clear()
+    
     def render_main_editor(self, render_raw: bool = False) -> None:
-        """ Draws a single frame of the editor to the screen. Should be overall similar to Camera.render. """
+        """ Draws a single frame of the editor to the screen. Should be overall similar to Camera.render.
+        The level view itself is kept between frames and only redrawn where it changed (see `update_scene`),
+        so this is mostly just putting the cursor on top of it. """
         
         #Logger.log_on_screen(GDConstants.term, f"Rendering frame, cam left,bottom={self.camera_left, self.camera_bottom}, cursor@{self.cursor_position=}")
         
-        new_frame = CameraFrame(size=(self.camera_width, self.camera_height))
-        new_frame.fill(self.level.bg_color)
-        #new_frame.fill([randint(0, 255) for _ in range(3)])
-
-        camera_right = self.camera_left + self.camera_width / CameraConstants.BLOCK_WIDTH
-        camera_top = self.camera_bottom + self.camera_height / CameraConstants.BLOCK_HEIGHT
-
-        visible_vert_range = max(0, floor(self.camera_bottom)), min(self.level.height, 1+ceil(self.camera_bottom + new_frame.height / CameraConstants.BLOCK_HEIGHT))
-        # this should be smth like (5, 12) which is the range of y-pos of the grid that is visible on the screen. Exclusive of the second number (thats why we +1)
-
-        # first calc where the ground would be rendered
-        ground_screen_y_pos = camera_top * CameraConstants.BLOCK_HEIGHT
+        self.update_scene()
         
-        # we start rendering the row at ground - (y+1)*block_height, and decrement by block_height after each row
-        curr_screen_y_pos = ground_screen_y_pos - CameraConstants.BLOCK_HEIGHT*(1+visible_vert_range[0])
-
-        #Logger.log(f"[Camera/render] visible_vert_slice = {visible_vert_slice}, initial curr_screen_y_pos = {curr_screen_y_pos}")
-        for row in range(*visible_vert_range):
-            # horizontal range of grid cells that are in the camera range. Includes any partially visible cells on the sides.
-            visible_horiz_range = (max(0, floor(self.camera_left)), min(self.level.length, ceil(camera_right))) # last index is exclusive
-
-            #Logger.log(f"[Camera/render] {self.camera_left=}, {row=}, {curr_screen_y_pos=}, player@{game.player.pos=}, {visible_horiz_range=}, {visible_vert_range=}")
-
-            # add textures of all the visible objects in this row to the new frame
-            for obj in self.level.get_row(row, *visible_horiz_range):
-                if obj is not None:
-                    
-                    #Logger.log(f"NotNone obj!!!! {obj} @ {obj.x, obj.y}")
-                    
-                    # calculate where it will truly be rendered on the screen
-                    xpos_on_screen = round((obj.x - self.camera_left) * CameraConstants.BLOCK_WIDTH)
-                    ypos_on_screen = curr_screen_y_pos
-                    
-                    # convert from topleft to center
-                    xpos_on_screen += CameraConstants.BLOCK_WIDTH // 2
-                    ypos_on_screen += CameraConstants.BLOCK_HEIGHT // 2
-                    
-                    # get transformed texture, with rotations, color, etc. (attempts to use cache for optimization)
-                    obj_texture = TextureManager.get_transformed_texture(self.level, obj)
-                    
-                    #Logger.log(f"[LevelEditor/render_main_editor] Adding texture w shape={obj_texture.shape} @ {xpos_on_screen, ypos_on_screen}")
-                    new_frame.add_pixels_centered_at(xpos_on_screen, round(ypos_on_screen), obj_texture)
-                    
-            curr_screen_y_pos -= CameraConstants.BLOCK_HEIGHT
+        new_frame = self.main_frame_pool.acquire(avoid=self.curr_main_frame)
+        self.scene_frame.copy(into=new_frame)
         
-        # draw ground. The top of the ground ground should be at physics y=0.
-        # TODO - make ground recolorable/move
-        new_frame.add_pixels_topleft(0, round(ground_screen_y_pos), TextureManager.get_curr_ground_texture(self.level, self.camera_left))
+        # draw selection
+        selection = self.get_selection()
+        if selection is not None:
+            x0, y0, x1, y1 = selection
+            selection_screen_pos = CameraConstants.get_screen_coordinates(self.camera_left, self.camera_bottom, self.camera_height, x0, y1 - 1)
+            new_frame.add_rect(
+                LevelEditor.SELECTION_FILL_COLOR,
+                selection_screen_pos[0], selection_screen_pos[1],
+                (x1 - x0) * CameraConstants.BLOCK_WIDTH, (y1 - y0) * CameraConstants.BLOCK_HEIGHT,
+                outline_color=LevelEditor.SELECTION_OUTLINE_COLOR, outline_width=1
+            )
         
         # draw cursor
         if self.mode == 'build':
@@ -226,7 +406,7 @@ class LevelEditor:
             #if self.selected_object.type == "color_trigger":
             #    cursor_texture = TextureManager.get_base_texture(self.selected_object)
             #else:
-            cursor_texture = TextureManager.set_transparency(TextureManager.get_transformed_texture(self.level, self.selected_object), round(LevelEditor.BUILD_CURSOR_PREVIEW_OPACITY*255))
+            cursor_texture = TextureManager.set_transparency(TextureManager.get_transformed_texture(self.level, self.selected_object, writable=True), round(LevelEditor.BUILD_CURSOR_PREVIEW_OPACITY*255))
             #cursor_texture = TextureManager.get_transformed_texture(self.level, self.selected_object)
             
             # convert top left to center
@@ -263,19 +443,47 @@ class LevelEditor:
             self.showing_save_confirmation = False # reset the "saved changes!" message on any keypress
             
             if val in LevelEditor.KEYBINDS["quit"] or val in LevelEditor.KEYBINDS['open_settings']:
-                self.focused_popup = LevelSettingsPopup(self.curr_main_frame.copy(), self.level)
-                self.focused_popup.render()
+                self.open_popup(LevelSettingsPopup(self.curr_main_frame, self.level))
                 
             elif val in LevelEditor.KEYBINDS['save']:
                 self.save()
             elif val in LevelEditor.KEYBINDS['delete_object']:
-                self.level.set_object_at(*self.cursor_position, None)    
+                with self.edit_cells("delete", *self.get_selected_cells()):
+                    self.level.clear_region(*self.get_selected_cells())
                 self.rerender_needed = True 
             elif val in LevelEditor.KEYBINDS['copy']:
-                self.clipboard = self.level.get_object_at(*self.cursor_position).abstract_copy() 
-            elif val in LevelEditor.KEYBINDS['paste']:
-                self.level.set_object_at(*self.cursor_position, self.clipboard)
+                self.clipboard = self.level.get_region(*self.get_selected_cells())
+            elif val in LevelEditor.KEYBINDS['cut']:
+                self.clipboard = self.level.get_region(*self.get_selected_cells())
+                with self.edit_cells("cut", *self.get_selected_cells()):
+                    self.level.clear_region(*self.get_selected_cells())
+                self.rerender_needed = True
+            elif val in LevelEditor.KEYBINDS['paste'] and self.clipboard is not None:
+                # bottom left corner of the copied cells goes at the cursor
+                x, y = self.cursor_position
+                with self.edit_cells("paste", x, y, x + self.clipboard.length, y + self.clipboard.height):
+                    self.level.paste_region(x, y, self.clipboard)
                 self.rerender_needed = True 
+            
+            elif val in LevelEditor.KEYBINDS['select']:
+                self.selection_anchor = self.cursor_position if self.selection_anchor is None else None
+                self.rerender_needed = True
+            elif val in LevelEditor.KEYBINDS['fill_selection'] and self.selection_anchor is not None:
+                with self.edit_cells("fill", *self.get_selection()):
+                    self.level.fill_region(*self.get_selection(), self.selected_object)
+                self.rerender_needed = True
+            elif val in LevelEditor.KEYBINDS['move_selection_up']:
+                self.move_selection(0, 1)
+                self.rerender_needed = True
+            elif val in LevelEditor.KEYBINDS['move_selection_down']:
+                self.move_selection(0, -1)
+                self.rerender_needed = True
+            elif val in LevelEditor.KEYBINDS['move_selection_left']:
+                self.move_selection(-1, 0)
+                self.rerender_needed = True
+            elif val in LevelEditor.KEYBINDS['move_selection_right']:
+                self.move_selection(1, 0)
+                self.rerender_needed = True
             elif val in LevelEditor.KEYBINDS['undo']:
                 self.undo()
                 self.rerender_needed = True 
@@ -329,7 +537,8 @@ class LevelEditor:
             """ Event handler for keypresses SPECIFIC TO build mode. """
             if val in LevelEditor.KEYBINDS["place_object"]:
                 #Logger.log_on_screen(GDConstants.term, f"placing object {self.selected_object} @{self.cursor_position=}")
-                self.level.set_object_at(*self.cursor_position, self.selected_object)
+                with self.edit_cells("place", *self.get_cursor_cells()):
+                    self.level.set_object_at(*self.cursor_position, self.selected_object)
                 self.rerender_needed = True
             elif val in LevelEditor.KEYBINDS['rotate_clockwise']: # rotate curr object at cursor
                 self.selected_object.rotate('clockwise')
@@ -380,66 +589,73 @@ class LevelEditor:
             
             if val in LevelEditor.KEYBINDS["edit_object"]:
                 if hovered_obj.type == "color_trigger":
-                    self.focused_popup = EditColorTriggerPopup(self.curr_main_frame.copy(), hovered_obj, self.level)
-                    self.focused_popup.render()
+                    self.open_popup(EditColorTriggerPopup(self.curr_main_frame, hovered_obj, self.level))
                 else:
-                    self.focused_popup = EditObjectPopup(self.curr_main_frame.copy(), hovered_obj, self.level)
-                    self.focused_popup.render()
+                    self.open_popup(EditObjectPopup(self.curr_main_frame, hovered_obj, self.level))
                     
             elif val in LevelEditor.KEYBINDS['rotate_clockwise']: # rotate curr object at cursor
-                hovered_obj.rotate('clockwise')
+                with self.edit_cells("rotate", *self.get_cursor_cells()):
+                    hovered_obj.rotate('clockwise')
                 self.rerender_needed = True
             elif val in LevelEditor.KEYBINDS['rotate_counterclockwise']:
-                hovered_obj.rotate('counterclockwise')
+                with self.edit_cells("rotate", *self.get_cursor_cells()):
+                    hovered_obj.rotate('counterclockwise')
                 self.rerender_needed = True
             elif val in LevelEditor.KEYBINDS['flip_object_horizontal']:
-                hovered_obj.reflect('horizontal')
+                with self.edit_cells("flip", *self.get_cursor_cells()):
+                    hovered_obj.reflect('horizontal')
                 self.rerender_needed = True
             elif val in LevelEditor.KEYBINDS['flip_object_vertical']:
-                hovered_obj.reflect('vertical')
+                with self.edit_cells("flip", *self.get_cursor_cells()):
+                    hovered_obj.reflect('vertical')
                 self.rerender_needed = True
         
         self.running = True
-        while self.running:
-            with GDConstants.term.cbreak():
-                in_val = GDConstants.term.inkey(0.01)
+        try:
+            while self.running:
+                with GDConstants.term.cbreak():
+                    in_val = GDConstants.term.inkey(0.01)
+                    self.journal.poll() # autosave once edits settle down
                 
-                if in_val:
-                    if self.focused_popup is None:
-                        try:
-                            key_handler_general(in_val)
-                            key_handler_build_mode(in_val) if self.mode == 'build' else key_handler_edit_mode(in_val)
-                        except:
-                            Logger.log(f"[LevelEditor/key handler (not in popup)]: {traceback.format_exc()}")
-                            print(f"[LevelEditor/key handler (not in popup)] ERROR: {traceback.format_exc()}")
-                            self.running = False
-                    else:
-                        try:
-                            returncode = self.focused_popup.handle_key(in_val)
-                            match returncode:
-                                case "close":
-                                    self.focused_popup = None
-                                    self.render_main_editor(render_raw=True)
-                                    self.render_bottom_menu()
-                                case "open-colors": # close popup, open color popup
-                                    self.focused_popup = None
-                                    self.render_main_editor(render_raw=True)
-                                    self.render_bottom_menu()
-                                    self.focused_popup = EditColorPopup(self.curr_main_frame.copy(), self.level, "bg")
-                                    self.focused_popup.render()
-                                case "save-quit": # quit editor
-                                    self.save()
-                                    self.running = False
-                                    break
+                    if in_val:
+                        if self.focused_popup is None:
+                            try:
+                                key_handler_general(in_val)
+                                key_handler_build_mode(in_val) if self.mode == 'build' else key_handler_edit_mode(in_val)
+                            except:
+                                Logger.log(f"[LevelEditor/key handler (not in popup)]: {traceback.format_exc()}")
+                                print(f"[LevelEditor/key handler (not in popup)] ERROR: {traceback.format_exc()}")
+                                self.running = False
+                        else:
+                            try:
+                                returncode = self.focused_popup.handle_key(in_val)
+                                match returncode:
+                                    case "close":
+                                        self.close_popup()
+                                        self.render_main_editor(render_raw=True)
+                                        self.render_bottom_menu()
+                                    case "open-colors": # close popup, open color popup
+                                        self.close_popup()
+                                        self.render_main_editor(render_raw=True)
+                                        self.render_bottom_menu()
+                                        self.open_popup(EditColorPopup(self.curr_main_frame, self.level, "bg"))
+                                    case "save-quit": # quit editor
+                                        self.close_popup()
+                                        self.save()
+                                        self.running = False
+                                        break
                             
-                        except:
-                            Logger.log(f"[LevelEditor/key handler (IN POPUP)]: {traceback.format_exc()}")
-                            print(f"[LevelEditor/key handler (IN POPUP)] ERROR: {traceback.format_exc()}")
-                            self.running = False
+                            except:
+                                Logger.log(f"[LevelEditor/key handler (IN POPUP)]: {traceback.format_exc()}")
+                                print(f"[LevelEditor/key handler (IN POPUP)] ERROR: {traceback.format_exc()}")
+                                self.running = False
                             
-                else: continue                
+                    else: continue                
                 
-                if self.rerender_needed and self.focused_popup is None: # rerender if stuff changed
-                    self.render_main_editor()
-                    self.render_bottom_menu()
-                    self.rerender_needed = False
+                    if self.rerender_needed and self.focused_popup is None: # rerender if stuff changed
+                        self.render_main_editor()
+                        self.render_bottom_menu()
+                        self.rerender_needed = False
+        finally:
+            # every way out of the loop (including the error paths above) waits for the level file to be written
+            self.journal.close()
@@ -4,6 +4,7 @@ import os
 from logger import Logger
 from render.texture_manager import TextureManager
 from render.camera_frame import CameraFrame
+from render.frame_pool import FramePool
 from render.constants import CameraConstants
 from draw_utils import print3
 from render.utils import fcode_opt as fco
@@ -36,6 +37,8 @@ class LevelSettingsPopup:
         """ Contains the state of the current input. Updates field on level obj as user types. """
         
         self.last_frame = frame
+        self.frame_pool = FramePool((frame.width, frame.height), frame.pos)
+        """ Buffers the popup is drawn into on each render (on top of a copy of the last frame) """
 
         self.selected_option = 0 
         """ 0 for song input, 1 for edit color chnls btn, 2 for Save&back, 3 for Save&Close editor """
@@ -67,7 +70,7 @@ class LevelSettingsPopup:
         #Logger.log(f"{self.width=}, {self.height=}, {self.horiz_center=}, {self.vert_center=}")
         
         # add box and title
-        new_frame = self.last_frame.copy()
+        new_frame = self.last_frame.copy(into=self.frame_pool.acquire(avoid=self.last_frame))
         new_frame.add_rect(
             LevelSettingsPopup.BG_COLOR,
             self.left, self.top, self.width, self.height,
@@ -167,7 +170,7 @@ class LevelSettingsPopup:
             self.curr_input = self.curr_input[:-1]
             
             # redraw the input box
-            new_frame = self.last_frame.copy()
+            new_frame = self.last_frame.copy(into=self.frame_pool.acquire(avoid=self.last_frame))
             temp_color = [c+1 for c in LevelSettingsPopup.SELECTED_OPTION_BG_COLOR[:3]]
             new_frame.add_rect(
                 temp_color, # very stupid, but forces the frame to rerender this, covering
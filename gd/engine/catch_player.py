@@ -55,6 +55,7 @@ def crossing_intval(num1: float, num2: float) -> bool:
     
     HOWEVER: if exactly one of the nums is an int, returns True. 
     """
+    num1, num2 = float(num1), float(num2)
     if num1.is_integer() and not num2.is_integer():
         return True
     if not num1.is_integer() and num2.is_integer():
@@ -3,6 +3,7 @@ from math import floor, ceil
 
 from engine.constants import EngineConstants
 from engine.collision import Collision
+from engine.hitbox_index import HitboxIndex
 from level import LevelObject
 from logger import Logger
 
@@ -14,111 +15,58 @@ class CollisionHandler:
     
     def __init__(self, game: "Game"):
         self.game = game
+        self.hitbox_index = HitboxIndex(game.level.grid)
+        """ Hitboxes of every cell of the level, for the collision queries """
         
     # IMPORTANT TODO - hitboxes rotate based on object rotation
     def generate_collisions(self) -> List[Collision]:
         """
         Generates a list of `Collision` objects which represents all the objects
         the player's hitbox currently overlaps or is touching.
-        """
         
-        collisions = []
+        The actual overlap tests (horizontal range, any-touch vs. solid top/bottom leniency) are done for the whole
+        area around the player at once by `HitboxIndex.query_overlaps`.
+        """
         
         hitbox_sizes = self.game.player.get_hitbox_size()
         
-        # Check a 2x2 of lattice cells, centered around the player's hitbox
-        # we pad the positions by 0.25 so when we are at integers, we still check the next block
-        x_range = floor(self.game.player.pos[0]-0.25), ceil(self.game.player.pos[0]+hitbox_sizes[0]+0.25)
-        y_range = floor(self.game.player.pos[1]-0.25), ceil(self.game.player.pos[1]+hitbox_sizes[1]+0.25)
-        
-        # clip the y-values to the leveldata bounds. For example, we can't check below index 0 or y>len(leveldata)
-        y_range = max(y_range[0], 0), min(y_range[1], self.game.level.height)
-        #Logger.log(f"#2^: setting y_range=max({y_range[0]}, 0), min({y_range[1]}, {len(self.game.leveldata)})." )
-        
         # useful variables
         player_left = self.game.player.pos[0]
         player_right = self.game.player.pos[0]+hitbox_sizes[0]
         player_bottom = self.game.player.pos[1]
         player_top = self.game.player.pos[1]+hitbox_sizes[1]
         
-        #Logger.log(f"Collisions: y_range is {y_range}, x_range is {x_range}.")
-        
-        for y in range(*y_range):
-            # clip x-values based on this row's length (technically all rows should be same len, but just in case)
-            curr_x_range = max(x_range[0], 0), min(x_range[1], self.game.level.length)
-            #Logger.log(f"Collisions: Entering xloop for y={y}, updated x_range is {curr_x_range}.")
-            for x in range(*curr_x_range):
-                
-                obj = self.game.level.get_object_at(x, y)
-                
-                if obj is None: continue
-                if not obj.data["hitbox_type"]: continue # completely ignore objects with no hitbox type (non-solid objects)
-                
-                #Logger.log(f"[Game/generate_collisions]: obj at x,y={x},{y} is {obj}. btw, y_range was {y_range} and leveldata has len {len(self.game.leveldata)}")
-                #Logger.log(f"^^ Grabbed self.game.leveldata[{max(len(self.game.leveldata)-y-1, 0)}][{x}]")
-                
-                # more useful variables
-                obj_left = x+obj.data["hitbox_xrange"][0]
-                obj_right = x+obj.data["hitbox_xrange"][1]
-                obj_bottom = y+obj.data["hitbox_yrange"][0]
-                obj_top = y+obj.data["hitbox_yrange"][1]
-                
-                # horiz. collision - for any hitbox type:
-                # 1. player's right passed object's left, 
-                # 2. but player's left hasn't passed object's right.    
-                is_in_horiz_range = player_right > obj_left and player_left < obj_right
-                
-                #Logger.log(f"   ^^ Its l,r,b,t are {obj_left:.2f},{obj_right:.2f},{obj_bottom:.2f},{obj_top:.2f}. is_in_horiz_range is {is_in_horiz_range}.")
-                #Logger.log(f"   ^^ Player info: l,r,b,t are {player_left:.2f},{player_right:.2f},{player_bottom:.2f},{player_top:.2f}.")
-                
-                if not is_in_horiz_range: continue # ignore if we aren't in horizontal range
-
-                # postcond: we are in the horizontal range of the object
-                # thus, if we are also in hostile vertical range, count as a collision.
-
-                if obj.data["hitbox_type"] == "any-touch":
-                    # vert. collision (FOR ANYTOUCH OBJECTS ONLY):
-                    # 1. player's top passed object's bottom,
-                    # 2. but player's bottom hasn't passed object's top.
-                    if player_top > obj_bottom and player_bottom < obj_top:
-                        collisions.append(Collision(obj))
-                        
-                    # else: nothing happens (not in y-range)
-
-                elif obj.data["hitbox_type"] == "solid":
-                    
-                    # useful variables
-                    object_top_leniency = obj_top-EngineConstants.SOLID_SURFACE_LENIENCY
-                    object_bottom_leniency = obj_bottom+EngineConstants.SOLID_SURFACE_LENIENCY
-                    
-                    # vert. collision (FOR SOLID OBJECTS ONLY):
-                    # - if player's bottom is in the range [object_top - leniency, object_top]
-                    #   ^ then we count this as a "top" collision
-                    # - if player's top is in the range [object_bottom, object_bottom + leniency]
-                    #   ^ then we count this as a "bottom" collision 
-                    # - if either the player's bottom or top are between:
-                    #    * its leniency range and...
-                    #    * the opposite side, THEN: count as reg. collution
-                    #
-                    # these SHOUld be mutually exclusive ranges (cant be both at once)
-                    
-                    #Logger.log(f"   cond1: {object_top_leniency:.2f} < {player_bottom:.2f} <= {obj_top:.2f}")
-                    #Logger.log(f"   cond2: {obj_bottom:.2f} <= {player_top:.2f} < {object_bottom_leniency:.2f}")
-                    #Logger.log(f"   cond3: {object_bottom_leniency:.2f} < {player_top:.2f} < {obj_top:.2f}")
-                    
-                    if object_top_leniency < player_bottom <= obj_top:
-                        collisions.append(Collision(obj, "top", obj_top))
-                    
-                    elif obj_bottom <= player_top < object_bottom_leniency:
-                        collisions.append(Collision(obj, "bottom", obj_bottom))
-                        
-                    elif object_bottom_leniency <= player_top <= obj_top or obj_bottom <= player_bottom <= object_top_leniency:
-                        collisions.append(Collision(obj))
+        grid = self.game.level.grid
+        return [
+            Collision(LevelObject(grid, x, y), vert_side, vert_coord)
+            for x, y, vert_side, vert_coord in self.hitbox_index.query_overlaps(player_left, player_right, player_bottom, player_top)
+        ]
 
-                    # else: nothing happens (not in y-range)
+    def get_swept_timedelta(self, timedelta: float) -> float:
+        """
+        How much of `timedelta` the next tick can simulate without the player skipping past a hitbox (see `HitboxIndex.sweep`).
+        Returns `timedelta` itself if nothing is in the way (or `EngineConstants.SWEPT_COLLISIONS` is off), otherwise
+        just enough to get slightly past the time of impact, so the next `generate_collisions` sees the object.
+        
+        Uses the player's velocity at the start of the tick, which is close enough since a split tick is short.
+        """
+        
+        if not EngineConstants.SWEPT_COLLISIONS:
+            return timedelta
         
-        #Logger.log(f"Collisions END: player is touching {[(collision.obj.data['name'],collision.vert_side,collision.vert_coord) if collision is not None else 'None' for collision in collisions]}.")
-        return collisions
+        player = self.game.player
+        dx = player.speed * EngineConstants.BLOCKS_PER_SECOND * timedelta
+        dy = player.yvel * timedelta
+        if abs(dx) < EngineConstants.SWEPT_MIN_MOTION and abs(dy) < EngineConstants.SWEPT_MIN_MOTION:
+            return timedelta
+        
+        hitbox_sizes = player.get_hitbox_size()
+        impacts = self.hitbox_index.sweep(player.pos[0], player.pos[0]+hitbox_sizes[0], player.pos[1], player.pos[1]+hitbox_sizes[1], dx, dy)
+        if len(impacts) == 0:
+            return timedelta
+        
+        overshoot = EngineConstants.SWEPT_OVERSHOOT / max(abs(dx), abs(dy)) # as a fraction of the motion
+        return min(timedelta, (impacts[0][0] + overshoot) * timedelta)
 
     def run_collision_effect(self, collision: Collision):
         """ Applies the actual effect of `collision` onto the player """
@@ -215,13 +163,8 @@ class CollisionHandler:
         
         #Logger.log(f"highest solid obj: player pos is {self.game.player.pos[0]:2f},{self.game.player.pos[1]:2f}, left->right is {left}->{right}, top is {top}, num_rows_to_check is {num_rows_to_check}.")
         
-        for y in range(top, max(-1, top-num_rows_to_check-1), -1): # go from top row downard so we wind up with the highest block
-            for x in range(left, right+1):
-                if (obj := self.game.level.get_object_at(x, y)) is not None:
-                    if obj.data.get("hitbox_type") == "solid":
-                        return obj # return first SOLID object we find (since it is leftmost and highest)
-        
-        return None
+        cell = self.hitbox_index.highest_solid_cell(left, right, top, top-num_rows_to_check)
+        return LevelObject(self.game.level.grid, *cell) if cell is not None else None
     
     def lowest_solid_object_above_player(self, timedelta: float) -> "LevelObject | None":
         """
@@ -256,13 +199,6 @@ class CollisionHandler:
         num_rows_to_check = ceil(abs(self.game.player.yvel) * timedelta)
         
         
-        for y in range(bottom, bottom+num_rows_to_check+1):
-            for x in range(left, right+1):
-                try:
-                    if (obj := self.game.level.get_object_at(x, y)) is not None:
-                        if obj.data.get("hitbox_type") == "solid":
-                            return obj # return first SOLID object we find 
-                except IndexError:
-                    Logger.log(f">>>>><<<<< [lowest solid obj index error: attempted to get idx {x},{y} but failed.")
-        return None
+        cell = self.hitbox_index.lowest_solid_cell(left, right, bottom, bottom+num_rows_to_check)
+        return LevelObject(self.game.level.grid, *cell) if cell is not None else None
     
\ No newline at end of file
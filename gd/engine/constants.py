@@ -57,7 +57,21 @@ class EngineConstants:
     SOLID_SURFACE_LENIENCY = 0.2
     """ How much we can "fall into/jump into" a solid object before we are considered to have crashed into it instead of gliding on top. kinda buggy when yvel changes a lot. """
     
-    PHYSICS_FRAMERATE = 60
+    PHYSICS_TICK_RATE = 240
+    """ Physics ticks per second. Every tick simulates exactly 1/PHYSICS_TICK_RATE seconds, no matter how often the physics thread actually gets to run. """
+    MAX_PHYSICS_CATCHUP = 0.25
+    """ Max seconds of real time that get simulated in one go (e.g. after a lag spike). Anything past that is dropped,
+    so a few slow ticks can't snowball into more and more ticks per update (spiral of death). """
+    
+    SWEPT_COLLISIONS = True
+    """ If True, ticks where the player moves far enough to skip past a hitbox get split at the time of impact
+    (see `CollisionHandler.get_swept_timedelta`), so nothing gets tunneled through at low tick rates or after lag spikes. """
+    SWEPT_MIN_MOTION = 0.25
+    """ Ticks that move the player less than this (blocks, on both axes) never get split - the regular collision check already looks this far around the player. """
+    SWEPT_OVERSHOOT = 0.05
+    """ How far (blocks) past the time of impact a split tick goes, so the collision check after it sees the player inside the hitbox. """
+    SWEPT_MAX_SUBSTEPS = 8
+    """ Max pieces a single tick gets split into """
 
 class SPEEDS:
     half = 0.8
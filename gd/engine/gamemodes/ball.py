@@ -1,5 +1,4 @@
 from logger import Logger
-from time import time_ns
 from typing import TYPE_CHECKING
 from engine.constants import EngineConstants
 from engine.catch_player import catch_player
@@ -68,7 +67,7 @@ def tick_ball(player: "Player", timedelta: float) -> None:
         player.jump_requested = False
         
     if not player.in_air:
-        player.last_on_ground_time = time_ns()
+        player.last_on_ground_time = player.physics_time
     
     catch_player(player, timedelta)
     player.pos[1] += player.yvel * timedelta
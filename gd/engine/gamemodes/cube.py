@@ -1,5 +1,4 @@
 from math import floor
-from time import time_ns
 from typing import TYPE_CHECKING
 
 from logger import Logger
@@ -74,7 +73,7 @@ def tick_cube(player: "Player", timedelta: float) -> None:
         player.jump_requested = False
         
     if not player.in_air:
-        player.last_on_ground_time = time_ns()
+        player.last_on_ground_time = player.physics_time
     
     #Logger.log(f"[BEFORE CATCH] player ypos={player.pos[1]}, yvel = {player.yvel} grav={player.gravity}")
     catch_player(player, timedelta)
@@ -1,5 +1,4 @@
 from logger import Logger
-from time import time_ns
 from typing import TYPE_CHECKING
 from keyboard.keyboard_listener import KeyboardListener
 from engine.constants import EngineConstants
@@ -54,7 +53,6 @@ def tick_ship(player: "Player", timedelta: float) -> None:
         # we have to override here because catch player determines direction based on accel
     
         player.pos[1] += player.yvel * timedelta
-        Logger.log(f"[SHIPPPPPPPPP AFTER CATCH] player ypos={player.pos[1]}, yvel={player.yvel} grav={player.gravity}")
         #Logger.log(f"[2] wave yvel: {player.yvel:.2f}, pos={player.pos[0]:.2f},{player.pos[1]:.2f}")
         if player.pos[1] < 0: # catch spasming on ground (for animation function)
             player.yvel = 0
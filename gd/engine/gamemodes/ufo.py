@@ -1,5 +1,4 @@
 from logger import Logger
-from time import time_ns
 from engine.catch_player import catch_player
 from typing import TYPE_CHECKING
 from engine.constants import EngineConstants
@@ -67,7 +66,7 @@ def tick_ufo(player: "Player", timedelta: float) -> None:
         player.jump_requested = False
         
     if not player.in_air:
-        player.last_on_ground_time = time_ns()
+        player.last_on_ground_time = player.physics_time
     
     #Logger.log(f"End of tick: updating pos[1] to {player.pos[1]:.4f} since yvel={player.yvel:.4f} and timedelta={timedelta:.4f}")
     catch_player(player, timedelta, gravity_override='falling' if player.yvel < 0 else 'rising')
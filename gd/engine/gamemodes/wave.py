@@ -1,5 +1,4 @@
 from logger import Logger
-from time import time_ns
 from typing import TYPE_CHECKING
 from keyboard.keyboard_listener import KeyboardListener
 from engine.constants import EngineConstants
@@ -0,0 +1,213 @@
+from typing import List, Tuple
+from math import floor, ceil
+import numpy as np
+
+from engine.constants import EngineConstants
+from level_grid import LevelGrid
+
+class HitboxIndex:
+    """
+    Absolute hitbox edges of every cell of a level, so collision checks can look at a whole region in a few numpy ops
+    instead of going through `Level.get_object_at` + `obj.data[...]` cell by cell.
+
+    `cells` is a structured array indexed `[y, x]` like the `LevelGrid` arrays. Built in blocks of columns the first time
+    a query touches them (lazy levels only get their chunks loaded as the player gets to them).
+    Hitboxes depend only on the object type, so the level must not be edited while an index of it is in use.
+    """
+
+    KIND_NONE = 0
+    KIND_ANY_TOUCH = 1
+    KIND_SOLID = 2
+    KINDS = {None: KIND_NONE, "any-touch": KIND_ANY_TOUCH, "solid": KIND_SOLID}
+    """ hitbox_type (see `engine.objects`) -> kind code stored in `cells["kind"]` """
+
+    DTYPE = np.dtype([("left", np.float64), ("right", np.float64), ("bottom", np.float64), ("top", np.float64), ("kind", np.uint8)])
+
+    TYPE_HITBOXES: np.ndarray = None
+    """ type id (see `LevelGrid.TYPE_NAMES`) -> hitbox relative to the bottom left of its cell. Filled in below the class """
+
+    BLOCK_WIDTH = 64
+    """ Columns built at a time """
+
+    MAX_SCALAR_QUERY_CELLS = 64
+    """ Queries over more cells than this use whole-array numpy masks, smaller ones check cell by cell (see `query_overlaps`) """
+
+    def __init__(self, grid: LevelGrid) -> None:
+        self.grid = grid
+        self.cells = np.zeros((grid.height, grid.length), dtype=HitboxIndex.DTYPE)
+        self.kinds = self.cells["kind"]
+        """ View of just the `kind` field """
+        self.built_blocks: List[bool] = [False] * -(-grid.length // HitboxIndex.BLOCK_WIDTH)
+
+        # column/row coordinates, added to the relative hitboxes when building
+        self._xs = np.arange(grid.length, dtype=np.float64)
+        self._ys = np.arange(grid.height, dtype=np.float64)[:, None]
+
+    def ensure_built(self, start: int, end: int) -> None:
+        """ Makes sure `cells` is filled in for the columns [start, end) """
+        for block in range(start // HitboxIndex.BLOCK_WIDTH, (end - 1) // HitboxIndex.BLOCK_WIDTH + 1):
+            if not self.built_blocks[block]:
+                self._build_block(block)
+
+    def _build_block(self, block: int) -> None:
+        start = block * HitboxIndex.BLOCK_WIDTH
+        end = min(start + HitboxIndex.BLOCK_WIDTH, self.grid.length)
+        self.grid.ensure_loaded(start, end)
+
+        relative = HitboxIndex.TYPE_HITBOXES[self.grid.type_ids[:, start:end]]
+        cells = self.cells[:, start:end]
+        cells["left"] = relative["left"] + self._xs[start:end]
+        cells["right"] = relative["right"] + self._xs[start:end]
+        cells["bottom"] = relative["bottom"] + self._ys
+        cells["top"] = relative["top"] + self._ys
+        cells["kind"] = relative["kind"]
+        self.built_blocks[block] = True
+
+    def _clip(self, x0: int, x1: int, y0: int, y1: int) -> Tuple[int, int, int, int]:
+        """ Clips a cell range [x0, x1) x [y0, y1) to the level, and builds it """
+        x0, x1 = max(x0, 0), min(x1, self.grid.length)
+        y0, y1 = max(y0, 0), min(y1, self.grid.height)
+        if x0 < x1:
+            self.ensure_built(x0, x1)
+        return x0, x1, y0, y1
+
+    def query_overlaps(self, left: float, right: float, bottom: float, top: float) -> List[Tuple[int, int, str | None, float | None]]:
+        """
+        Every object whose hitbox overlaps (or, for solid objects, is touching) the AABB [left, right] x [bottom, top].
+        Returns (x, y, vert_side, vert_coord) in the same order and with the same rules as the old cell-by-cell check in
+        `CollisionHandler.generate_collisions` - see there for what `vert_side`/`vert_coord` mean.
+        """
+
+        # same cells the old loop checked: everything within 0.25 of the AABB
+        x0, x1, y0, y1 = self._clip(floor(left-0.25), ceil(right+0.25), floor(bottom-0.25), ceil(top+0.25))
+        if x0 >= x1 or y0 >= y1:
+            return []
+
+        region = self.cells[y0:y1, x0:x1]
+        if region.size > HitboxIndex.MAX_SCALAR_QUERY_CELLS:
+            return self._query_overlaps_vectorized(region, x0, y0, left, right, bottom, top)
+
+        # for the usual few cells around the player, numpy's per-call overhead is more than the checks themselves,
+        # so get every cell's hitbox in one go and check them as python floats
+        leniency = EngineConstants.SOLID_SURFACE_LENIENCY
+        overlaps = []
+        for y, row in enumerate(region.tolist(), y0):
+            for x, (obj_left, obj_right, obj_bottom, obj_top, kind) in enumerate(row, x0):
+                if kind == HitboxIndex.KIND_NONE or not (right > obj_left and left < obj_right):
+                    continue
+
+                if kind == HitboxIndex.KIND_ANY_TOUCH:
+                    if top > obj_bottom and bottom < obj_top:
+                        overlaps.append((x, y, None, None))
+
+                elif obj_top-leniency < bottom <= obj_top:
+                    overlaps.append((x, y, "top", obj_top))
+                elif obj_bottom <= top < obj_bottom+leniency:
+                    overlaps.append((x, y, "bottom", obj_bottom))
+                elif obj_bottom+leniency <= top <= obj_top or obj_bottom <= bottom <= obj_top-leniency:
+                    overlaps.append((x, y, None, None))
+        return overlaps
+
+    def _query_overlaps_vectorized(self, region: np.ndarray, x0: int, y0: int, left: float, right: float, bottom: float, top: float) -> List[Tuple[int, int, str | None, float | None]]:
+        """ `query_overlaps` for big regions, as whole-array masks """
+
+        kind = region["kind"]
+        obj_left, obj_right, obj_bottom, obj_top = region["left"], region["right"], region["bottom"], region["top"]
+        leniency = EngineConstants.SOLID_SURFACE_LENIENCY
+
+        in_horiz_range = (kind != HitboxIndex.KIND_NONE) & (right > obj_left) & (left < obj_right)
+
+        any_touch = in_horiz_range & (kind == HitboxIndex.KIND_ANY_TOUCH) & (top > obj_bottom) & (bottom < obj_top)
+
+        solid = in_horiz_range & (kind == HitboxIndex.KIND_SOLID)
+        top_side = solid & (obj_top - leniency < bottom) & (bottom <= obj_top)
+        bottom_side = solid & ~top_side & (obj_bottom <= top) & (top < obj_bottom + leniency)
+        inside = solid & ~top_side & ~bottom_side & (
+            ((obj_bottom + leniency <= top) & (top <= obj_top)) | ((obj_bottom <= bottom) & (bottom <= obj_top - leniency))
+        )
+
+        overlaps = []
+        for y, x in zip(*np.nonzero(any_touch | top_side | bottom_side | inside)):
+            if top_side[y, x]:
+                overlaps.append((x0 + int(x), y0 + int(y), "top", float(obj_top[y, x])))
+            elif bottom_side[y, x]:
+                overlaps.append((x0 + int(x), y0 + int(y), "bottom", float(obj_bottom[y, x])))
+            else:
+                overlaps.append((x0 + int(x), y0 + int(y), None, None))
+        return overlaps
+
+    def highest_solid_cell(self, left: int, right: int, top: int, bottom: int) -> Tuple[int, int] | None:
+        """ (x, y) of the highest solid object in columns [left, right] and rows [bottom, top] (inclusive).
+        Leftmost one if there are several at that height. None if there aren't any. """
+
+        x0, x1, y0, y1 = self._clip(left, right + 1, bottom, top + 1)
+        if x0 >= x1 or y0 >= y1:
+            return None
+
+        rows = self.kinds[y0:y1, x0:x1].tolist()
+        for y in range(len(rows) - 1, -1, -1):
+            if HitboxIndex.KIND_SOLID in rows[y]:
+                return x0 + rows[y].index(HitboxIndex.KIND_SOLID), y0 + y
+        return None
+
+    def lowest_solid_cell(self, left: int, right: int, bottom: int, top: int) -> Tuple[int, int] | None:
+        """ (x, y) of the lowest solid object in columns [left, right] and rows [bottom, top] (inclusive).
+        Leftmost one if there are several at that height. None if there aren't any. """
+
+        x0, x1, y0, y1 = self._clip(left, right + 1, bottom, top + 1)
+        if x0 >= x1 or y0 >= y1:
+            return None
+
+        for y, row in enumerate(self.kinds[y0:y1, x0:x1].tolist(), y0):
+            if HitboxIndex.KIND_SOLID in row:
+                return x0 + row.index(HitboxIndex.KIND_SOLID), y
+        return None
+
+    def sweep(self, left: float, right: float, bottom: float, top: float, dx: float, dy: float) -> List[Tuple[float, int, int]]:
+        """
+        Moves the AABB [left, right] x [bottom, top] by (dx, dy), and returns (time of impact, x, y) for every hitbox it runs into
+        along the way, earliest first. Time of impact is the fraction (0-1] of the motion at which the AABB starts overlapping the hitbox.
+        Hitboxes it already overlaps or touches at the start aren't included (the regular collision check handles those).
+        """
+
+        x0, x1, y0, y1 = self._clip(
+            floor(min(left, left+dx)), ceil(max(right, right+dx)),
+            floor(min(bottom, bottom+dy)), ceil(max(top, top+dy))
+        )
+        if x0 >= x1 or y0 >= y1:
+            return []
+
+        region = self.cells[y0:y1, x0:x1]
+        ys, xs = np.nonzero(region["kind"])
+        if len(ys) == 0:
+            return []
+
+        candidates = region[ys, xs]
+        entry_x, exit_x = _get_slab_times(left, right, dx, candidates["left"], candidates["right"])
+        entry_y, exit_y = _get_slab_times(bottom, top, dy, candidates["bottom"], candidates["top"])
+        entry, exit = np.maximum(entry_x, entry_y), np.minimum(exit_x, exit_y)
+
+        hit = np.flatnonzero((entry < exit) & (entry > 0) & (entry <= 1))
+        hit = hit[np.argsort(entry[hit], kind="stable")]
+        return [(float(entry[i]), x0 + int(xs[i]), y0 + int(ys[i])) for i in hit]
+
+def _get_slab_times(lo: float, hi: float, d: float, obj_lo: np.ndarray, obj_hi: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """ When (as fractions of the motion) [lo, hi] moving by d starts and stops overlapping each [obj_lo, obj_hi] on one axis """
+    if d > 0:
+        return (obj_lo - hi) / d, (obj_hi - lo) / d
+    if d < 0:
+        return (obj_hi - lo) / d, (obj_lo - hi) / d
+
+    # not moving on this axis: either always overlapping or never
+    overlapping = (hi > obj_lo) & (lo < obj_hi)
+    return np.where(overlapping, -np.inf, np.inf), np.where(overlapping, np.inf, -np.inf)
+
+def _get_type_hitboxes() -> np.ndarray:
+    hitboxes = np.zeros(len(LevelGrid.TYPE_DATA), dtype=HitboxIndex.DTYPE)
+    for type_id, data in enumerate(LevelGrid.TYPE_DATA):
+        if data is None or not data.get("hitbox_type"):
+            continue
+        hitboxes[type_id] = (*data["hitbox_xrange"], *data["hitbox_yrange"], HitboxIndex.KINDS[data["hitbox_type"]])
+    return hitboxes
+
+HitboxIndex.TYPE_HITBOXES = _get_type_hitboxes()
@@ -1,5 +1,4 @@
 from typing import List, Tuple, TYPE_CHECKING
-from time import time_ns, time
 from copy import deepcopy
 
 from logger import Logger
@@ -57,6 +56,9 @@ class Player:
         self.ORIGINAL_START_POS = copy(start_settings["position"])
         self.pos = copy(start_settings["position"])
         """ [x, y], where x is horiz (progress). BOTTOM LEFT of player. y=0 means on the ground, and y cannot be negative."""
+        self.prev_pos = copy(self.pos)
+        """ Where the player was before the latest fixed physics step (set by `Game.physics_update`, so swept sub-steps don't move it).
+        The renderer interpolates between this and `pos` (see `get_interpolated_pos`) """
 
         self.yvel = 0
         Logger.log(f"start settings grav is {start_settings['gravity']}")
@@ -66,8 +68,10 @@ class Player:
         self.jump_requested = False
         """ variable to store when the player jumps before the next physics tick. """
 
+        self.physics_time = 0
+        """ Seconds of simulated time (sum of every tick's timedelta). Animations use this instead of the wall clock, so ticks are deterministic. """
         self.last_on_ground_time = 0
-        """ Stores the latest time when self.in_air was set to False. Used for calculating cube rotation as we are falling. """
+        """ `physics_time` of the latest tick where self.in_air was False. Used for calculating cube rotation as we are falling. """
         self.in_air = False
         """ If the player is currently jumping. can't double jump. Jump status is reset to false when the player hits a glidable hitbox. """
 
@@ -85,7 +89,15 @@ class Player:
         if tickfunc is None:
             raise Exception(f"[Player/tick] gamemode {self.gamemode} not set up in Player.tick()")
 
+        self.physics_time += timedelta
         tickfunc(self, timedelta)
+
+    def get_interpolated_pos(self, alpha: float) -> List[float]:
+        """ Position `alpha` (0-1) of the way from `prev_pos` to `pos`, for rendering in between physics ticks. """
+        return [
+            self.prev_pos[0] + (self.pos[0] - self.prev_pos[0]) * alpha,
+            self.prev_pos[1] + (self.pos[1] - self.prev_pos[1]) * alpha
+        ]
         
     def get_dist_from_start(self) -> float:
         """ Get the TRUE distance from the player's starting position, since we start at a negative x. """
@@ -99,6 +111,7 @@ class Player:
         """
         
         self.pos = new_pos or deepcopy(self.ORIGINAL_START_POS)
+        self.prev_pos = copy(self.pos) # dont interpolate from where we died
         self.in_air = False
         self.yvel = 0
         self.jump_requested = False
@@ -107,7 +120,7 @@ class Player:
         self.gamemode = self.START_SETTINGS["gamemode"]
         self.speed = SPEEDS.decode(self.START_SETTINGS["speed"])
         self.gravity = EngineConstants.GRAVITY * (1 if self.START_SETTINGS["gravity"] == "normal" else -1)
-        self.last_on_ground_time = time_ns()
+        self.last_on_ground_time = self.physics_time
     
     def request_jump(self):
         """
@@ -163,10 +176,10 @@ class Player:
             case "cube":
                 if not self.in_air:
                     return 0
-                seconds_since_last_on_ground = (time_ns() - self.last_on_ground_time) / 1e9
+                seconds_since_last_on_ground = self.physics_time - self.last_on_ground_time
                 return int(seconds_since_last_on_ground / 0.1) % 4
             case "ball":
-                return int(time() / 0.25) % 2
+                return int(self.physics_time / 0.25) % 2
             
             case "ufo":
                 return 0
@@ -1,11 +1,11 @@
-from typing import Tuple, Literal
-import json
+from typing import List, Tuple, Literal
 from time import time_ns, sleep
 from threading import Thread
 import traceback
 import time
 
 from logger import Logger
+from profiler import Profiler
 from render.camera import Camera
 from render.utils import draw_text, draw_line
 from render.constants import CameraConstants
@@ -15,6 +15,7 @@ from engine.collision_handler import CollisionHandler
 from draw_utils import Position, draw_rect
 from img2term.main import draw
 from level import Level
+from level_index import LevelIndex
 from keyboard.keyboard_listener import KeyboardListener
 from keyboard.key_event import KeyEvent
 from practice_mode import PracticeMode
@@ -51,6 +52,8 @@ class Game:
         """ Set to True upon unpausing, so that the next frame completely removes the pause menu. """
         
         self.last_tick = None
+        self.physics_accumulator = 0
+        """ Real time (seconds) that hasn't been simulated yet. Physics runs in fixed steps of 1/PHYSICS_TICK_RATE, so there's usually a bit left over. """
         
         self.level_complete = False
         
@@ -89,39 +92,49 @@ class Game:
         # remove the most recent checkpoint if a user attempts to
         elif str(event) in GDConstants.REMOVE_CHECKPOINT_KEYS and self.practice_mode:
             self.practicemodeobj.remove_checkpoint()
+        elif str(event) in GDConstants.PROFILER_HUD_KEYS:
+            Profiler.toggle_hud()
         elif str(event) in GDConstants.JUMP_KEYS:
-            
-            something_got_activated = False
-            
-            # also go through the player's current collisions and
-            # activate the first requires_click effect where "has_been_activated" is False
-            for collision in self.player.curr_collisions:
-                if collision.obj.data.get("requires_click"):
-                    
-                    if collision.obj.data.get("multi_activate"): # always run effect if multi_activate
-                        self.collision_handler.run_collision_effect(collision)
-                        something_got_activated = True
-                        break # can only perform one action per jump
-                    
-                    if not collision.has_been_activated: # run effect if not multi_activate and not activated
-                        self.collision_handler.run_collision_effect(collision)
-                        something_got_activated = True
-                        collision.has_been_activated = True
-                        self.activated_objects.append(collision.obj)
-                        break # can only perform one action per jump
-                    
-            if self.player.gamemode == 'wave':
-                # add to wave trail pivots if in wave gamemode
-                self.player.create_wave_pivot()
-            
-            # if nothing got activated, then jump
-            if not something_got_activated:
-                self.player.request_jump()
+            self.press_jump()
     
     def _main_keyup_handler(self, event: KeyEvent) -> None:
         if str(event) in GDConstants.JUMP_KEYS:
-            if self.player.gamemode == 'wave':
-                self.player.create_wave_pivot()
+            self.release_jump()
+
+    def press_jump(self) -> None:
+        """ Runs when the jump key gets pressed: activates the first orb/pad/etc. the player is touching that needs a click, or jumps if there isn't one. """
+        
+        something_got_activated = False
+        
+        # also go through the player's current collisions and
+        # activate the first requires_click effect where "has_been_activated" is False
+        for collision in self.player.curr_collisions:
+            if collision.obj.data.get("requires_click"):
+                
+                if collision.obj.data.get("multi_activate"): # always run effect if multi_activate
+                    self.collision_handler.run_collision_effect(collision)
+                    something_got_activated = True
+                    break # can only perform one action per jump
+                
+                if not collision.has_been_activated: # run effect if not multi_activate and not activated
+                    self.collision_handler.run_collision_effect(collision)
+                    something_got_activated = True
+                    collision.has_been_activated = True
+                    self.activated_objects.append(collision.obj)
+                    break # can only perform one action per jump
+                
+        if self.player.gamemode == 'wave':
+            # add to wave trail pivots if in wave gamemode
+            self.player.create_wave_pivot()
+        
+        # if nothing got activated, then jump
+        if not something_got_activated:
+            self.player.request_jump()
+
+    def release_jump(self) -> None:
+        """ Runs when the jump key gets released """
+        if self.player.gamemode == 'wave':
+            self.player.create_wave_pivot()
 
     def start_level(self) -> None:
         """
@@ -180,36 +193,11 @@ class Game:
                     Logger.log(f"[Render Thread] ERROR: {traceback.format_exc()}")
                     self.exiting = True    
 
-        def check_if_level_complete():
-            if self.player.pos[0]-EngineConstants.END_OF_LEVEL_PADDING>=self.level.length:
-
-                self.running = False
-                self.audio_handler.stop_song_and_play_win_sfx()
-                
-                self.level_complete = True
-                
-                # TODO - this is bad code but its 5 am
-                # popup goes from 20%, 20% -> 80%, 80%
-                horiz_center = int(self.camera.curr_frame.width*0.5)
-                vert_center = int(self.camera.curr_frame.height*0.5)
-                
-                popup_width = int(self.camera.curr_frame.width*0.6)
-                popup_height = int(self.camera.curr_frame.height*0.6)
-                
-                new_frame=self.camera.curr_frame.copy()
-                new_frame.add_rect((147, 120, 78, 255), horiz_center, vert_center, popup_width, popup_height, anchor="center", outline_color=(255, 255, 255), outline_width=2)
-                new_frame.add_text(int(new_frame.width*0.5), int(new_frame.height*0.3), TextureManager.font_title, 'Level Complete!', color=(25, 225, 25))
-                new_frame.add_text(int(new_frame.width*0.5), int(new_frame.height*0.5), TextureManager.font_small1, f"Attempts: {self.attempt_number}")
-                new_frame.add_text(int(new_frame.width*0.5), int(new_frame.height*0.7), TextureManager.font_small1, f"Esc to quit")
-                new_frame.render(self.camera.curr_frame)                
-
-                self.highest_percent_this_session = 100
-                self.write_highest_progress_to_file()
-
         def physics_thread():
+            dt = 1/EngineConstants.PHYSICS_TICK_RATE
+            
             while True:
                 try:
-                    #Logger.log(f"running physics tick. player pos is {self.player.pos[0]:.2f},{self.player.pos[1]:.2f}, time_ns is {time_ns()}")
                     if self.exiting:
                         self.audio_handler.stop_playing_song()
                         self.write_highest_progress_to_file() # IMPORTANT - must do this before stopping listener,
@@ -219,62 +207,27 @@ class Game:
                         break
                     
                     if self.is_crashed or not self.running:
-                        #Logger.log(f"[Physics Thread] Physics paused due to is_crashed being true. player@{[f'{num:2f}' for num in self.player.pos]}.")
-                        sleep(0.01) # TODO - replace with continue or alternatively sleep until crash period ends
+                        sleep(0.01)
                         self.last_tick = time_ns() # keep last_tick updated so we dont get a huge jump in time when we unpause
+                        self.physics_accumulator = 0
                         continue
-                        # continuing here is a bad idea, because we need to sleep to prevent the thread from running too fast
-                        # and slowing everything down.
-                    #try:
-                    self.highest_percent_this_session = max(self.highest_percent_this_session, self.get_progress_percentage())
-                    #except:
-                    #    Logger.log(f"[Physics Thread] ERROR: {traceback.format_exc()}")
-                    # check if the level is complete
-                    check_if_level_complete()
                     
-                    self.level.check_color_triggers(self.player.pos[0])
-
-                    # check collisions
-                    self.player.curr_collisions = self.collision_handler.generate_collisions()
-                    
-                    # apply collision effects
-                    for collision in self.player.curr_collisions:                    
-                        # don't auto-run effect here if it requires click. That's a job for the key input thread.
-                        
-                        # run effect if it doesn't require click, unless it's already been activated and not multi_activate
-                        if not collision.obj.data.get("requires_click") and not(collision.obj.has_been_activated and not collision.obj.data.get("multi_activate")):
-                            self.collision_handler.run_collision_effect(collision)
-                            collision.obj.has_been_activated = True
-                            self.activated_objects.append(collision.obj)
-                    
-                    # after collisions is updated, tick physics.                
+                    # last_tick first: crashing resets it (and the accumulator) during the steps, which has to win
                     curr_time = time_ns()
-                    try:
-                        self.player.tick((curr_time - self.last_tick)/1e9)
-                        Logger.log(f"tick timedelta: {(curr_time - self.last_tick)/1e9:.2f}, player x,y: {self.player.pos[0]:.2f},{self.player.pos[1]:.2f}, yvel: {self.player.yvel:.2f}")
-                    except:
-                        Logger.log(f"tick error: {traceback.format_exc()}")
-                        self.exiting = True
-                    
+                    elapsed = (curr_time - self.last_tick)/1e9
                     self.last_tick = curr_time
+                    self.advance_physics(elapsed, dt)
                     
-                    # if player ypos > max level y, crash
-                    if self.player.pos[1] > EngineConstants.MAX_LEVEL_Y:
-                        Logger.log(f"[Physics Thread] Player ypos > max level y. Crashing.")
-                        self.crash()
-
-                    _tps_str = f"{1e9/((curr_time-self.last_tick)):.2f}" if (curr_time-self.last_tick != 0) else "inf"
-                    #Logger.log(f"[Physics Thread] Player ticked. pos={self.player.pos[0]:.2f},{self.player.pos[1]:.2f}, yvel={self.player.yvel:.2f}, TPS: {_tps_str}")
-                    
-                    # DO NOT REMOVE. removing this slows down the renderer by A LOT
-                    # even if the physics fps is like 389429 it still speeds things up a lot
-                    # to have this sleep here. DONT ASK ME WHY IDK EITHER
-                    sleep(1/EngineConstants.PHYSICS_FRAMERATE)
+                    # sleep until the next step is due. sleeping releases the GIL, so the render thread
+                    # gets to run in the meantime instead of fighting the physics thread for it
+                    sleep(max(0, dt - self.physics_accumulator))
                 except Exception as e:
                     Logger.log(f"[Physics Thread] ERROR: {traceback.format_exc()}")
                     self.exiting = True
                     break
         
+        Profiler.set_label(self.level.metadata["name"]) # group this run's timings under the level
+        
         self.last_tick = time_ns()
         Thread(target=render_thread).start()
         Thread(target=physics_thread).start()
@@ -285,6 +238,106 @@ class Game:
         KeyboardListener.start()
         
         KeyboardListener.listener.join()
+        Profiler.set_label("menus")
+
+    def complete_level(self) -> None:
+        """ Runs when the player reaches the end of the level: stops the game and shows the level complete popup """
+
+        self.running = False
+        self.audio_handler.stop_song_and_play_win_sfx()
+        
+        self.level_complete = True
+        
+        # TODO - this is bad code but its 5 am
+        # popup goes from 20%, 20% -> 80%, 80%
+        horiz_center = int(self.camera.curr_frame.width*0.5)
+        vert_center = int(self.camera.curr_frame.height*0.5)
+        
+        popup_width = int(self.camera.curr_frame.width*0.6)
+        popup_height = int(self.camera.curr_frame.height*0.6)
+        
+        new_frame=self.camera.get_overlay_frame()
+        new_frame.add_rect((147, 120, 78, 255), horiz_center, vert_center, popup_width, popup_height, anchor="center", outline_color=(255, 255, 255), outline_width=2)
+        new_frame.add_text(int(new_frame.width*0.5), int(new_frame.height*0.3), TextureManager.font_title, 'Level Complete!', color=(25, 225, 25))
+        new_frame.add_text(int(new_frame.width*0.5), int(new_frame.height*0.5), TextureManager.font_small1, f"Attempts: {self.attempt_number}")
+        new_frame.add_text(int(new_frame.width*0.5), int(new_frame.height*0.7), TextureManager.font_small1, f"Esc to quit")
+        new_frame.render(self.camera.curr_frame)                
+
+        self.highest_percent_this_session = 100
+        self.write_highest_progress_to_file()
+
+    def advance_physics(self, elapsed: float, dt: float) -> None:
+        """ Adds `elapsed` seconds of real time to the physics accumulator, then simulates it in fixed steps of `dt`.
+        Whatever is left over (less than one step) carries over to the next call. """
+        
+        self.physics_accumulator += min(elapsed, EngineConstants.MAX_PHYSICS_CATCHUP)
+        
+        while self.physics_accumulator >= dt and self.running and not self.is_crashed and not self.exiting:
+            self.physics_accumulator -= dt # before the step, since crashing resets the accumulator
+            self.physics_update(dt)
+
+    def physics_update(self, dt: float) -> None:
+        """ Simulates `dt` seconds. Usually one physics step, but with swept collisions the step gets split
+        wherever the player would otherwise skip past a hitbox (see `CollisionHandler.get_swept_timedelta`) """
+        
+        # interpolate across the whole step, not just its last sub-step
+        self.player.prev_pos[0], self.player.prev_pos[1] = self.player.pos
+        
+        attempt_number = self.attempt_number # changes if the level gets reset during a sub-step (crash, finishing the level)
+        remaining = dt
+        for _ in range(EngineConstants.SWEPT_MAX_SUBSTEPS - 1):
+            step_dt = self.collision_handler.get_swept_timedelta(remaining)
+            if step_dt >= remaining:
+                break
+            
+            self.physics_step(step_dt)
+            remaining -= step_dt
+            if not self.running or self.is_crashed or self.attempt_number != attempt_number:
+                return
+            
+        self.physics_step(remaining)
+
+    def physics_step(self, dt: float) -> None:
+        """ Runs one physics tick of exactly `dt` seconds """
+        
+        self.highest_percent_this_session = max(self.highest_percent_this_session, self.get_progress_percentage())
+        
+        # check if the level is complete
+        if self.player.pos[0]-EngineConstants.END_OF_LEVEL_PADDING>=self.level.length:
+            self.complete_level()
+        if not self.running:
+            return
+        
+        self.level.check_color_triggers(self.player.pos[0], self.player.physics_time)
+
+        # check collisions
+        start_time = Profiler.start()
+        self.player.curr_collisions = self.collision_handler.generate_collisions()
+        Profiler.stop("physics/collisions", start_time)
+        
+        # apply collision effects
+        for collision in self.player.curr_collisions:                    
+            # don't auto-run effect here if it requires click. That's a job for the key input thread.
+            
+            # run effect if it doesn't require click, unless it's already been activated and not multi_activate
+            if not collision.obj.data.get("requires_click") and not(collision.obj.has_been_activated and not collision.obj.data.get("multi_activate")):
+                self.collision_handler.run_collision_effect(collision)
+                collision.obj.has_been_activated = True
+                self.activated_objects.append(collision.obj)
+        
+        # after collisions is updated, tick physics.
+        try:
+            start_time = Profiler.start()
+            self.player.tick(dt)
+            Profiler.stop("physics/tick", start_time)
+        except:
+            Logger.log(f"tick error: {traceback.format_exc()}")
+            self.exiting = True
+        
+        # if player ypos > max level y, crash
+        if self.player.pos[1] > EngineConstants.MAX_LEVEL_Y:
+            Logger.log(f"[Physics Thread] Player ypos > max level y. Crashing.")
+            self.crash()
 
     def crash(self):
         """ Run when a player DIES (not when they click restart button) """
@@ -362,9 +415,18 @@ class Game:
         self.audio_handler.begin_playing_song()
         
         self.last_tick = time_ns() # this is to prevent moving forward while we are dead lol
+        self.physics_accumulator = 0
         
         Logger.log(f"END OF RESET LEVEL - player pos is {self.player.pos[0]:.2f},{self.player.pos[1]:.2f}")
         
+    def get_player_render_pos(self) -> List[float]:
+        """ Where the player should be drawn - interpolated between the last two physics ticks, based on how much
+        real time has passed since the latest one. Keeps movement smooth when the framerate doesn't line up with the tick rate. """
+        
+        time_since_tick = self.physics_accumulator + (time_ns() - self.last_tick)/1e9
+        alpha = min(1, max(0, time_since_tick * EngineConstants.PHYSICS_TICK_RATE))
+        return self.player.get_interpolated_pos(alpha)
+        
     def get_progress_percentage(self) -> int:
         #return 1# test
 
@@ -382,8 +444,7 @@ class Game:
         Can override which mode to save to by passing in mode_override.
         """
         
-        f = open(self.level.filepath)
-        data = json.load(f)
+        metadata = LevelIndex.get_metadata(self.level.filepath)
         
         key = 'progress_practice' if (self.practice_mode or mode_override == "practice") else 'progress_normal'
         if mode_override is not None:
@@ -391,9 +452,9 @@ class Game:
             
         Logger.log(f"writing highest progress to {key}, progress is {self.highest_percent_this_session}")
         
-        if data['metadata'][key]<self.highest_percent_this_session:
-            data['metadata'][key]=self.highest_percent_this_session/100
-            json.dump(data,open(self.level.filepath, 'w'))
+        if metadata[key]<self.highest_percent_this_session:
+            new_metadata = Level.update_metadata_in_file(self.level.filepath, {key: self.highest_percent_this_session/100})
+            LevelIndex.update(self.level.filepath, new_metadata)
             
         # update the level menu
         OfficialLevelsMenu.update_level_progress(self.level.filepath, self.highest_percent_this_session/100, key)
@@ -19,6 +19,7 @@ class GDConstants:
     PAUSE_KEYS = ['p', 'KEY_ESCAPE', 'esc'] # active in levels
     CHECKPOINT_KEYS = ['z']
     REMOVE_CHECKPOINT_KEYS = ['x']
+    PROFILER_HUD_KEYS = ['f3'] # toggles the frame time overlay (see profiler.py)
     
     NUM_BLOCK_TEXTURES = 13
     NUM_GHOST_BLOCK_TEXTURES = 1
@@ -1,6 +1,8 @@
 from gd_constants import GDConstants
 from PIL import Image
-from img2term.utils import fcode_opt
+from render.escape_cache import EscapeCache
+from render.frame_encoder import HALF_BLOCK
+from render.utils import pack_cells
 from typing import List, Tuple, Literal
 from draw_utils import Position, print3
 from logger import Logger
@@ -8,6 +10,32 @@ import numpy as np
 
 PIXEL = "▀" # top half is bg, bottom half is fg
 
+def encode_rows(pixels: np.ndarray) -> List[str]:
+    """
+    Converts an image (array of rgb or rgba pixels) into one printable string per row of characters.
+    
+    Each run of same-colored characters gets a single escape code from the shared `EscapeCache`,
+    and only the fg or bg part is sent if the other one didn't change.
+    """
+    even_height = len(pixels) - len(pixels) % 2 # TODO - last row of odd height images is not being processed
+    packed_cells = pack_cells(np.asarray(pixels[:even_height, :, 0:3], dtype=np.uint8))
+    color_breaks = packed_cells[:, 1:] != packed_cells[:, :-1]
+    
+    rows: List[str] = []
+    for i in range(len(packed_cells)):
+        run_starts = np.concatenate(([0], np.flatnonzero(color_breaks[i]) + 1, [packed_cells.shape[1]]))
+        
+        parts = []
+        sgr_state = None # each row is printed separately (and reset after), so the state is unknown at the start
+        for cell, run_length in zip(packed_cells[i, run_starts[:-1]].tolist(), np.diff(run_starts).tolist()):
+            parts.append(EscapeCache.get_transition(sgr_state, cell))
+            parts.append(HALF_BLOCK * run_length)
+            sgr_state = cell
+        
+        rows.append(b''.join(parts).decode())
+    
+    return rows
+
 def draw(
     img_path: str, 
     pos: Position.Relative = Position.Relative(left=0, top=0),
@@ -47,27 +75,13 @@ def draw(
 
     pixels = np.array(im, dtype=np.int32)
     
-    final_chars: List[List[str]] = []
-    for i in range(0, len(pixels)-1, 2): # TODO - last row of odd height images is not being processed
-        row = pixels[i]
-        row2 = pixels[i + 1]
-        
-        final_row: List[str] = []
-        
-        for j in range(len(row)):
-            top_pixel = row[j]
-            bottom_pixel = row2[j]
-            final_row.append("\x1b[0m" + fcode_opt(fg=top_pixel[0:3], bg=bottom_pixel[0:3]) + PIXEL)
-            
-        final_chars.append(final_row)
-    
-    final_chars = np.array(final_chars)
+    final_chars = encode_rows(pixels)
     
     # draw image at specified pos
     abs_pos = pos.get_absolute(GDConstants.term.width, GDConstants.term.height)
     
     true_top = abs_pos.top if abs_pos.top is not None else GDConstants.term.height - abs_pos.bottom - len(final_chars)
-    true_left = abs_pos.left if abs_pos.left is not None else GDConstants.term.width - abs_pos.right - len(final_chars[0])
+    true_left = abs_pos.left if abs_pos.left is not None else GDConstants.term.width - abs_pos.right - pixels.shape[1]
     
     #Logger.log(f"[draw] (path={img_path}) Drawing image at {true_left}, {true_top}")
     #Logger.log(f"[^draw] abs_pos is {abs_pos}")
@@ -75,8 +89,8 @@ def draw(
     for row in range(len(final_chars)):
         # dont draw if out of bounds
         if not 0 <= true_top+row < GDConstants.term.height: continue
-        if not true_left < GDConstants.term.width or true_left+len(final_chars[row]) < 0: continue
-        print3(GDConstants.term.move_xy(true_left, true_top+row) + ''.join(final_chars[row]))
+        if not true_left < GDConstants.term.width or true_left+pixels.shape[1] < 0: continue
+        print3(GDConstants.term.move_xy(true_left, true_top+row) + final_chars[row])
 
 def draw_from_pixel_array(
     _pixels: np.ndarray | List[List[List[int]]],
@@ -90,24 +104,9 @@ def draw_from_pixel_array(
     """
     
     # if pixels is a list of lists, convert it to a numpy array
-    if type(_pixels) == list:
-        pixels = np.array(_pixels)
-    
-    final_chars: List[List[str]] = []
-    for i in range(0, len(pixels)-1, 2): # TODO - last row of odd height images is not being processed
-        row = pixels[i]
-        row2 = pixels[i + 1]
-        
-        final_row: List[str] = []
-        
-        for j in range(len(row)):
-            top_pixel = row[j]
-            bottom_pixel = row2[j]
-            final_row.append("\x1b[0m" + fcode_opt(fg=top_pixel[0:3], bg=bottom_pixel[0:3]) + PIXEL)
-            
-        final_chars.append(final_row)
+    pixels = np.asarray(_pixels)
     
-    final_chars = np.array(final_chars)
+    final_chars = encode_rows(pixels)
     
     # draw image at specified pos
     abs_pos = pos.get_absolute(GDConstants.term.width, GDConstants.term.height)
@@ -115,8 +114,8 @@ def draw_from_pixel_array(
     for row in range(len(final_chars)):
         # dont draw if out of bounds
         if not 0 <= abs_pos.top+row < GDConstants.term.height: continue
-        if not abs_pos.left < GDConstants.term.width or abs_pos.left+len(final_chars[row]) < 0: continue
-        print3(GDConstants.term.move_xy(abs_pos.left, abs_pos.top+row) + ''.join(final_chars[row]))
+        if not abs_pos.left < GDConstants.term.width or abs_pos.left+pixels.shape[1] < 0: continue
+        print3(GDConstants.term.move_xy(abs_pos.left, abs_pos.top+row) + final_chars[row])
 
 # demo i guess
 # draw("demo.png", pos=(0, 0), maxsize=(200, 100), overflow_behavior="crop")
\ No newline at end of file
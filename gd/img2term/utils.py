@@ -1,5 +1,6 @@
 import os
 from typing import Tuple
+from render.escape_cache import EscapeCache
 
 STYLE_CODES = {
     'bold': '\033[1m',
@@ -135,16 +136,10 @@ def fcode_opt(fg: Tuple[int, int, int] = None, bg: Tuple[int, int, int] = None)
     - no letter styling (bold, italic, etc.)
     - no predefined color names
     Mainly used for drawing block elements (pixels) in the terminal.
-    '''
-    
-    format_str = ''
     
-    if fg is not None:
-        format_str += '\033[38;2;{};{};{}m'.format(*fg)
-    if bg is not None:
-        format_str += '\033[48;2;{};{};{}m'.format(*bg)
-        
-    return format_str
+    Results are cached by packed color in the shared `EscapeCache`, so repeated colors skip the formatting.
+    '''
+    return EscapeCache.get_str(fg, bg)
 
 def cls() -> None:
     """
@@ -1,12 +1,17 @@
-from typing import List, Tuple, Dict, TYPE_CHECKING, Literal, TypedDict, NotRequired
-from copy import deepcopy
+from typing import Callable, Iterable, List, NamedTuple, Tuple, Dict, TYPE_CHECKING, Literal, TypedDict, NotRequired
+import copy
 import json
+import os
+import numpy as np
 from time import time
 
 from logger import Logger
 from gd_constants import GDConstants
 from engine.objects import OBJECTS
 from render.constants import CameraConstants
+from level_grid import GridSnapshot, LevelGrid
+import level_binary
+from color_timeline import ColorTimeline
 
 class StartSettings(TypedDict):
     bg_color: CameraConstants.RGBTuple
@@ -71,27 +76,44 @@ LEVEL_TYPES: Dict[str, LevelMetadata] = {
 class LevelParseError(Exception):
     pass
 
+class LevelRegion(NamedTuple):
+    """ A rectangle of cells copied out of a level (see `Level.get_region`), e.g. for the editor's clipboard.
+    Positions are relative to its bottom left corner. """
+    length: int
+    height: int
+    arrays: Dict[str, np.ndarray]
+    """ per-cell array name (see `LevelGrid.ARRAYS`) -> its values, indexed `[y, x]` """
+    triggers: Dict[Tuple[int, int], Tuple[str | int, Tuple[int, int, int]]]
+    """ The `LevelGrid.triggers` entries of the cells """
+    color_trigger_locs: Dict[Tuple[int, int], tuple]
+    """ The `Level.color_trigger_locs` entries of the cells """
+
+class LevelSnapshot(NamedTuple):
+    """ A copy of a level at some point, see `Level.snapshot` """
+    metadata: "LevelMetadata"
+    color_trigger_locs: Dict[Tuple[int, int], tuple]
+    grid: GridSnapshot
+    
+    def to_level(self) -> "Level":
+        """ A new level with the contents of the snapshot. Its metadata is shared with the snapshot. """
+        return Level(self.metadata, self.color_trigger_locs.copy(), self.grid.to_grid())
+
 class Level:
     """ Class that contains helpful methods related to levels.
-    Holds a 2D List of LevelObjects | Nones, and also metadata about the level. 
-    The 2D list should also be rectangular - all rows should be the same length.
+    Holds the level's objects (in a `LevelGrid` - get them as `LevelObject`s with `get_object_at`/`get_row`),
+    and also metadata about the level.
     """
 
     def __init__(
         self, 
         metadata: LevelMetadata, 
         color_trigger_locs: Dict[Tuple[int, int], Tuple[str | int, int, int, int]], 
-        leveldata: List[List["LevelObject"]]):
+        grid: LevelGrid):
         """ Programmatically construct a Level instance. If you're looking to parse from file, use Level.parse_from_file instead. """
         
         self.metadata: LevelMetadata = metadata
-        self.leveldata: List[List["LevelObject"]] = leveldata
-        """ The backend level data. SHOULD be rectangular - see level_parser """
-        
-        self.length = len(leveldata[0]) if len(leveldata) > 0 else 0
-        """ The length of the level in blocks. Equal to x-coord of the rightmost object + 1."""
-        self.height = len(leveldata)
-        """ The height of the level in blocks. Equal to y-coord of the highest object + 1. """
+        self.grid: LevelGrid = grid
+        """ The backend level data - one array per object attribute. Always rectangular. """
         
         self.color_channels: Dict[int, Tuple[int, int, int]] = {}
         """ Dict of id -> RGB color. Objects can reference these IDs to get their color. """
@@ -99,61 +121,58 @@ class Level:
         self.bg_color = tuple(metadata["start_settings"]["bg_color"])
         self.ground_color = tuple(metadata["start_settings"]["ground_color"])
         
-        self.color_trigger_locs: Dict[Tuple[int, int], Tuple[str | int, int, int, int]] = color_trigger_locs
-        """ A dict of (x, y) : (channel, r, g, b)) for efficiency in checking/activating color triggers. """
-        self._ordered_color_trigger_locs: List[Tuple[int, int]] = []
-        """ A list of color trigger locations, sorted with lower x-pos ones being last, that changes whenever a color trigger is passed 
-        This optimizes the color trigger checking process so that we dont have to look at a huge number of objects every tick. """
-        self.reset_color_trigger_cache()        
+        self.color_channel_listeners: List[Callable[[Literal["bg", "grnd"] | int | None], None]] = []
+        """ Functions called with the channel id whenever a color channel changes (None = all of them, e.g. on reset).
+        Used by renderers that cache things based on colors (see `render.level_raster.LevelRaster`).
+        Called on whatever thread changed the color (color triggers run on the physics thread), so listeners shouldn't touch
+        render state directly - they queue the change for the render thread instead. """
+        
+        self.color_channel_versions: Dict[Literal["bg", "grnd"] | int, int] = {}
+        """ channel id -> number of times its color has changed. Caches built from a channel's color can remember
+        the version they were built at, and tell whether they're stale (see `TextureManager.evict_stale_textures`). """
+        
+        self.color_trigger_locs: Dict[Tuple[int, int], Tuple[str | int, int, int, int] | Tuple[str | int, int, int, int, float]] = color_trigger_locs
+        """ A dict of (x, y) : (channel, r, g, b[, fade seconds]) for efficiency in checking/activating color triggers. """
+        self.color_timeline = ColorTimeline(self)
+        """ The color triggers sorted by x, with a cursor at the next one. Rebuilt from `color_trigger_locs` by `reset_color_trigger_cache`. """
         
         self.filepath: str = ...
         """ Stores the filepath of the level. ONLY SET IF parse_from_file IS USED. """
     
+    @property
+    def length(self) -> int:
+        """ The length of the level in blocks. Equal to x-coord of the rightmost object + 1."""
+        return self.grid.length
+    
+    @property
+    def height(self) -> int:
+        """ The height of the level in blocks. Equal to y-coord of the highest object + 1. """
+        return self.grid.height
+    
     @staticmethod
     def parse_from_file(filepath: str) -> "Level":
-        """ Parses a level file (using the new JSON-based system) and returns a Level object."""
-        
-        levelfile: dict = ...
-        
-        with open(filepath, 'r') as f:
-            levelfile = json.load(f)
-            f.close()
-
-        # parse metadata & check
-        metadata: StartSettings = levelfile['metadata']
-        level_type: str = metadata.get("type")
-
-        level_metadata_format = LEVEL_TYPES.get(level_type)
-        if level_metadata_format is None: 
-            raise LevelParseError(f"Error while parsing level {filepath}: level type {level_type} is not supported.")
-
-        required_keys = level_metadata_format.__required_keys__
-        diff = required_keys.difference(metadata.keys())
-        if len(diff) > 0:
-            raise LevelParseError(f"Error while parsing level {filepath}: Missing the following metadata for level type {level_type}: {', '.join(diff)}")
-
-        # metadata.start_settings should have ints as keys. JSON doesn't support int keys, so we need to convert them.
-        metadata["start_settings"]["default_color_channels"] = {int(k): v for k, v in metadata["start_settings"]["default_color_channels"].items()}
+        """ Parses a level file and returns a Level object.
+        JSON files are loaded fully, binary (`.gdlevel`) files only load their objects as they're needed (see `level_binary`). """
+        
+        if filepath.endswith(level_binary.BINARY_LEVEL_EXTENSION):
+            try:
+                levelfile, grid = level_binary.open_binary_level(filepath)
+            except (KeyError, ValueError, TypeError, level_binary.BinaryLevelError) as e:
+                raise LevelParseError(f"Error while parsing level {filepath}: invalid binary level file ({e!r})")
+        else:
+            levelfile: dict = ...
+            
+            with open(filepath, 'r') as f:
+                levelfile = json.load(f)
+                f.close()
 
-        # parse leveldata into LevelObjects and Nones
-        # recall that first row is highest row of the level
-        leveldata: List[List["LevelObject"]] = []
-        current_y_pos = len(levelfile['leveldata']) - 1
-        for row in levelfile['leveldata']:
-            # efficient way to iterate through list and convert all into LevelObject | Nones
-            leveldata.append([LevelObject(obj, x, current_y_pos) if obj else None for x, obj in enumerate(row)])
-            current_y_pos -= 1
-        
-        # pad leveldata to be rectangular (all rows the same length).
-        max_leveldata_row_length = len(leveldata[0]) if len(leveldata) > 0 else 0
-        for row in leveldata:
-            max_leveldata_row_length = max(max_leveldata_row_length, len(row))
+            # parse leveldata into the grid (rows can be different lengths, the grid is padded to be rectangular)
+            try:
+                grid = LevelGrid.from_json_rows(levelfile['leveldata'])
+            except (KeyError, ValueError, TypeError) as e:
+                raise LevelParseError(f"Error while parsing level {filepath}: invalid object in leveldata ({e!r})")
 
-        for row in leveldata:
-            len_diff = max_leveldata_row_length - len(row)
-            if len_diff > 0:
-                # pad with a lot of Nones
-                row.extend([None] * len_diff)
+        metadata = Level.parse_metadata(levelfile['metadata'], filepath)
                 
         # process color trigger locs
         # all the keys are stringified tuples. unstringify them.
@@ -164,7 +183,7 @@ class Level:
         for k, v in raw_color_trigger_locs.items():
             color_trigger_locs[tuple(map(int, k[1:-1].split(", ")))] = v
 
-        level = Level(metadata, color_trigger_locs, leveldata)
+        level = Level(metadata, color_trigger_locs, grid)
         level.filepath = filepath
 
         # parse & set default color channels    
@@ -178,32 +197,125 @@ class Level:
     parse = parse_from_file
     """ Alias for `parse_from_file` function. """
     
-    def write_to_file(self, filepath: str) -> None:
-        """ Writes the level in JSON format to a specified filepath, overwriting if the path already exists. """
+    @staticmethod
+    def parse_metadata(metadata: dict, filepath: str) -> LevelMetadata:
+        """ Checks the metadata of a level file against its level type's schema, and converts the json-only parts back. """
+        
+        level_type: str = metadata.get("type")
+
+        level_metadata_format = LEVEL_TYPES.get(level_type)
+        if level_metadata_format is None: 
+            raise LevelParseError(f"Error while parsing level {filepath}: level type {level_type} is not supported.")
 
-        # convert self.leveldata into List[List[dict]] so it can be written back to a json file
-        jsonized_leveldata = [[obj.to_json() if obj else None for obj in row] for row in self.leveldata]
+        required_keys = level_metadata_format.__required_keys__
+        diff = required_keys.difference(metadata.keys())
+        if len(diff) > 0:
+            raise LevelParseError(f"Error while parsing level {filepath}: Missing the following metadata for level type {level_type}: {', '.join(diff)}")
+
+        # metadata.start_settings should have ints as keys. JSON doesn't support int keys, so we need to convert them.
+        metadata["start_settings"]["default_color_channels"] = {int(k): v for k, v in metadata["start_settings"]["default_color_channels"].items()}
+        return metadata
+    
+    @staticmethod
+    def read_metadata(filepath: str) -> dict:
+        """ Reads only the (raw, unchecked) metadata of a level file. For binary levels this doesn't touch the objects at all. """
+        
+        if filepath.endswith(level_binary.BINARY_LEVEL_EXTENSION):
+            return level_binary.read_header(filepath)['metadata']
+        
+        with open(filepath, 'r', encoding='utf-8') as f:
+            return json.load(f)['metadata']
+    
+    @staticmethod
+    def update_metadata_in_file(filepath: str, updates: dict) -> dict:
+        """ Updates some metadata keys of a level file without parsing its objects, and returns the new (raw) metadata.
+        Written through a temp file like `write_to_file` (binary levels just copy their object data over, see `level_binary.update_metadata`). """
+        
+        if filepath.endswith(level_binary.BINARY_LEVEL_EXTENSION):
+            metadata = level_binary.read_header(filepath)['metadata']
+            metadata.update(updates)
+            level_binary.update_metadata(filepath, metadata)
+            return metadata
+        
+        with open(filepath, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        data['metadata'].update(updates)
+        temp_filepath = filepath + ".tmp"
+        with open(temp_filepath, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(temp_filepath, filepath)
+        return data['metadata']
+    
+    @staticmethod
+    def list_level_files(directory: str) -> List[str]:
+        """ Paths of every level file in a directory. If a level exists in both formats, only the binary one is listed. """
+        
+        filenames = os.listdir(directory)
+        binary_stems = {os.path.splitext(name)[0] for name in filenames if name.endswith(level_binary.BINARY_LEVEL_EXTENSION)}
+        
+        filepaths = []
+        for name in filenames:
+            stem, extension = os.path.splitext(name)
+            if extension == level_binary.BINARY_LEVEL_EXTENSION or (extension == level_binary.JSON_LEVEL_EXTENSION and stem not in binary_stems):
+                filepaths.append(os.path.join(directory, name))
+        return filepaths
+    
+    def write_to_file(self, filepath: str) -> None:
+        """ Writes the level to a specified filepath, overwriting if the path already exists.
+        Uses the binary format if the path ends with `.gdlevel`, otherwise JSON. """
+        
+        if filepath.endswith(level_binary.BINARY_LEVEL_EXTENSION):
+            color_trigger_locs = {str(k): v for k, v in self.color_trigger_locs.items()}
+            level_binary.write_binary_level(filepath, self.metadata, color_trigger_locs, self.grid)
+            return
+        
+        # temp file first, so a crash never leaves a half written level (same as the binary format)
+        temp_filepath = filepath + ".tmp"
+        with open(temp_filepath, 'w', encoding='utf-8') as f:
+            json.dump(self.to_json(), f)
+        os.replace(temp_filepath, filepath)
+    
+    def snapshot(self, previous: "LevelSnapshot | None" = None, dirty_chunks: Iterable[int] = ()) -> "LevelSnapshot":
+        """ A read-only copy of the level's objects, color triggers and metadata, e.g. to write the level to a file
+        on another thread while it keeps getting edited. Only the columns in `dirty_chunks` get copied if there's a previous
+        snapshot (see `LevelGrid.snapshot`). """
+        return LevelSnapshot(
+            copy.deepcopy(self.metadata),
+            self.color_trigger_locs.copy(),
+            self.grid.snapshot(previous.grid if previous is not None else None, dirty_chunks)
+        )
+    
+    def to_json(self) -> dict:
+        """ The whole level in the JSON level file format (what `write_to_file` writes for .json paths) """
         
         # cant store tuples as keys in JSON, so convert keys to stringified tuples
         color_trigger_locs = {str(k): v for k, v in self.color_trigger_locs.items()}
         
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump({
-                'metadata': self.metadata,
-                'color_trigger_locs': color_trigger_locs, # no need to convert this to JSON, it's already a dict
-                'leveldata': jsonized_leveldata
-            }, f)
+        return {
+            'metadata': self.metadata,
+            'color_trigger_locs': color_trigger_locs, # no need to convert this to JSON, it's already a dict
+            'leveldata': self.grid.to_json_rows() # convert the grid into List[List[dict]] so it can be written back to a json file
+        }
     
     def reset_colors(self) -> None:
         #Logger.log(f"resetting bg color to {self.metadata['start_settings']['bg_color']}")
         #Logger.log(f"resetting ground color to {self.metadata['start_settings']['ground_color']}")
+        old_colors = {"bg": self.bg_color, "grnd": self.ground_color, **self.color_channels}
+        
         self.bg_color = tuple(self.metadata["start_settings"]["bg_color"])
         self.ground_color = tuple(self.metadata["start_settings"]["ground_color"])
-        self.color_channels = {int(k): v for k, v in self.metadata["start_settings"]["default_color_channels"].items()}
+        self.color_channels = {int(k): tuple(v) for k, v in self.metadata["start_settings"]["default_color_channels"].items()}
+        
+        new_colors = {"bg": self.bg_color, "grnd": self.ground_color, **self.color_channels}
+        for id in old_colors.keys() | new_colors.keys():
+            if old_colors.get(id) != new_colors.get(id):
+                self.color_channel_versions[id] = self.color_channel_versions.get(id, 0) + 1
+        
+        self.notify_color_channel_listeners(None)
     
     def reset_color_trigger_cache(self) -> None:
-        """ Resets the color trigger cache based on self.color_trigger_locs. """
-        self._ordered_color_trigger_locs = sorted(self.color_trigger_locs.keys(), key=lambda x: x[0], reverse=True)
+        """ Resets the color trigger timeline based on self.color_trigger_locs. """
+        self.color_timeline.rebuild()
     
     def get_object_at(self, x: int, y: int) -> "LevelObject | None":
         """
@@ -215,15 +327,13 @@ class Level:
         Returns None if coordinates are out of bounds/negative.
         """
         
-        row_index_in_list = len(self.leveldata) - y - 1
+        if self.grid.source is not None and 0 <= x < self.length and not self.grid.loaded_chunks[x // self.grid.source.chunk_width]:
+            self.grid.ensure_loaded(x, x + 1)
         
-        if ((x < 0 or y < 0) or 
-            (row_index_in_list >= len(self.leveldata)) or 
-            (row_index_in_list < 0) or
-            (x >= len(self.leveldata[row_index_in_list]))):
+        if not self.grid.has_object(x, y):
             return None
         
-        return self.leveldata[row_index_in_list][x]
+        return LevelObject(self.grid, x, y)
     
     def set_object_at(self, x: int, y: int, obj: "LevelObject | AbstractLevelObject | None") -> None:
         """
@@ -233,81 +343,113 @@ class Level:
         Will update any caches that change depending on the level data (such as color trigger cache)
         
         Otherwise:        
-        Sets the object at coordinates x, y to a COPY of `obj`, converting
-        it into a `LevelObject` and correctly setting its internally saved coordinates.
+        Copies `obj`'s attributes into the grid at x, y. (`get_object_at(x, y)` then returns a view of the copy)
         """
         # check for nonnegativitiy
         if x < 0 or y < 0:
             raise ValueError(f"Invalid position ({x},{y}) while trying to set object in level - both coordinates must be nonnegative.")
         
-        if x >= self.length:
-            # expand level horizontally, add Nones as padding at the end of each row
-            for row in self.leveldata:
-                row.extend([None] * (x - self.length + 1))
-                
-            # update length field
-            self.length += x - self.length + 1
-        
-        if y >= self.height:
-            # expand level vertically, add Nones as padding
-            # note that to go higher, we add rows at the beginning
-            new_rows = [([None] * self.length) for _ in range(y - self.height + 1)]
-            self.leveldata = new_rows + self.leveldata
-            
-            # update height field
-            self.height += y - self.height + 1
-        
-        # set the new object    
-        row_index_in_list = self.height - y - 1
-        new_obj = LevelObject.copy_from(obj, x, y) if obj is not None else None
+        if x >= self.length or y >= self.height:
+            # expand level, new cells are empty
+            self.grid.ensure_size(x + 1, y + 1) # amortized O(1), see `LevelGrid.resize`
+        else:
+            self.grid.ensure_loaded(x, x + 1) # otherwise loading the chunk later would overwrite this
         
-        if new_obj is None: # check if object being deleted is a color trigger
+        if obj is None: # check if object being deleted is a color trigger
             if (x, y) in self.color_trigger_locs: # remove from color trigger cache
-                del self.color_trigger_locs[(x, y)]      
-                
-        elif new_obj.type == "color_trigger": # sync color trigger cache if placing a color trigger
-            self.color_trigger_locs[(x, y)] = (new_obj.color1_channel, 255, 255, 255)
-    
-        self.leveldata[row_index_in_list][x] = new_obj
-    
-    def check_color_triggers(self, player_x: float) -> None:
-        """ Checks if the player x is past any color triggers in self._ordered_color_trigger_locs.
-        If it is, activate the trigger and remove it from that cache, so it cant be activated again. """
-        
-        if len(self._ordered_color_trigger_locs) == 0:
+                del self.color_trigger_locs[(x, y)]
+            self.grid.clear(x, y)
             return
         
-        #closest_trigger = self._ordered_color_trigger_locs[-1]
-        # iterate backward through ordered color triggers. 
-        # keep all the ones with the same x-value
-        
-        upcoming_triggers = [self._ordered_color_trigger_locs[-1]]
-        for trigger in range(len(self._ordered_color_trigger_locs)-2, -1, -1):
-            if self._ordered_color_trigger_locs[trigger][0] == upcoming_triggers[0][0]:
-                upcoming_triggers.append(self._ordered_color_trigger_locs[trigger])
-            else:
-                break
+        self.grid.set_object(
+            x, y, obj.type, obj.rotation, obj.reflection, obj.color1_channel, obj.color2_channel,
+            obj.trigger_target, obj.trigger_color, obj.has_been_activated
+        )
         
-        if player_x >= upcoming_triggers[0][0]: # player has passed the trigger line
-            # activate all the upcoming color triggers
-            
-            #Logger.log(f">>>>>>> PLAYER PASSED TRIGGERS!!!!!! UPCOMING TRIGGERS len: {len(upcoming_triggers)}")
-            
-            for trigger_loc in upcoming_triggers:
-                #Logger.log(f"trigger loc is {trigger_loc}, upcoming_triggers len={len(upcoming_triggers)}")
-                self.set_color_channel(self.color_trigger_locs[trigger_loc][0], self.color_trigger_locs[trigger_loc][1:])
-                #self.color_trigger_locs.pop(trigger_loc)
-                self._ordered_color_trigger_locs.pop() # this SHOULD be fine since we ensure that upcoming_triggers is in the opposite order as _ordered_color_trigger_locs
+        if obj.type == "color_trigger": # sync color trigger cache if placing a color trigger
+            self.color_trigger_locs[(x, y)] = (obj.color1_channel, 255, 255, 255)
+    
+    def get_region(self, x0: int, y0: int, x1: int, y1: int) -> LevelRegion:
+        """ A copy of the cells [x0, x1) x [y0, y1) (can go past the edges of the level, those cells are just empty) """
+        
+        def get_relative(table: dict) -> dict:
+            return {(x - x0, y - y0): value for (x, y), value in table.items() if x0 <= x < x1 and y0 <= y < y1}
+        
+        return LevelRegion(
+            x1 - x0, y1 - y0,
+            self.grid.get_cells(x0, y0, x1, y1),
+            get_relative(self.grid.triggers),
+            get_relative(self.color_trigger_locs)
+        )
+    
+    def paste_region(self, x: int, y: int, region: LevelRegion) -> None:
+        """ Copies the objects of a region into the level with its bottom left corner at (x, y), expanding the level if needed.
+        Only cells that have an object in the region are written, empty ones leave the level as it is. Cells past the
+        bottom/left edges of the level are dropped. """
+        
+        # drop the part that would be at negative coordinates
+        skip_x, skip_y = max(0, -x), max(0, -y)
+        if skip_x >= region.length or skip_y >= region.height:
+            return
+        arrays = {name: array[skip_y:, skip_x:] for name, array in region.arrays.items()}
+        x, y = x + skip_x, y + skip_y
+        
+        mask = arrays["type_ids"] != 0
+        self.grid.paste_cells(x, y, arrays, mask)
+        
+        # pasted objects take their sparse values with them (or reset to the defaults if they have none)
+        for table, region_table in ((self.grid.triggers, region.triggers), (self.color_trigger_locs, region.color_trigger_locs)):
+            for pos in [pos for pos in table if 0 <= pos[1] - y < mask.shape[0] and 0 <= pos[0] - x < mask.shape[1] and mask[pos[1] - y, pos[0] - x]]:
+                del table[pos]
+            for (dx, dy), value in region_table.items():
+                if dx >= skip_x and dy >= skip_y:
+                    table[(x + dx - skip_x, y + dy - skip_y)] = value
+    
+    def fill_region(self, x0: int, y0: int, x1: int, y1: int, obj: "LevelObject | AbstractLevelObject") -> None:
+        """ Sets every cell of [x0, x1) x [y0, y1) (nonnegative) to a copy of `obj`, expanding the level if needed.
+        Same as calling `set_object_at` for every cell, in one go. """
+        
+        self.grid.fill_cells(
+            x0, y0, x1, y1, obj.type, obj.rotation, obj.reflection, obj.color1_channel, obj.color2_channel,
+            obj.trigger_target, obj.trigger_color
+        )
+        
+        self.clear_color_trigger_locs(x0, y0, x1, y1)
+        if obj.type == "color_trigger": # same as set_object_at
+            for y in range(y0, y1):
+                for x in range(x0, x1):
+                    self.color_trigger_locs[(x, y)] = (obj.color1_channel, 255, 255, 255)
+    
+    def clear_region(self, x0: int, y0: int, x1: int, y1: int) -> None:
+        """ Deletes every object in [x0, x1) x [y0, y1) """
+        self.grid.clear_cells(x0, y0, x1, y1)
+        self.clear_color_trigger_locs(x0, y0, x1, y1)
+    
+    def clear_color_trigger_locs(self, x0: int, y0: int, x1: int, y1: int) -> None:
+        for pos in [pos for pos in self.color_trigger_locs if x0 <= pos[0] < x1 and y0 <= pos[1] < y1]:
+            del self.color_trigger_locs[pos]
+    
+    def check_color_triggers(self, player_x: float, time: float = 0) -> None:
+        """ Activates the color triggers the player x has passed since the last check, and steps any color fades in progress.
+        `time` (seconds, e.g. `Player.physics_time`) is only needed for triggers with a fade. See `ColorTimeline.advance`. """
+        self.color_timeline.advance(player_x, time)
     
     def get_row(self, y: int, start: int = 0, end: int = None) -> List["LevelObject"]:
         """ Return a list of LevelObjects in a specific row, based on y-coordinate (remember, 0 is bottom row)
         Optionally can specify a start and end index to slice the row. If end is None, will go till the end of the row. """
-        return self.leveldata[self.height - y - 1][start:end]
+        self.grid.ensure_loaded(start, end if end is not None else self.length)
+        type_ids = self.grid.type_ids[y, start:end].tolist()
+        return [LevelObject(self.grid, x, y) if type_id != 0 else None for x, type_id in enumerate(type_ids, start)]
     
     def set_color_channel(self, id: Literal["bg", "grnd"] | int, new_color: CameraConstants.RGBTuple, is_default: bool = False):
         """ Update the color of a color channel. id must be int, "bg", or "grnd"
         Creates a new channel if it doesn't exist. """
         
+        new_color = tuple(new_color) # colors are used in (hashable) cache keys
+        
+        if new_color != self.get_color_channel(id):
+            self.color_channel_versions[id] = self.color_channel_versions.get(id, 0) + 1
+        
         if id == "bg":
             self.bg_color = new_color
             if is_default: self.metadata["start_settings"]["bg_color"] = new_color
@@ -318,6 +460,12 @@ class Level:
             self.color_channels[id] = new_color
             if is_default: self.metadata["start_settings"]["default_color_channels"][id] = new_color
         
+        self.notify_color_channel_listeners(id)
+    
+    def notify_color_channel_listeners(self, id: Literal["bg", "grnd"] | int | None) -> None:
+        for listener in self.color_channel_listeners:
+            listener(id)
+        
     def get_color_channel(self, id: Literal["bg", "grnd"] | int) -> CameraConstants.RGBTuple:
         """ Get the current color of a color channel. If the channel was never set, sets it to `(255, 255, 255)` (white) and returns that. """
         
@@ -330,12 +478,16 @@ class Level:
         self.color_channels.setdefault(id, (255, 255, 255))
         return self.color_channels[id]
     
-    def edit_color_trigger_at(self, x: int, y: int, new_channel: str | int, new_color: CameraConstants.RGBTuple) -> None:
+    def edit_color_trigger_at(self, x: int, y: int, new_channel: str | int, new_color: CameraConstants.RGBTuple, fade: float | None = None) -> None:
         """ Edit the properties of a color trigger at a specific position (with new channel and color). 
+        The fade duration (seconds) is kept as is if `fade` is None.
         This function will do nothing if there is no color trigger at that position. """
         
         if (x, y) in self.color_trigger_locs:
-            self.color_trigger_locs[(x, y)] = (new_channel, *new_color)
+            if fade is None:
+                old_value = self.color_trigger_locs[(x, y)]
+                fade = old_value[4] if len(old_value) > 4 else 0
+            self.color_trigger_locs[(x, y)] = (new_channel, *new_color, fade) if fade else (new_channel, *new_color)
     
     def get_colors_of(self, object: "LevelObject") -> Tuple[CameraConstants.RGBTuple | None, CameraConstants.RGBTuple | None]:
         """
@@ -389,86 +541,135 @@ class LevelObjectDefSchema(TypedDict):
     trigger_color: NotRequired[CameraConstants.RGBTuple | None] # optional - COLOR TRIGGERS ONLY
     has_been_activated: NotRequired[bool | None] # optional - ACTIVATABLE OBJECTS ONLY
 
+def _texture_key_attr(name: str) -> property:
+    """ An attribute that the object's texture key depends on. Assigning to it resets the cached key (see `get_texture_key`). """
+    private_name = "_" + name
+    
+    def getter(self):
+        return getattr(self, private_name)
+    
+    def setter(self, value):
+        setattr(self, private_name, value)
+        self._texture_key = None
+        
+    return property(getter, setter)
+
 class LevelObject:
     """
     Represents a single object in a level. object types must be found in the `engine.objects.OBJECTS.MASTERLIST` dict.
-    These should be created on level load, and NOT on every tick.
+    
+    This is only a view of one cell of the level's `LevelGrid` - every attribute is read from/written to the grid,
+    so these are cheap to create (`Level.get_object_at` makes a new one every call) and can't go out of sync with the level.
     
     Contains other data such as has_been_activated, position, (in the future, group, color, etc.)
     """
-    def __init__(self, definition: LevelObjectDefSchema, x: float, y: float):
-        
-        # ensure all required keys are present
-        required_keys = LevelObjectDefSchema.__required_keys__
-        diff = required_keys.difference(definition.keys())
-        if len(diff) > 0:
-            raise LevelParseError(f"Error while creating LevelObject@({x},{y}): Missing the following keys: {', '.join(diff)}")
-        
-        self._ORIGINAL_DEFINITION = deepcopy(definition)
-        
-        self.type = definition["type"]
-        """ The type/name of this object. e.g. 'block0_0', 'spike', 'yellow_orb'"""
-        
-        self.data: ObjectData = deepcopy(OBJECTS.get(self.type))
-        """ Built-in backend data about the object, such as hitbox, collision effect, etc. """
-        
-        self.x: float = x
+    
+    __slots__ = ("grid", "x", "y")
+    
+    def __init__(self, grid: LevelGrid, x: int, y: int):
+        self.grid = grid
+        self.x: int = x
         """ Represents the x-position (left edge) of the object """
-        self.y: float = y
+        self.y: int = y
         """ Represents the y-position (bottom edge) of the object """
-        
-        self.rotation: CameraConstants.OBJECT_ROTATIONS = definition["rotation"]
+    
+    @property
+    def type(self) -> str:
+        """ The type/name of this object. e.g. 'block0_0', 'spike', 'yellow_orb'"""
+        return LevelGrid.TYPE_NAMES[self.grid.type_ids[self.y, self.x]]
+    
+    @type.setter
+    def type(self, value: str) -> None:
+        self.grid.type_ids[self.y, self.x] = LevelGrid.TYPE_IDS[value]
+        self.grid.update_texture_key(self.x, self.y)
+    
+    @property
+    def data(self) -> ObjectData:
+        """ Built-in backend data about the object, such as hitbox, collision effect, etc. Shared by every object of the same type, don't modify. """
+        return LevelGrid.TYPE_DATA[self.grid.type_ids[self.y, self.x]]
+    
+    @property
+    def rotation(self) -> CameraConstants.OBJECT_ROTATIONS:
         """ Represents the rotation of the object, Can be 'up','right','down','left'. up = no rotation, right = 90deg to the right, etc. """
-        self.reflection: CameraConstants.OBJECT_REFLECTIONS = definition["reflection"]
+        return LevelGrid.ROTATIONS[self.grid.rotations[self.y, self.x]]
+    
+    @rotation.setter
+    def rotation(self, value: CameraConstants.OBJECT_ROTATIONS) -> None:
+        self.grid.rotations[self.y, self.x] = LevelGrid.ROTATION_IDS[value]
+        self.grid.update_texture_key(self.x, self.y)
+    
+    @property
+    def reflection(self) -> CameraConstants.OBJECT_REFLECTIONS:
         """ Represents the reflection of the object. Can be 'none', 'horizontal', 'vertical', or 'both' """
-        
-        self.color1_channel: int | None = definition["color1_channel"] if self.data["color_channels"] > 0 else None
+        return LevelGrid.REFLECTIONS[self.grid.reflections[self.y, self.x]]
+    
+    @reflection.setter
+    def reflection(self, value: CameraConstants.OBJECT_REFLECTIONS) -> None:
+        self.grid.reflections[self.y, self.x] = LevelGrid.REFLECTION_IDS[value]
+        self.grid.update_texture_key(self.x, self.y)
+    
+    @property
+    def color1_channel(self) -> int | None:
         """ the id of the color channel this object's color1 (replaces dark) conforms to. Can be None if the object cannot be recolored. """
-        self.color2_channel: int | None = definition["color2_channel"] if self.data["color_channels"] > 1 else None
+        channel = int(self.grid.color1_channels[self.y, self.x])
+        return channel if channel != LevelGrid.NO_CHANNEL else None
+    
+    @color1_channel.setter
+    def color1_channel(self, value: int | None) -> None:
+        self.grid.color1_channels[self.y, self.x] = value if value is not None else LevelGrid.NO_CHANNEL
+        self.grid.update_texture_key(self.x, self.y)
+    
+    @property
+    def color2_channel(self) -> int | None:
         """ the id of the color channel this object's color2 (replaces bright) conforms to. Can be None if the object only has 1 color."""
-        
-        self.trigger_target: str | int | None = definition.get("trigger_target") or "bg"
+        channel = int(self.grid.color2_channels[self.y, self.x])
+        return channel if channel != LevelGrid.NO_CHANNEL else None
+    
+    @color2_channel.setter
+    def color2_channel(self, value: int | None) -> None:
+        self.grid.color2_channels[self.y, self.x] = value if value is not None else LevelGrid.NO_CHANNEL
+        self.grid.update_texture_key(self.x, self.y)
+    
+    @property
+    def trigger_target(self) -> str | int:
         """ the id of the object this color trigger will activate. """
-        
-        self.trigger_color: CameraConstants.RGBTuple | None = definition.get("trigger_color") or (255, 255, 255)
+        return self.grid.get_trigger(self.x, self.y)[0]
+    
+    @trigger_target.setter
+    def trigger_target(self, value: str | int | None) -> None:
+        self.grid.set_trigger(self.x, self.y, value, self.trigger_color)
+    
+    @property
+    def trigger_color(self) -> CameraConstants.RGBTuple:
         """ the color this color trigger will activate with. """
-        
-        self.has_been_activated = False
+        return self.grid.get_trigger(self.x, self.y)[1]
+    
+    @trigger_color.setter
+    def trigger_color(self, value: CameraConstants.RGBTuple | None) -> None:
+        self.grid.set_trigger(self.x, self.y, self.trigger_target, value)
+    
+    @property
+    def has_been_activated(self) -> bool:
         """ flag for objects that can been activated by the player exactly once. """
+        return bool(self.grid.flags[self.y, self.x] & LevelGrid.FLAG_ACTIVATED)
+    
+    @has_been_activated.setter
+    def has_been_activated(self, value: bool) -> None:
+        flags = int(self.grid.flags[self.y, self.x])
+        self.grid.flags[self.y, self.x] = (flags | LevelGrid.FLAG_ACTIVATED) if value else (flags & ~LevelGrid.FLAG_ACTIVATED)
+
+    def get_texture_key(self) -> int:
+        """ Int id of everything (except the current colors) that this object's transformed texture depends on.
+        Used as part of the `TextureManager.texture_cache` key. Precomputed by the grid (see `LevelGrid.texture_keys`). """
+        return int(self.grid.texture_keys[self.y, self.x])
 
     def __str__(self) -> str:
         return f"LevelObject(type={self.type},x={self.x},y={self.y})"
-    
-    def copy_from(other: "AbstractLevelObject | LevelObject", x: float, y: float) -> "LevelObject":
-        """ Creates a new LevelObject with the same data as another object, but at a different position. """
-        # can we use __dict__ here?
-        new = LevelObject(other._ORIGINAL_DEFINITION, x, y)
-        # set other fields in case they were changed after definition
-        new.type = other.type
-        new.data = other.data
-        new.rotation = other.rotation
-        new.reflection = other.reflection
-        new.color1_channel = other.color1_channel
-        new.color2_channel = other.color2_channel
-        new.has_been_activated = other.has_been_activated
-        new.trigger_target = other.trigger_target
-        new.trigger_color = other.trigger_color
-        
-        return new
         
     def abstract_copy(self) -> "AbstractLevelObject":
         """ Returns a copy of this LevelObject as an AbstractLevelObject. (no specific position) """
-        new = AbstractLevelObject(self._ORIGINAL_DEFINITION)
-        # set other fields in case they were changed after definition
-        new.type = self.type
-        new.data = self.data
-        new.rotation = self.rotation
-        new.reflection = self.reflection
-        new.color1_channel = self.color1_channel
-        new.color2_channel = self.color2_channel
+        new = AbstractLevelObject(self.to_json())
         new.has_been_activated = self.has_been_activated
-        new.trigger_target = self.trigger_target
-        new.trigger_color = self.trigger_color
         
         return new
     
@@ -508,15 +709,7 @@ class LevelObject:
             "trigger_color": [255, 255, 255],
         }
         """
-        return {
-            "type": self.type,
-            "rotation": self.rotation,
-            "reflection": self.reflection,
-            "color1_channel": self.color1_channel,
-            "color2_channel": self.color2_channel,
-            "trigger_target": self.trigger_target,
-            "trigger_color": self.trigger_color
-        }
+        return self.grid.to_json(self.x, self.y)
 
 class AbstractLevelObject: # not inheriting since all functions are different lol
     """
@@ -525,6 +718,12 @@ class AbstractLevelObject: # not inheriting since all functions are different lo
     
     Contains other data such as has_been_activated, position, (in the future, group, color, etc.)
     """
+    type = _texture_key_attr("type")
+    rotation = _texture_key_attr("rotation")
+    reflection = _texture_key_attr("reflection")
+    color1_channel = _texture_key_attr("color1_channel")
+    color2_channel = _texture_key_attr("color2_channel")
+    
     def __init__(self, definition: LevelObjectDefSchema):
         
         # ensure all required keys are present
@@ -533,13 +732,11 @@ class AbstractLevelObject: # not inheriting since all functions are different lo
         if len(diff) > 0:
             raise LevelParseError(f"Error while creating AbstractLevelObject: Missing the following keys: {', '.join(diff)}")
         
-        self._ORIGINAL_DEFINITION = deepcopy(definition)
-        
         self.type = definition["type"]
         """ The type/name of this object. e.g. 'block0_0', 'spike', 'yellow_orb'"""
         
-        self.data: ObjectData = deepcopy(OBJECTS.get(self.type))
-        """ Built-in backend data about the object, such as hitbox, collision effect, etc. """
+        self.data: ObjectData = OBJECTS.get(self.type)
+        """ Built-in backend data about the object, such as hitbox, collision effect, etc. Shared by every object of the same type, don't modify. """
         
         self.rotation: CameraConstants.OBJECT_ROTATIONS = definition["rotation"]
         """ Represents the rotation of the object, Can be 'up','right','down','left'. up = no rotation, right = 90deg to the right, etc. """
@@ -559,6 +756,16 @@ class AbstractLevelObject: # not inheriting since all functions are different lo
         
         self.has_been_activated = False
         """ flag for objects that can been activated by the player exactly once. """
+        
+        self._texture_key: int | None = None
+        """ Cache for `get_texture_key`. Reset whenever one of the attributes it depends on is assigned. """
+
+    def get_texture_key(self) -> int:
+        """ Int id of everything (except the current colors) that this object's transformed texture depends on.
+        Used as part of the `TextureManager.texture_cache` key. Only recomputed after rotation/reflection/type/channels change. """
+        if self._texture_key is None:
+            self._texture_key = LevelGrid.get_texture_key_id((self.type, self.rotation, self.reflection, self.color1_channel, self.color2_channel))
+        return self._texture_key
 
     def __str__(self) -> str:
         return f"AbstractLevelObject(type={self.type})"
@@ -0,0 +1,296 @@
+"""
+Compact binary level files (`.gdlevel`), loaded lazily through `mmap`.
+
+Layout:
+```
+0   b"GDLV"
+4   u16 version
+6   u16 (unused)
+8   u32 header capacity (bytes)
+12  header: utf-8 json, padded with spaces up to the capacity
+    {"metadata", "color_trigger_locs", "length", "height", "chunk_width", "chunks", "triggers"}
+..  object data, split into chunks of `chunk_width` columns
+```
+Each chunk holds every `LevelGrid.ARRAYS` array (in that order) for its columns, as raw little endian (height, width) arrays.
+`header["chunks"][i]` is the offset of chunk i from the start of the object data, or -1 if that chunk has no objects at all.
+Chunks are only decoded when something first looks at their columns (see `LevelGrid.ensure_loaded`).
+
+Every write (including metadata updates, e.g. progress) goes to a temp file that then replaces the level file,
+so a crash never leaves a half written level. Grids that are still lazily reading a file get fully loaded before it's replaced.
+
+Also a converter between the json and binary formats:
+```
+python level_binary.py                          # converts levels/official and levels/created to .gdlevel
+python level_binary.py --to json levels/created # back to json
+python level_binary.py --verify some_level.json # checks that json -> binary -> json doesn't change anything
+```
+"""
+
+from typing import Dict, List, Tuple
+import argparse
+import json
+import mmap
+import os
+import shutil
+import struct
+import weakref
+import numpy as np
+
+from level_grid import LevelGrid
+
+BINARY_LEVEL_EXTENSION = ".gdlevel"
+JSON_LEVEL_EXTENSION = ".json"
+
+MAGIC = b"GDLV"
+VERSION = 1
+PREAMBLE = struct.Struct("<4sHHI")
+""" magic, version, unused, header capacity """
+
+CHUNK_WIDTH = 64
+""" Columns per chunk in newly written files """
+
+HEADER_SLACK = 1024
+""" Extra bytes reserved after the header, so metadata edits usually don't change the header's size """
+
+class BinaryLevelError(Exception):
+    pass
+
+_lazy_grids: "weakref.WeakSet[LevelGrid]" = weakref.WeakSet()
+""" Grids opened by `open_binary_level`, which might still have their file open (see `release_file`) """
+
+def release_file(filepath: str) -> None:
+    """ Fully loads every grid that's still lazily reading `filepath`, which closes the file for them.
+    Has to happen before the file gets replaced: Windows can't replace a file that's open/mapped,
+    and everywhere else the grid would keep reading the old file. """
+
+    filepath = os.path.abspath(filepath)
+    for grid in list(_lazy_grids):
+        if grid.source is not None and grid.source.filepath == filepath:
+            grid.load_all()
+
+def _get_chunk_nbytes(height: int, width: int) -> int:
+    return sum(height * width * np.dtype(dtype).itemsize for dtype, _ in LevelGrid.ARRAYS.values())
+
+def _encode_header(header: dict, capacity: int | None = None) -> bytes:
+    """ Header json, padded with spaces to `capacity` (or to its own size + `HEADER_SLACK`) """
+    encoded = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    if capacity is None:
+        capacity = len(encoded) + HEADER_SLACK
+    return encoded.ljust(capacity, b" ")
+
+def _read_preamble(f) -> int:
+    """ Checks the start of the file and returns the header capacity """
+    magic, version, _, header_capacity = PREAMBLE.unpack(f.read(PREAMBLE.size))
+    if magic != MAGIC:
+        raise BinaryLevelError(f"[level_binary]: {getattr(f, 'name', 'file')} is not a binary level file")
+    if version != VERSION:
+        raise BinaryLevelError(f"[level_binary]: unsupported binary level version {version} (expected {VERSION})")
+    return header_capacity
+
+def read_header(filepath: str) -> dict:
+    """ Reads only the header of a binary level (metadata, size, chunk index) - none of the object data """
+    with open(filepath, "rb") as f:
+        header_capacity = _read_preamble(f)
+        return json.loads(f.read(header_capacity))
+
+def write_binary_level(filepath: str, metadata: dict, color_trigger_locs: Dict[str, list], grid: LevelGrid) -> None:
+    """
+    Writes a level to `filepath` in the binary format. `color_trigger_locs` has stringified keys (same as in the json files).
+    Writes to a temporary file first and then replaces, so a crash never leaves a half written level.
+    """
+
+    grid.load_all()
+
+    chunks: List[int] = []
+    data: List[bytes] = []
+    data_size = 0
+    for start in range(0, grid.length, CHUNK_WIDTH):
+        end = min(grid.length, start + CHUNK_WIDTH)
+
+        if not grid.type_ids[:, start:end].any():
+            chunks.append(-1)
+            continue
+
+        chunks.append(data_size)
+        for name, (dtype, _) in LevelGrid.ARRAYS.items():
+            encoded = np.ascontiguousarray(getattr(grid, name)[:, start:end], dtype=np.dtype(dtype).newbyteorder("<")).tobytes()
+            data.append(encoded)
+            data_size += len(encoded)
+
+    header = {
+        "metadata": metadata,
+        "color_trigger_locs": color_trigger_locs,
+        "length": grid.length,
+        "height": grid.height,
+        "chunk_width": CHUNK_WIDTH,
+        "chunks": chunks,
+        "triggers": [[x, y, target, list(color)] for (x, y), (target, color) in grid.triggers.items()],
+    }
+    encoded_header = _encode_header(header)
+
+    temp_filepath = filepath + ".tmp"
+    with open(temp_filepath, "wb") as f:
+        f.write(PREAMBLE.pack(MAGIC, VERSION, 0, len(encoded_header)))
+        f.write(encoded_header)
+        for encoded in data:
+            f.write(encoded)
+    release_file(filepath)
+    os.replace(temp_filepath, filepath)
+
+def update_metadata(filepath: str, metadata: dict) -> None:
+    """ Replaces the metadata of a binary level. The object data gets copied over as is (it's never decoded),
+    into a temp file that then replaces the level file, same as `write_binary_level`. """
+
+    temp_filepath = filepath + ".tmp"
+    with open(filepath, "rb") as f:
+        header_capacity = _read_preamble(f)
+        header = json.loads(f.read(header_capacity))
+        header["metadata"] = metadata
+
+        # keep the same header size if it still fits, otherwise reserve some new slack
+        encoded_header = _encode_header(header)
+        if len(encoded_header) - HEADER_SLACK <= header_capacity:
+            encoded_header = _encode_header(header, header_capacity)
+
+        with open(temp_filepath, "wb") as temp_f:
+            temp_f.write(PREAMBLE.pack(MAGIC, VERSION, 0, len(encoded_header)))
+            temp_f.write(encoded_header)
+            shutil.copyfileobj(f, temp_f)
+
+    release_file(filepath)
+    os.replace(temp_filepath, filepath)
+
+class LevelChunkSource:
+    """ Memory-mapped object data of a binary level. Decodes chunks for `LevelGrid.ensure_loaded`. """
+
+    def __init__(self, filepath: str) -> None:
+        self.filepath = os.path.abspath(filepath)
+        self.file = open(filepath, "rb")
+        header_capacity = _read_preamble(self.file)
+        self.header: dict = json.loads(self.file.read(header_capacity))
+
+        self.data_offset = PREAMBLE.size + header_capacity
+        self.length: int = self.header["length"]
+        self.height: int = self.header["height"]
+        self.chunk_width: int = self.header["chunk_width"]
+        self.chunk_offsets: List[int] = self.header["chunks"]
+
+        # mmap can't map an empty file (e.g. a level without any objects)
+        file_size = os.fstat(self.file.fileno()).st_size
+        self.mmap = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if file_size > 0 else None
+
+        expected_size = self.data_offset + sum(
+            _get_chunk_nbytes(self.height, self.get_chunk_width(chunk)) for chunk, offset in enumerate(self.chunk_offsets) if offset != -1
+        )
+        if file_size < expected_size:
+            self.close()
+            raise BinaryLevelError(f"[LevelChunkSource]: {filepath} is truncated ({file_size} bytes, expected {expected_size})")
+
+    @property
+    def num_chunks(self) -> int:
+        return len(self.chunk_offsets)
+
+    def get_chunk_width(self, chunk: int) -> int:
+        return min(self.chunk_width, self.length - chunk*self.chunk_width)
+
+    def read_chunk(self, chunk: int) -> Dict[str, np.ndarray] | None:
+        """ The arrays (name -> (height, chunk width) array) of a chunk, or None if it has no objects.
+        The arrays are read-only views of the mapped file, so copy them out before the source is closed. """
+
+        offset = self.chunk_offsets[chunk]
+        if offset == -1:
+            return None
+
+        width = self.get_chunk_width(chunk)
+        offset += self.data_offset
+        arrays = {}
+        for name, (dtype, _) in LevelGrid.ARRAYS.items():
+            dtype = np.dtype(dtype).newbyteorder("<")
+            arrays[name] = np.frombuffer(self.mmap, dtype=dtype, count=self.height*width, offset=offset).reshape(self.height, width)
+            offset += arrays[name].nbytes
+        return arrays
+
+    def close(self) -> None:
+        if self.mmap is not None:
+            self.mmap.close()
+            self.mmap = None
+        self.file.close()
+
+def open_binary_level(filepath: str) -> Tuple[dict, LevelGrid]:
+    """ Opens a binary level. Returns its header and a grid that decodes its chunks on demand. """
+
+    source = LevelChunkSource(filepath)
+    grid = LevelGrid(source.length, source.height)
+    for x, y, target, color in source.header["triggers"]:
+        grid.set_trigger(x, y, target, color)
+    grid.set_source(source)
+    _lazy_grids.add(grid)
+    return source.header, grid
+
+def _get_level_files(paths: List[str], extension: str) -> List[str]:
+    filepaths = []
+    for path in paths:
+        if os.path.isdir(path):
+            filepaths.extend(os.path.join(path, name) for name in sorted(os.listdir(path)) if name.endswith(extension))
+        else:
+            filepaths.append(path)
+    return filepaths
+
+def _diff_json(original, converted, path: str, diffs: Dict[str, int]) -> None:
+    """ Counts the differences between two json values in `diffs`, keyed by path. List indices are left out of the paths
+    (e.g. every cell of the leveldata is `leveldata[][]`), so the same difference on many objects is counted under one key. """
+
+    if isinstance(original, dict) and isinstance(converted, dict):
+        for key in original.keys() | converted.keys():
+            key_path = f"{path}.{key}" if path else key
+            if key not in converted:
+                diffs[f"{key_path} (removed)"] = diffs.get(f"{key_path} (removed)", 0) + 1
+            elif key not in original:
+                diffs[f"{key_path} (added)"] = diffs.get(f"{key_path} (added)", 0) + 1
+            else:
+                _diff_json(original[key], converted[key], key_path, diffs)
+    elif isinstance(original, list) and isinstance(converted, list) and len(original) == len(converted):
+        for original_item, converted_item in zip(original, converted):
+            _diff_json(original_item, converted_item, f"{path}[]", diffs)
+    elif original != converted:
+        diffs[path] = diffs.get(path, 0) + 1
+
+def main() -> None:
+    from level import Level # level imports this module
+
+    parser = argparse.ArgumentParser(description="Converts levels between the json and binary (.gdlevel) formats.")
+    parser.add_argument("paths", nargs="*", default=["levels/official", "levels/created"], help="level files or folders of them")
+    parser.add_argument("--to", choices=["binary", "json"], default="binary")
+    parser.add_argument("--verify", action="store_true", help="check that the converted file has exactly the same contents as the original one")
+    args = parser.parse_args()
+
+    source_extension = JSON_LEVEL_EXTENSION if args.to == "binary" else BINARY_LEVEL_EXTENSION
+    target_extension = BINARY_LEVEL_EXTENSION if args.to == "binary" else JSON_LEVEL_EXTENSION
+
+    for filepath in _get_level_files(args.paths, source_extension):
+        level = Level.parse_from_file(filepath)
+        target_filepath = os.path.splitext(filepath)[0] + target_extension
+        level.write_to_file(target_filepath)
+
+        if args.verify:
+            # compare what's actually in the json file with the other format, parsed back.
+            # round tripped through json.dumps so both sides look the same (e.g. tuples -> lists, int keys -> strings)
+            if args.to == "binary":
+                with open(filepath, 'r', encoding='utf-8') as f:
+                    original = json.load(f)
+                converted = Level.parse_from_file(target_filepath).to_json()
+            else:
+                original = Level.parse_from_file(filepath).to_json()
+                with open(target_filepath, 'r', encoding='utf-8') as f:
+                    converted = json.load(f)
+
+            diffs: Dict[str, int] = {}
+            _diff_json(json.loads(json.dumps(original)), json.loads(json.dumps(converted)), "", diffs)
+            print(f"{'MISMATCH' if diffs else 'ok'} {filepath} -> {target_filepath}")
+            for path, count in sorted(diffs.items()):
+                print(f"    {path}: {count}")
+        else:
+            print(f"{filepath} -> {target_filepath} ({os.path.getsize(filepath)} -> {os.path.getsize(target_filepath)} bytes)")
+
+if __name__ == "__main__":
+    main()
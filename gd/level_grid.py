@@ -0,0 +1,540 @@
+from typing import Dict, Iterable, List, NamedTuple, Tuple, TYPE_CHECKING
+import numpy as np
+
+from engine.objects import OBJECTS
+from render.constants import CameraConstants
+
+if TYPE_CHECKING:
+    from level_binary import LevelChunkSource
+
+class GridSnapshot(NamedTuple):
+    """ A read-only copy of a `LevelGrid` at some point, stored in chunks of columns so that the next snapshot
+    can share every chunk that didn't change since this one (see `LevelGrid.snapshot`) """
+    length: int
+    height: int
+    chunks: List[Dict[str, np.ndarray]]
+    """ chunk index -> per-cell array name -> the (read-only) columns of that chunk """
+    triggers: Dict[Tuple[int, int], Tuple[str | int, Tuple[int, int, int]]]
+
+    def to_grid(self) -> "LevelGrid":
+        """ A new grid with the contents of the snapshot """
+        if len(self.chunks) > 0:
+            grid = LevelGrid()
+            grid.use_storage({name: np.concatenate([chunk[name] for chunk in self.chunks], axis=1) for name in LevelGrid.ARRAYS}, self.length, self.height)
+        else:
+            grid = LevelGrid(self.length, self.height)
+        grid.triggers = self.triggers.copy()
+        return grid
+
+class LevelGrid:
+    """
+    Columnar storage for the objects of a level: one small numpy array per object attribute,
+    all indexed `[y, x]` (y=0 is the bottom row, same as level coordinates).
+
+    Empty cells have a type id of 0. Everything that only a handful of objects have (color trigger targets/colors)
+    lives in a sparse dict instead of a full array. `level.LevelObject`s are just views into this.
+
+    The arrays are views into bigger ones (`storage`) with room reserved to the right and at the top, so the grid can grow
+    (e.g. placing objects past the edges in the editor) without reallocating most of the time. Growing upwards just adds
+    rows after the existing ones, so y=0 always stays at index 0.
+    """
+
+    TYPE_NAMES: List[str | None] = [None, *OBJECTS.OBJECT_NAMES]
+    """ type id -> object type. 0 means no object """
+    TYPE_IDS: Dict[str, int] = {name: i for i, name in enumerate(TYPE_NAMES) if name is not None}
+    TYPE_DATA: list = [None, *(OBJECTS.get(name) for name in OBJECTS.OBJECT_NAMES)]
+    """ type id -> ObjectData (shared, don't modify) """
+
+    ROTATIONS: List[str] = [rotation.value for rotation in CameraConstants.OBJECT_ROTATIONS]
+    ROTATION_IDS: Dict[str, int] = {name: i for i, name in enumerate(ROTATIONS)}
+    REFLECTIONS: List[str] = [reflection.value for reflection in CameraConstants.OBJECT_REFLECTIONS]
+    REFLECTION_IDS: Dict[str, int] = {name: i for i, name in enumerate(REFLECTIONS)}
+
+    NO_CHANNEL = -1
+    """ Stored in the color channel arrays for objects that don't have that color """
+
+    GROW_LENGTH = 64
+    GROW_HEIGHT = 8
+    """ When the grid outgrows its `storage`, the new storage is at least 1.5x as big, rounded up to a multiple of these
+    (columns/rows), so growing one cell at a time is O(1) amortized """
+
+    SNAPSHOT_CHUNK_WIDTH = 64
+    """ Columns per chunk in a `GridSnapshot` (same as the chunks of the binary level format) """
+
+    FLAG_ACTIVATED = 1
+    """ Bit in `flags`: the object has been activated by the player (see `LevelObject.has_been_activated`) """
+
+    DEFAULT_TRIGGER_TARGET = "bg"
+    DEFAULT_TRIGGER_COLOR = (255, 255, 255)
+
+    ARRAYS: Dict[str, Tuple[type, int]] = {
+        "type_ids": (np.int16, 0),
+        "rotations": (np.uint8, 0),
+        "reflections": (np.uint8, 0),
+        "color1_channels": (np.int16, NO_CHANNEL),
+        "color2_channels": (np.int16, NO_CHANNEL),
+        "flags": (np.uint8, 0),
+    }
+    """ Name of each per-cell array -> (dtype, value for empty cells) """
+
+    NO_TEXTURE_KEY = -1
+    """ Stored in `texture_keys` for empty cells """
+
+    STORAGE_ARRAYS: Dict[str, Tuple[type, int]] = {**ARRAYS, "texture_keys": (np.int32, NO_TEXTURE_KEY)}
+    """ `ARRAYS` plus the ones derived from them, which aren't saved/snapshotted/journaled - just kept up to date
+    by everything here that writes to the cells """
+
+    TEXTURE_KEY_IDS: Dict[Tuple[str, str, str, int | None, int | None], int] = {}
+    """ (type, rotation, reflection, color1 channel, color2 channel) -> small int id (see `get_texture_key_id`).
+    Shared by every grid and `level.AbstractLevelObject`. """
+
+    def __init__(self, length: int = 0, height: int = 0) -> None:
+        self.storage: Dict[str, np.ndarray] = {name: LevelGrid.empty_array(name, length, height) for name in LevelGrid.STORAGE_ARRAYS}
+        """ per-cell array name -> the array that actually holds it. Can be bigger than the grid (room to grow into,
+        see `resize`), but the cells past the grid's edges are always empty. """
+
+        self.type_ids = self.storage["type_ids"]
+        """ Index into `TYPE_NAMES` """
+        self.rotations = self.storage["rotations"]
+        """ Index into `ROTATIONS` """
+        self.reflections = self.storage["reflections"]
+        """ Index into `REFLECTIONS` """
+        self.color1_channels = self.storage["color1_channels"]
+        self.color2_channels = self.storage["color2_channels"]
+        self.flags = self.storage["flags"]
+        self.texture_keys = self.storage["texture_keys"]
+        """ The texture key id (see `get_texture_key_id`) of each cell's object, precomputed so the renderer doesn't
+        have to build one for every object on every frame. `NO_TEXTURE_KEY` for empty cells. """
+
+        self.triggers: Dict[Tuple[int, int], Tuple[str | int, Tuple[int, int, int]]] = {}
+        """ (x, y) -> (trigger target, trigger color), only for objects whose values aren't the defaults """
+
+        self.source: "LevelChunkSource | None" = None
+        """ For grids opened from a binary level file: where the not-yet-loaded chunks get decoded from.
+        None once everything is loaded (or if the grid was never lazy). See `ensure_loaded`. """
+        self.loaded_chunks: np.ndarray = np.ones(0, dtype=bool)
+        """ chunk index -> whether that chunk's columns have been copied into the arrays yet """
+
+    def empty_array(name: str, length: int, height: int) -> np.ndarray:
+        """ A new (height, length) array for one of the `STORAGE_ARRAYS`, with every cell empty """
+        dtype, empty_value = LevelGrid.STORAGE_ARRAYS[name]
+        return np.full((height, length), empty_value, dtype=dtype)
+
+    @property
+    def length(self) -> int:
+        return self.type_ids.shape[1]
+
+    @property
+    def height(self) -> int:
+        return self.type_ids.shape[0]
+
+    def set_source(self, source: "LevelChunkSource") -> None:
+        """ Makes the grid load its columns lazily from `source` (see `level_binary.open_binary_level`) """
+        self.source = source
+        self.loaded_chunks = np.zeros(source.num_chunks, dtype=bool)
+        if source.num_chunks == 0:
+            self.close_source()
+
+    def ensure_loaded(self, start: int, end: int) -> None:
+        """ Makes sure the columns [start, end) are loaded. Anything reading the arrays directly has to call this first
+        (`Level.get_object_at`/`get_row` and the methods here already do). Does nothing for grids that aren't lazy. """
+
+        if self.source is None:
+            return
+
+        chunk_width = self.source.chunk_width
+        first_chunk, last_chunk = max(start, 0) // chunk_width, min(end, self.length) - 1
+        for chunk in range(first_chunk, last_chunk // chunk_width + 1):
+            if not self.loaded_chunks[chunk]:
+                self._load_chunk(chunk)
+
+        if self.loaded_chunks.all():
+            self.close_source()
+
+    def _load_chunk(self, chunk: int) -> None:
+        # separate function so the views into the mmap are gone by the time the source gets closed
+        arrays = self.source.read_chunk(chunk)
+        if arrays is not None: # chunks without objects are already empty in the arrays
+            start = chunk * self.source.chunk_width
+            columns = slice(start, start + self.source.get_chunk_width(chunk))
+            for name, array in arrays.items():
+                getattr(self, name)[:, columns] = array
+            self.update_texture_keys(columns.start, 0, columns.stop, self.height)
+        self.loaded_chunks[chunk] = True
+
+    def load_all(self) -> None:
+        """ Loads every chunk that hasn't been loaded yet (and closes the file) """
+        self.ensure_loaded(0, self.length)
+
+    def close_source(self) -> None:
+        if self.source is not None:
+            self.source.close()
+            self.source = None
+
+    def resize(self, length: int, height: int) -> None:
+        """ Grows (or shrinks) the grid to the given size, keeping the contents at the same (x, y).
+        Only reallocates if the grid outgrows its `storage` (and then reserves extra room, see `GROW_LENGTH`). """
+
+        self.load_all()
+        capacity_height, capacity_length = self.storage["type_ids"].shape
+
+        if length > capacity_length or height > capacity_height:
+            if length > capacity_length:
+                capacity_length = _get_grown_capacity(capacity_length, length, LevelGrid.GROW_LENGTH)
+            if height > capacity_height:
+                capacity_height = _get_grown_capacity(capacity_height, height, LevelGrid.GROW_HEIGHT)
+
+            keep_height, keep_length = min(height, self.height), min(length, self.length)
+            storage = {}
+            for name in LevelGrid.STORAGE_ARRAYS:
+                storage[name] = LevelGrid.empty_array(name, capacity_length, capacity_height)
+                storage[name][:keep_height, :keep_length] = getattr(self, name)[:keep_height, :keep_length]
+        else:
+            storage = self.storage
+            # whatever gets cut off has to be empty again, in case the grid grows back over it
+            for name, (_, empty_value) in LevelGrid.STORAGE_ARRAYS.items():
+                storage[name][height:self.height, :self.length] = empty_value
+                storage[name][:self.height, length:self.length] = empty_value
+
+        self.use_storage(storage, length, height)
+        self.triggers = {pos: value for pos, value in self.triggers.items() if pos[0] < length and pos[1] < height}
+
+    def use_storage(self, storage: Dict[str, np.ndarray], length: int, height: int) -> None:
+        """ Makes the grid `length` x `height`, with its arrays in `storage` (at least that big, and empty past those edges).
+        `storage` only needs the `ARRAYS`, the derived ones get computed if they're missing. """
+
+        missing_texture_keys = "texture_keys" not in storage
+        if missing_texture_keys:
+            capacity_height, capacity_length = storage["type_ids"].shape
+            storage["texture_keys"] = LevelGrid.empty_array("texture_keys", capacity_length, capacity_height)
+
+        self.storage = storage
+        for name, array in storage.items():
+            setattr(self, name, array[:height, :length])
+
+        if missing_texture_keys:
+            self.update_texture_keys(0, 0, length, height)
+
+    def get_texture_key_id(key: Tuple[str, str, str, int | None, int | None]) -> int:
+        """ Small int id for a (type, rotation, reflection, color1 channel, color2 channel) combination.
+        Used as part of the `TextureManager.texture_cache` key. """
+        return LevelGrid.TEXTURE_KEY_IDS.setdefault(key, len(LevelGrid.TEXTURE_KEY_IDS))
+
+    def update_texture_key(self, x: int, y: int) -> None:
+        """ Recomputes `texture_keys` for the cell (x, y). Call after writing to its cell arrays directly. """
+
+        type_id = self.type_ids[y, x]
+        if type_id == 0:
+            self.texture_keys[y, x] = LevelGrid.NO_TEXTURE_KEY
+            return
+
+        color1_channel, color2_channel = int(self.color1_channels[y, x]), int(self.color2_channels[y, x])
+        self.texture_keys[y, x] = LevelGrid.get_texture_key_id((
+            LevelGrid.TYPE_NAMES[type_id],
+            LevelGrid.ROTATIONS[self.rotations[y, x]],
+            LevelGrid.REFLECTIONS[self.reflections[y, x]],
+            color1_channel if color1_channel != LevelGrid.NO_CHANNEL else None,
+            color2_channel if color2_channel != LevelGrid.NO_CHANNEL else None
+        ))
+
+    def update_texture_keys(self, x0: int, y0: int, x1: int, y1: int) -> None:
+        """ Recomputes `texture_keys` for every cell in [x0, x1) x [y0, y1) (clipped to the grid).
+        Only looks up an id once per distinct combination in the area, so it's fine for big areas. """
+
+        x0, y0 = max(x0, 0), max(y0, 0)
+        x1, y1 = min(x1, self.length), min(y1, self.height)
+        if x0 >= x1 or y0 >= y1:
+            return
+
+        area = (slice(y0, y1), slice(x0, x1))
+        type_ids = self.type_ids[area].astype(np.int64)
+        # every field packed into one int, so np.unique can find the distinct combinations
+        codes = type_ids
+        codes = (codes << 8) | self.rotations[area]
+        codes = (codes << 8) | self.reflections[area]
+        codes = (codes << 16) | (self.color1_channels[area].astype(np.int64) & 0xffff)
+        codes = (codes << 16) | (self.color2_channels[area].astype(np.int64) & 0xffff)
+
+        unique_codes, first_indices, inverse = np.unique(codes, return_index=True, return_inverse=True)
+        ys, xs = np.unravel_index(first_indices, codes.shape)
+        ids = np.empty(len(unique_codes), dtype=np.int32)
+        for i, (y, x) in enumerate(zip(ys.tolist(), xs.tolist())):
+            self.update_texture_key(x0 + x, y0 + y)
+            ids[i] = self.texture_keys[y0 + y, x0 + x]
+
+        self.texture_keys[area] = ids[inverse.reshape(codes.shape)]
+
+    def snapshot(self, previous: GridSnapshot | None = None, dirty_chunks: Iterable[int] = ()) -> GridSnapshot:
+        """
+        A read-only copy of the grid. Chunks of `SNAPSHOT_CHUNK_WIDTH` columns that haven't changed since `previous`
+        (a snapshot of this grid) are shared with it instead of copied, so only `dirty_chunks` (chunk indices that might
+        have changed since then) cost anything. Without a previous snapshot, everything gets copied.
+        """
+
+        self.load_all()
+        chunk_width = LevelGrid.SNAPSHOT_CHUNK_WIDTH
+        num_chunks = (self.length + chunk_width - 1) // chunk_width
+
+        reusable = set()
+        if previous is not None and previous.height == self.height:
+            reusable = set(range(min(num_chunks, len(previous.chunks)))).difference(dirty_chunks)
+            if previous.length != self.length: # the last chunk might have gotten wider
+                reusable.discard(len(previous.chunks) - 1)
+
+        chunks = []
+        for chunk in range(num_chunks):
+            if chunk in reusable:
+                chunks.append(previous.chunks[chunk])
+                continue
+
+            columns = slice(chunk * chunk_width, (chunk + 1) * chunk_width)
+            arrays = {}
+            for name in LevelGrid.ARRAYS:
+                arrays[name] = getattr(self, name)[:, columns].copy()
+                arrays[name].flags.writeable = False
+            chunks.append(arrays)
+
+        return GridSnapshot(self.length, self.height, chunks, self.triggers.copy())
+
+    def get_cells(self, x0: int, y0: int, x1: int, y1: int) -> Dict[str, np.ndarray]:
+        """ Copies of every per-cell array in the rectangle [x0, x1) x [y0, y1), indexed `[y - y0, x - x0]`.
+        Cells outside the grid come back empty. (Sparse trigger values aren't included, see `triggers`) """
+
+        self.ensure_loaded(x0, x1)
+        cells = {name: LevelGrid.empty_array(name, x1 - x0, y1 - y0) for name in LevelGrid.ARRAYS}
+
+        inside_x0, inside_y0 = max(x0, 0), max(y0, 0)
+        inside_x1, inside_y1 = min(x1, self.length), min(y1, self.height)
+        if inside_x0 < inside_x1 and inside_y0 < inside_y1:
+            for name, array in cells.items():
+                array[inside_y0-y0:inside_y1-y0, inside_x0-x0:inside_x1-x0] = getattr(self, name)[inside_y0:inside_y1, inside_x0:inside_x1]
+        return cells
+
+    def set_cells(self, xs: np.ndarray, ys: np.ndarray, values: Dict[str, np.ndarray]) -> None:
+        """ Writes `values[name][i]` into cell (xs[i], ys[i]) of each per-cell array. Grows the grid if needed.
+        (Sparse trigger values aren't touched, see `set_trigger`) """
+
+        if len(xs) == 0:
+            return
+
+        self.ensure_size(int(xs.max()) + 1, int(ys.max()) + 1)
+        self.ensure_loaded(int(xs.min()), int(xs.max()) + 1)
+
+        for name in LevelGrid.ARRAYS:
+            getattr(self, name)[ys, xs] = values[name]
+        self.update_texture_keys(int(xs.min()), int(ys.min()), int(xs.max()) + 1, int(ys.max()) + 1)
+
+    def has_object(self, x: int, y: int) -> bool:
+        return 0 <= x < self.length and 0 <= y < self.height and self.type_ids[y, x] != 0
+
+    def set_object(
+        self,
+        x: int,
+        y: int,
+        type: str,
+        rotation: str,
+        reflection: str,
+        color1_channel: int | None,
+        color2_channel: int | None,
+        trigger_target: str | int | None = None,
+        trigger_color: Tuple[int, int, int] | None = None,
+        has_been_activated: bool = False
+        ) -> None:
+        """ Writes an object into the cell (x, y), which has to be inside the grid. """
+
+        values = LevelGrid.get_cell_values(type, rotation, reflection, color1_channel, color2_channel, has_been_activated)
+        for name, value in values.items():
+            getattr(self, name)[y, x] = value
+        self.texture_keys[y, x] = LevelGrid.get_texture_key_id((type, rotation, reflection, color1_channel, color2_channel))
+        self.set_trigger(x, y, trigger_target, trigger_color)
+
+    def get_cell_values(
+        type: str,
+        rotation: str,
+        reflection: str,
+        color1_channel: int | None,
+        color2_channel: int | None,
+        has_been_activated: bool = False
+        ) -> Dict[str, int]:
+        """ per-cell array name -> what gets stored in it for an object with these attributes """
+
+        type_id = LevelGrid.TYPE_IDS.get(type)
+        if type_id is None:
+            raise ValueError(f"[LevelGrid/get_cell_values]: unknown object type {type}")
+
+        return {
+            "type_ids": type_id,
+            "rotations": LevelGrid.ROTATION_IDS[rotation],
+            "reflections": LevelGrid.REFLECTION_IDS[reflection],
+            "color1_channels": color1_channel if color1_channel is not None else LevelGrid.NO_CHANNEL,
+            "color2_channels": color2_channel if color2_channel is not None else LevelGrid.NO_CHANNEL,
+            "flags": LevelGrid.FLAG_ACTIVATED if has_been_activated else 0,
+        }
+
+    def fill_cells(
+        self,
+        x0: int, y0: int, x1: int, y1: int,
+        type: str,
+        rotation: str,
+        reflection: str,
+        color1_channel: int | None,
+        color2_channel: int | None,
+        trigger_target: str | int | None = None,
+        trigger_color: Tuple[int, int, int] | None = None
+        ) -> None:
+        """ Writes the same object into every cell of [x0, x1) x [y0, y1) (nonnegative). Grows the grid if needed. """
+
+        self.ensure_size(x1, y1)
+        self.ensure_loaded(x0, x1)
+
+        values = LevelGrid.get_cell_values(type, rotation, reflection, color1_channel, color2_channel)
+        for name, value in values.items():
+            getattr(self, name)[y0:y1, x0:x1] = value
+        self.texture_keys[y0:y1, x0:x1] = LevelGrid.get_texture_key_id((type, rotation, reflection, color1_channel, color2_channel))
+
+        self.clear_triggers(x0, y0, x1, y1)
+        trigger_target = trigger_target or LevelGrid.DEFAULT_TRIGGER_TARGET
+        trigger_color = tuple(trigger_color) if trigger_color else LevelGrid.DEFAULT_TRIGGER_COLOR
+        if trigger_target != LevelGrid.DEFAULT_TRIGGER_TARGET or trigger_color != LevelGrid.DEFAULT_TRIGGER_COLOR:
+            # only color triggers have these, so this is never many cells
+            for y in range(y0, y1):
+                for x in range(x0, x1):
+                    self.triggers[(x, y)] = (trigger_target, trigger_color)
+
+    def paste_cells(self, x: int, y: int, cells: Dict[str, np.ndarray], mask: np.ndarray | None = None) -> None:
+        """ Writes `cells` (per-cell arrays indexed `[y, x]`, like from `get_cells`) with their bottom left corner at (x, y),
+        which has to be nonnegative. Only the cells where `mask` is true if given. Grows the grid if needed.
+        (Sparse trigger values aren't touched, see `set_trigger`) """
+
+        height, length = cells["type_ids"].shape
+        self.ensure_size(x + length, y + height)
+        self.ensure_loaded(x, x + length)
+
+        for name in LevelGrid.ARRAYS:
+            area = getattr(self, name)[y:y+height, x:x+length]
+            if mask is None:
+                area[:] = cells[name]
+            else:
+                area[mask] = cells[name][mask]
+        self.update_texture_keys(x, y, x + length, y + height)
+
+    def clear_cells(self, x0: int, y0: int, x1: int, y1: int) -> None:
+        """ Removes every object in [x0, x1) x [y0, y1). Anything outside the grid is already empty. """
+
+        x0, y0 = max(x0, 0), max(y0, 0)
+        x1, y1 = min(x1, self.length), min(y1, self.height)
+        if x0 >= x1 or y0 >= y1:
+            return
+
+        self.ensure_loaded(x0, x1)
+        for name, (_, empty_value) in LevelGrid.STORAGE_ARRAYS.items():
+            getattr(self, name)[y0:y1, x0:x1] = empty_value
+        self.clear_triggers(x0, y0, x1, y1)
+
+    def clear_triggers(self, x0: int, y0: int, x1: int, y1: int) -> None:
+        """ Resets the sparse trigger values of every cell in [x0, x1) x [y0, y1) to the defaults """
+        for pos in [pos for pos in self.triggers if x0 <= pos[0] < x1 and y0 <= pos[1] < y1]:
+            del self.triggers[pos]
+
+    def ensure_size(self, length: int, height: int) -> None:
+        """ Grows the grid if it's smaller than `length` x `height` """
+        if length > self.length or height > self.height:
+            self.resize(max(self.length, length), max(self.height, height))
+
+    def set_object_from_json(self, x: int, y: int, definition: dict) -> None:
+        """ Writes an object from its level file format (see `level.LevelObjectDefSchema`).
+        Color channels the object type doesn't have are dropped, same as they always were. """
+
+        num_channels = OBJECTS.get(definition["type"])["color_channels"]
+        self.set_object(
+            x, y,
+            definition["type"],
+            definition["rotation"],
+            definition["reflection"],
+            definition["color1_channel"] if num_channels > 0 else None,
+            definition["color2_channel"] if num_channels > 1 else None,
+            definition.get("trigger_target"),
+            definition.get("trigger_color")
+        )
+
+    def clear(self, x: int, y: int) -> None:
+        """ Removes the object at (x, y), if there is one """
+        self.type_ids[y, x] = 0
+        self.color1_channels[y, x] = LevelGrid.NO_CHANNEL
+        self.color2_channels[y, x] = LevelGrid.NO_CHANNEL
+        self.rotations[y, x] = self.reflections[y, x] = self.flags[y, x] = 0
+        self.texture_keys[y, x] = LevelGrid.NO_TEXTURE_KEY
+        self.triggers.pop((x, y), None)
+
+    def get_trigger(self, x: int, y: int) -> Tuple[str | int, Tuple[int, int, int]]:
+        """ (trigger target, trigger color) of the object at (x, y) """
+        return self.triggers.get((x, y), (LevelGrid.DEFAULT_TRIGGER_TARGET, LevelGrid.DEFAULT_TRIGGER_COLOR))
+
+    def set_trigger(self, x: int, y: int, target: str | int | None, color: Tuple[int, int, int] | None) -> None:
+        """ None/falsy values mean the default (same as the old `definition.get(...) or default`) """
+        target = target or LevelGrid.DEFAULT_TRIGGER_TARGET
+        color = tuple(color) if color else LevelGrid.DEFAULT_TRIGGER_COLOR
+
+        if target == LevelGrid.DEFAULT_TRIGGER_TARGET and color == LevelGrid.DEFAULT_TRIGGER_COLOR:
+            self.triggers.pop((x, y), None)
+        else:
+            self.triggers[(x, y)] = (target, color)
+
+    def to_json(self, x: int, y: int) -> dict | None:
+        """ The object at (x, y) in the level file format, or None if the cell is empty """
+
+        type_id = self.type_ids[y, x]
+        if type_id == 0:
+            return None
+
+        color1_channel, color2_channel = int(self.color1_channels[y, x]), int(self.color2_channels[y, x])
+        trigger_target, trigger_color = self.get_trigger(x, y)
+        return {
+            "type": LevelGrid.TYPE_NAMES[type_id],
+            "rotation": LevelGrid.ROTATIONS[self.rotations[y, x]],
+            "reflection": LevelGrid.REFLECTIONS[self.reflections[y, x]],
+            "color1_channel": color1_channel if color1_channel != LevelGrid.NO_CHANNEL else None,
+            "color2_channel": color2_channel if color2_channel != LevelGrid.NO_CHANNEL else None,
+            "trigger_target": trigger_target,
+            "trigger_color": trigger_color
+        }
+
+    def from_json_rows(rows: List[List[dict | None]]) -> "LevelGrid":
+        """ Builds a grid from the `leveldata` of a level file (first row = highest row). Rows can have different lengths. """
+
+        grid = LevelGrid(max((len(row) for row in rows), default=0), len(rows))
+        for y, row in enumerate(reversed(rows)):
+            for x, definition in enumerate(row):
+                if definition:
+                    grid.set_object_from_json(x, y, definition)
+        return grid
+
+    def to_json_rows(self) -> List[List[dict | None]]:
+        """ The `leveldata` for a level file (first row = highest row) """
+        self.load_all()
+        return [[self.to_json(x, y) for x in range(self.length)] for y in range(self.height - 1, -1, -1)]
+
+    def get_channels_in(self, start: int, end: int, hide_invis: bool = False) -> Tuple[int, ...]:
+        """ Ids of every color channel used by the objects in columns [start, end). Color triggers don't count,
+        and neither do invisible objects if `hide_invis`, since they don't get drawn with their colors. """
+
+        self.ensure_loaded(start, end)
+        type_ids = self.type_ids[:, start:end]
+        drawn = (type_ids != 0) & (type_ids != LevelGrid.TYPE_IDS["color_trigger"])
+        if hide_invis:
+            drawn &= ~_TYPE_INVISIBLE[type_ids]
+
+        channels = np.union1d(self.color1_channels[:, start:end][drawn], self.color2_channels[:, start:end][drawn])
+        return tuple(int(channel) for channel in channels if channel != LevelGrid.NO_CHANNEL)
+
+    def nbytes(self) -> int:
+        """ Memory used by the arrays (including the derived ones and the room reserved to grow into, not counting the sparse trigger table) """
+        return sum(array.nbytes for array in self.storage.values())
+
+def _get_grown_capacity(capacity: int, needed: int, step: int) -> int:
+    """ New size for storage that has to fit `needed` (see `LevelGrid.GROW_LENGTH`) """
+    grown = max(needed, capacity + capacity // 2)
+    return (grown + step - 1) // step * step
+
+_TYPE_INVISIBLE = np.array([bool(data and data.get("invisible")) for data in LevelGrid.TYPE_DATA])
+""" type id -> whether that object type is invisible """
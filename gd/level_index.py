@@ -0,0 +1,119 @@
+from typing import Dict, List, Tuple
+import json
+import os
+import threading
+
+from logger import Logger
+from level import Level
+
+class LevelIndex:
+    """
+    Persistent cache of level metadata, so the level menus don't have to open every level file on startup.
+    Static, like `Logger`.
+
+    Entries are keyed by (normalized) path, and are only trusted while the file's mtime and size still match -
+    anything else gets its metadata re-read (see `Level.read_metadata`) and the index rewritten.
+    Code that writes level files should call `update` afterwards (`Game.write_highest_progress_to_file`, `LevelEditor.save`),
+    although a stale entry would also be caught by the mtime/size check.
+    """
+
+    INDEX_FILEPATH = "./levels/.metadata_index.json"
+    VERSION = 1
+
+    entries: Dict[str, dict] | None = None
+    """ path -> {"mtime_ns", "size", "metadata"}. None until the index file is loaded (see `load`) """
+
+    dirty = False
+    """ Whether `entries` changed since the index file was last written """
+
+    lock = threading.RLock()
+    """ Held by every function here, since the editor's autosave thread updates the index while the menus/game
+    might be using it (reentrant, since they call each other) """
+
+    def load() -> None:
+        """ Reads the index file, if it hasn't been read yet. A missing or broken index just starts out empty. """
+
+        with LevelIndex.lock:
+            if LevelIndex.entries is not None:
+                return
+
+            LevelIndex.entries = {}
+            try:
+                with open(LevelIndex.INDEX_FILEPATH, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if data.get("version") == LevelIndex.VERSION:
+                    LevelIndex.entries = data["entries"]
+            except FileNotFoundError:
+                pass
+            except (ValueError, KeyError, AttributeError) as e:
+                Logger.log(f"[LevelIndex/load]: ignoring broken index file {LevelIndex.INDEX_FILEPATH} ({e!r})")
+
+    def save() -> None:
+        """ Writes the index file if anything changed. Written to a temporary file first, so it's never half written. """
+
+        with LevelIndex.lock:
+            if not LevelIndex.dirty:
+                return
+
+            temp_filepath = LevelIndex.INDEX_FILEPATH + ".tmp"
+            try:
+                with open(temp_filepath, 'w', encoding='utf-8') as f:
+                    json.dump({"version": LevelIndex.VERSION, "entries": LevelIndex.entries}, f)
+                os.replace(temp_filepath, LevelIndex.INDEX_FILEPATH)
+                LevelIndex.dirty = False
+            except OSError as e:
+                Logger.log(f"[LevelIndex/save]: couldn't write {LevelIndex.INDEX_FILEPATH} ({e!r})")
+
+    def get_metadata(filepath: str) -> dict:
+        """ The (raw, as stored in the file) metadata of a level. Only opens the level file if it changed since it was indexed. """
+
+        with LevelIndex.lock:
+            LevelIndex.load()
+
+            key = os.path.normpath(filepath)
+            stat = os.stat(filepath)
+            entry = LevelIndex.entries.get(key)
+            if entry is not None and entry["mtime_ns"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+                return entry["metadata"]
+
+            metadata = Level.read_metadata(filepath)
+            LevelIndex.entries[key] = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "metadata": metadata}
+            LevelIndex.dirty = True
+            return metadata
+
+    def list_levels(directory: str) -> List[Tuple[str, dict]]:
+        """ (path, metadata) of every level in a directory (see `Level.list_level_files`).
+        Also forgets levels in that directory that don't exist anymore, and saves the index if anything changed. """
+
+        with LevelIndex.lock:
+            LevelIndex.load()
+
+            levels = [(path, LevelIndex.get_metadata(path)) for path in Level.list_level_files(directory)]
+
+            existing = {os.path.normpath(path) for path, _ in levels}
+            normalized_directory = os.path.normpath(directory)
+            for key in list(LevelIndex.entries):
+                if os.path.dirname(key) == normalized_directory and key not in existing:
+                    del LevelIndex.entries[key]
+                    LevelIndex.dirty = True
+
+            LevelIndex.save()
+            return levels
+
+    def update(filepath: str, metadata: dict | None = None) -> None:
+        """ Call after writing a level file. Pass the metadata that was just written to avoid reading it back. """
+
+        with LevelIndex.lock:
+            LevelIndex.load()
+
+            key = os.path.normpath(filepath)
+            if metadata is None:
+                LevelIndex.entries.pop(key, None)
+                LevelIndex.get_metadata(filepath)
+            else:
+                stat = os.stat(filepath)
+                # round trip through json so the entry looks the same as one read from the file (e.g. no int keys)
+                LevelIndex.entries[key] = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "metadata": json.loads(json.dumps(metadata))}
+                LevelIndex.dirty = True
+
+            LevelIndex.save()
@@ -1,5 +1,15 @@
+import sys
+from startup import Startup
+
+if "--profile-startup" in sys.argv:
+    Startup.begin_profiling() # before anything else gets imported, so all of it shows up in the profile
+
 from menus.menu_handler import MenuHandler
 from logger import Logger
+from profiler import Profiler
+from render.escape_cache import EscapeCache
+from render.texture_manager import TextureManager
+from render.texture_cache import CompiledTextureCache
 import traceback
 from cursor import hide, show
 from draw_utils import cls
@@ -19,5 +29,12 @@ if __name__ == "__main__":
         print(f"\x1b[31m{traceback.format_exc()}\x1b[0m")
     
     show()        
+    Startup.wait_for_all() # the preloader might still be compiling textures
     Logger.write()
+    CompiledTextureCache.save()
+    Startup.write_profile()
+    Profiler.write(extra={
+        "escape_cache": EscapeCache.stats(),
+        "texture_cache": {"hits": TextureManager.texture_cache.hits, "misses": TextureManager.texture_cache.misses, "size": len(TextureManager.texture_cache)},
+    })
         
\ No newline at end of file
@@ -1,6 +1,7 @@
 from typing import Literal
 from logger import Logger
 from render.camera_frame import CameraFrame
+from render.frame_pool import FramePool
 from render.texture_manager import TextureManager
 from gd_constants import GDConstants
 from blessed.keyboard import Keystroke
@@ -17,6 +18,8 @@ corner_deco_TR = TextureManager.reflect_texture(corner_deco_BL, 'both')
 class CreateLevelMenu(GenericMenu):
     
     curr_frame: CameraFrame | None = None
+    frame_pool = FramePool()
+    """ Buffers the menu gets drawn into, reused between renders """
     
     selected_option_idx: int = 0
     """ Index of the currently selected option, 0 for editing name, 1 for save button, 2 for cancel button """
@@ -43,7 +46,7 @@ class CreateLevelMenu(GenericMenu):
     BUTTON_PADDING_X = 5 # px
     
     def render():
-        new_frame = CameraFrame()
+        new_frame = CreateLevelMenu.frame_pool.acquire(avoid=CreateLevelMenu.curr_frame)
         new_frame.fill_with_gradient(CreateLevelMenu.BG_COLOR_2, CreateLevelMenu.BG_COLOR, "vertical")
 
         horiz_center = int(0.5 * new_frame.width)
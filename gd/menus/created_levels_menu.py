@@ -1,12 +1,12 @@
-import json
-import os
 from typing import List, Literal
 from logger import Logger
 from render.camera_frame import CameraFrame
+from render.frame_pool import FramePool
 from render.texture_manager import TextureManager
 from gd_constants import GDConstants
 from blessed.keyboard import Keystroke
 from menus.MENU_GENERIC import GenericMenu
+from level_index import LevelIndex
 from render.utils import fcode_opt as fco
 
 
@@ -33,6 +33,8 @@ class CreatedLevelsMenu(GenericMenu):
 
     frame: CameraFrame = None
     """ The frame that the level selector is drawn on. None until the init_level_selector is called at least once """
+    frame_pool = FramePool()
+    """ Buffers `frame` gets drawn into, reused between renders """
     
     created_levels_index = 0
     selected_option = 1
@@ -68,14 +70,9 @@ class CreatedLevelsMenu(GenericMenu):
 
         created_levels=[]
 
-        path_to_json = 'levels/created'
-        json_files = [pos_json for pos_json in os.listdir(path_to_json) if pos_json.endswith('.json')]
-        
-        for file in json_files:
-            f = open(path_to_json+"/"+file)
-            data = json.load(f)['metadata']
+        for path, data in LevelIndex.list_levels('./levels/created'):
             created_levels.append({'name':data['name'], 'color':data['start_settings']['bg_color'], 
-                        'path':'./'+path_to_json+'/'+file})
+                        'path':path})
 
         return created_levels
     
@@ -93,7 +90,7 @@ class CreatedLevelsMenu(GenericMenu):
         
         level_data = c.created_levels[c.created_levels_index]
         
-        c.frame = CameraFrame()
+        c.frame = c.frame_pool.acquire()
         c.frame.fill(level_data['color'])
         
         # handy variables, derived from screen size and preset proportions
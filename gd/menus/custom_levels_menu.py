@@ -1,6 +1,7 @@
 from typing import Literal
 from logger import Logger
 from render.camera_frame import CameraFrame
+from render.frame_pool import FramePool
 from render.texture_manager import TextureManager
 from gd_constants import GDConstants
 from blessed.keyboard import Keystroke
@@ -14,6 +15,8 @@ corner_deco_TR = TextureManager.reflect_texture(corner_deco_BL, 'both')
 class CustomLevelsMenu(GenericMenu):
     
     curr_frame: CameraFrame | None = None
+    frame_pool = FramePool()
+    """ Buffers the menu gets drawn into, reused between renders """
     
     selected_option = 1
     # 0 = quit, 1 = play, 2 = editor
@@ -38,7 +41,7 @@ class CustomLevelsMenu(GenericMenu):
     MIDDLE_BUTTON_SIZE_PX = 28 # px
     
     def render():
-        new_frame = CameraFrame()
+        new_frame = CustomLevelsMenu.frame_pool.acquire(avoid=CustomLevelsMenu.curr_frame)
         new_frame.fill_with_gradient(CustomLevelsMenu.BG_COLOR_2, CustomLevelsMenu.BG_COLOR, "vertical")
 
         horiz_center = int(0.5 * new_frame.width)
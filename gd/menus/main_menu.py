@@ -1,6 +1,7 @@
 from typing import Literal
 from logger import Logger
 from render.camera_frame import CameraFrame
+from render.frame_pool import FramePool
 from render.texture_manager import TextureManager
 from gd_constants import GDConstants
 from blessed.keyboard import Keystroke
@@ -9,6 +10,8 @@ from menus.MENU_GENERIC import GenericMenu
 class MainMenu(GenericMenu):
     
     curr_frame: CameraFrame | None = None
+    frame_pool = FramePool()
+    """ Buffers the menu gets drawn into, reused between renders """
     
     selected_option = 1
     # 0 = quit, 1 = play, 2 = editor
@@ -33,7 +36,7 @@ class MainMenu(GenericMenu):
     MIDDLE_BUTTON_SIZE_PX = 36 # px
     
     def render():
-        new_frame = CameraFrame()
+        new_frame = MainMenu.frame_pool.acquire(avoid=MainMenu.curr_frame)
         new_frame.fill_with_gradient(MainMenu.BG_COLOR_2, MainMenu.BG_COLOR, "vertical")
         
         # add rectangle for ground
@@ -2,18 +2,14 @@ from typing import Literal
 from time import sleep, time_ns, time
 import traceback
 
+from importlib import import_module
+
 from gd_constants import GDConstants
 from logger import Logger
-from menus.main_menu import MainMenu
-from menus.official_levels_menu import OfficialLevelsMenu
-from menus.custom_levels_menu import CustomLevelsMenu
-from menus.create_level_menu import CreateLevelMenu
-from menus.created_levels_menu import CreatedLevelsMenu
-from menus.online_levels_menu import OnlineLevelsMenu
-from editor.level_editor import LevelEditor
+from startup import Startup
+from menus.main_menu import MainMenu # the only menu imported up front, the rest get preloaded (see `Startup`)
 from audio import AudioHandler
 import sys
-from game import Game
 from level import Level
 #sys.path.append("..")
 #import launcher
@@ -23,14 +19,16 @@ class MenuHandler:
     (i.e. which menu is currently being displayed, moving between menus, etc.) """
     
     MENU_LIST = {
-        'main': MainMenu,
-        'custom_levels': CustomLevelsMenu,
-        'official_levels': OfficialLevelsMenu,
-        'create_new': CreateLevelMenu,
-        'created_levels': CreatedLevelsMenu,
-        'online_levels': OnlineLevelsMenu,
+        'main': "menus.main_menu:MainMenu",
+        'custom_levels': "menus.custom_levels_menu:CustomLevelsMenu",
+        'official_levels': "menus.official_levels_menu:OfficialLevelsMenu",
+        'create_new': "menus.create_level_menu:CreateLevelMenu",
+        'created_levels': "menus.created_levels_menu:CreatedLevelsMenu",
+        'online_levels': "menus.online_levels_menu:OnlineLevelsMenu",
         
     }
+    """ page name -> `module:class` of its menu. Only the main menu is imported up front, the rest get preloaded
+    in the background (see `Startup`) - use `get_menu` to get the class. """
     
     PREV_PAGES = {
         "custom_levels": "main",
@@ -48,8 +46,8 @@ class MenuHandler:
     
     in_level = False
     in_level_editor = False
-    # loads in main menu music
-    audio_handler = AudioHandler("./assets/audio/mainmenu.mp3", loops=-1)
+    audio_handler: AudioHandler = None
+    """ Plays the main menu music. Created once the main menu is up, since it needs pygame's mixer (see `Startup`) """
 
     def run():
         """ 
@@ -60,9 +58,15 @@ class MenuHandler:
         
         MenuHandler.running = True
         MenuHandler._render_page(MenuHandler.current_page)
+        Startup.mark("first menu drawn")
+        
+        # load everything else while the menu waits for input (started after drawing, so it doesn't slow the drawing down)
+        Startup.begin_preloading()
 
-        # start playing main menu music
+        # loads in main menu music (waits for the mixer if it's still being preloaded) and starts playing it
+        MenuHandler.audio_handler = AudioHandler("./assets/audio/mainmenu.mp3", loops=-1)
         MenuHandler.audio_handler.begin_playing_song()
+        Startup.mark("menu music started")
         
         while True:
             
@@ -96,7 +100,7 @@ class MenuHandler:
                 # otherwise, pass the key input to the current menu
                 else:
                     #Logger.log(f"[MenuHandler] sending key {val.name} to {MenuHandler.current_page}")
-                    action = MenuHandler.MENU_LIST[MenuHandler.current_page].on_key(val)
+                    action = MenuHandler.get_menu(MenuHandler.current_page).on_key(val)
                     #Logger.log(f"[MenuHandler] action: {action}")
                     match action:
                         
@@ -111,7 +115,7 @@ class MenuHandler:
                             MenuHandler._render_page("custom_levels")  
                         case "play_level":
                             # stop playing the music when you enter a level
-                            MenuHandler.run_level(OfficialLevelsMenu.get_selected_level_filepath())
+                            MenuHandler.run_level(MenuHandler.get_menu("official_levels").get_selected_level_filepath())
                         
                         ### CUSTOM LEVELS PAGE
                         case "create_new_level":
@@ -124,10 +128,10 @@ class MenuHandler:
                         ### CREATED LEVELS PAGE
                         case "play_created_level":
                             MenuHandler.audio_handler.stop_playing_song()
-                            MenuHandler.run_level(CreatedLevelsMenu.get_selected_level_filepath())
+                            MenuHandler.run_level(MenuHandler.get_menu("created_levels").get_selected_level_filepath())
                         case "edit_current_level":
                             MenuHandler.audio_handler.stop_playing_song()
-                            MenuHandler.edit_level(CreatedLevelsMenu.get_selected_level_filepath())
+                            MenuHandler.edit_level(MenuHandler.get_menu("created_levels").get_selected_level_filepath())
                             
                         ### CREATE NEW LEVEL PAGE
                         case "goto_custom_levels_menu":
@@ -143,6 +147,8 @@ class MenuHandler:
         
         """ Enters into the actual level loop, running the specified level file """
 
+        from game import Game # usually already imported by the preloader (see `Startup`)
+
         MenuHandler.in_level = True
         #del MenuHandler.audio_handler # can only have one audio handler at a time
         MenuHandler.audio_handler.stop_playing_song()
@@ -168,6 +174,8 @@ class MenuHandler:
         
         """ Enters into the actual level loop, running the specified level file """
 
+        from editor.level_editor import LevelEditor # usually already imported by the preloader (see `Startup`)
+
         MenuHandler.in_level_editor = True
 
         editor=LevelEditor(filepath)
@@ -182,9 +190,14 @@ class MenuHandler:
             while GDConstants.term.inkey(timeout=0.01):
                 pass
             
+    def get_menu(page_name: str):
+        """ The menu class of a page (see `MENU_LIST`). Imports it if the preloader hasn't gotten to it yet. """
+        module_name, _, class_name = MenuHandler.MENU_LIST[page_name].partition(":")
+        return getattr(import_module(module_name), class_name)
+    
     def _render_page(page_name: str, *args, **kwargs) -> None:
         """ Renders the specified menu page and updates the current page field, 
         optionally allowing extra params for the render() method """
         MenuHandler.current_page = page_name
-        MenuHandler.MENU_LIST[MenuHandler.current_page].render(*args, **kwargs)
+        MenuHandler.get_menu(MenuHandler.current_page).render(*args, **kwargs)
         
\ No newline at end of file
@@ -2,11 +2,12 @@ from typing import TypedDict, Tuple, Literal
 from logger import Logger
 #from bottom_menu import *
 from render.camera_frame import CameraFrame
+from render.frame_pool import FramePool
 from render.texture_manager import TextureManager
 from draw_utils import print3
 from render.utils import fcode_opt as fco
 from blessed.keyboard import Keystroke
-import os, json
+from level_index import LevelIndex
 from gd_constants import GDConstants
 from menus.MENU_GENERIC import GenericMenu
 
@@ -29,6 +30,8 @@ class OfficialLevelsMenu(GenericMenu):
     
     frame: CameraFrame = None
     """ The frame that the level selector is drawn on. None until the init_level_selector is called at least once """
+    frame_pool = FramePool()
+    """ Buffers `frame` gets drawn into, reused between renders """
     
     selected_level_idx = 0
     """ Index of the currently selected level """
@@ -49,17 +52,12 @@ class OfficialLevelsMenu(GenericMenu):
 
         levels=[]
 
-        path_to_json = 'levels/official'
-        json_files = [pos_json for pos_json in os.listdir(path_to_json) if pos_json.endswith('.json')]
-        
-        for file in json_files:
-            f = open('levels/official/'+file)
-            data = json.load(f)['metadata']
+        for path, data in LevelIndex.list_levels('./levels/official'):
             levels.append(
                 {
                     'name':data['name'], 
                     'color':data['start_settings']['bg_color'], 
-                    'path':'./levels/official/'+file, 
+                    'path':path, 
                     'progress_normal':data['progress_normal'],
                     'progress_practice':data['progress_practice']
                 }
@@ -76,7 +74,7 @@ class OfficialLevelsMenu(GenericMenu):
         
         Logger.log(f"rendering officl level menu, selected idx: {c.selected_level_idx}, level_data: {level_data}")
         
-        c.frame = CameraFrame()
+        c.frame = c.frame_pool.acquire()
         c.frame.fill(level_data['color'])
         
         # handy variables, derived from screen size and preset proportions
@@ -1,6 +1,7 @@
 from typing import Literal
 from logger import Logger
 from render.camera_frame import CameraFrame
+from render.frame_pool import FramePool
 from render.texture_manager import TextureManager
 from gd_constants import GDConstants
 from blessed.keyboard import Keystroke
@@ -14,6 +15,8 @@ corner_deco_TR = TextureManager.reflect_texture(corner_deco_BL, 'both')
 class OnlineLevelsMenu(GenericMenu):
     
     curr_frame: CameraFrame | None = None
+    frame_pool = FramePool()
+    """ Buffers the menu gets drawn into, reused between renders """
     
     # style constants
     BG_COLOR = (63, 72, 204)
@@ -26,7 +29,7 @@ class OnlineLevelsMenu(GenericMenu):
     MIDDLE_BUTTON_SIZE_PX = 28 # px
     
     def render():
-        new_frame = CameraFrame()
+        new_frame = OnlineLevelsMenu.frame_pool.acquire(avoid=OnlineLevelsMenu.curr_frame)
         new_frame.fill((OnlineLevelsMenu.BG_COLOR))
 
         horiz_center = int(0.5 * new_frame.width)
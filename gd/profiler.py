@@ -0,0 +1,145 @@
+from time import perf_counter_ns, time
+from typing import Dict, List
+import threading
+import json
+import csv
+import numpy as np
+
+class StageSamples:
+    """ Ring buffer of the most recent durations (ns) recorded for one stage. """
+
+    def __init__(self, capacity: int) -> None:
+        self.samples = np.zeros(capacity, dtype=np.int64)
+        self.next_index = 0
+        self.count = 0
+        """ Total number of samples ever recorded (can be more than the capacity) """
+
+    def add(self, duration_ns: int) -> None:
+        self.samples[self.next_index] = duration_ns
+        self.next_index = (self.next_index + 1) % len(self.samples)
+        self.count += 1
+
+    def get_recent(self) -> np.ndarray:
+        """ The samples currently in the buffer, in no particular order """
+        return self.samples[:min(self.count, len(self.samples))]
+
+    def summary(self) -> Dict[str, float]:
+        """ count, mean, p50/p95/p99 and max of the samples in the buffer, in ms """
+        recent = self.get_recent()
+        if len(recent) == 0:
+            return {"count": 0, "mean_ms": 0, "p50_ms": 0, "p95_ms": 0, "p99_ms": 0, "max_ms": 0}
+
+        p50, p95, p99 = np.percentile(recent, (50, 95, 99)) / 1e6
+        return {
+            "count": self.count,
+            "mean_ms": float(recent.mean() / 1e6),
+            "p50_ms": float(p50),
+            "p95_ms": float(p95),
+            "p99_ms": float(p99),
+            "max_ms": float(recent.max() / 1e6),
+        }
+
+class Profiler:
+    """
+    Low-overhead per-stage timers for the render and physics loops. Static, like `Logger`.
+
+    Usage:
+    ```python
+    start = Profiler.start()
+    ... # do the thing
+    Profiler.stop("render/encode", start)
+    ```
+
+    Samples are grouped by a label (the level currently being played, see `set_label`), so the dump
+    written at exit (see `write`) has separate p50/p95/p99 numbers for every level.
+    """
+
+    enabled = True
+    """ If False, `stop` doesn't record anything (`start` still returns a timestamp) """
+
+    SAMPLES_PER_STAGE = 4096
+    """ How many of the most recent samples are kept per stage (percentiles are computed over these) """
+
+    HUD_STAGES = ["render/total", "render/blit level", "render/encode", "render/write", "physics/tick", "physics/collisions"]
+    """ Stages shown on the in-game HUD (in this order) """
+
+    hud_enabled = False
+    """ Whether the camera should draw the HUD (toggled in game with `GDConstants.PROFILER_HUD_KEYS`) """
+
+    label = "menus"
+    """ Name that new samples are grouped under. Usually the name of the level being played """
+
+    stages: Dict[str, Dict[str, StageSamples]] = {}
+    """ label -> stage name -> samples """
+
+    _lock = threading.Lock()
+    """ Only held when creating new stages, since render and physics run on different threads """
+
+    def start() -> int:
+        """ Timestamp to pass to `stop` """
+        return perf_counter_ns()
+
+    def stop(stage: str, start_ns: int) -> None:
+        """ Records the time since `start_ns` for a stage """
+        if Profiler.enabled:
+            Profiler.record(stage, perf_counter_ns() - start_ns)
+
+    def record(stage: str, duration_ns: int) -> None:
+        """ Records a duration (ns) for a stage under the current label """
+        label_stages = Profiler.stages.get(Profiler.label)
+        samples = label_stages.get(stage) if label_stages is not None else None
+
+        if samples is None:
+            with Profiler._lock:
+                samples = Profiler.stages.setdefault(Profiler.label, {}).setdefault(stage, StageSamples(Profiler.SAMPLES_PER_STAGE))
+
+        samples.add(duration_ns)
+
+    def set_label(label: str) -> None:
+        Profiler.label = label
+
+    def toggle_hud() -> None:
+        Profiler.hud_enabled = not Profiler.hud_enabled
+
+    def get_summary() -> Dict[str, Dict[str, Dict[str, float]]]:
+        """ label -> stage -> summary (see `StageSamples.summary`) """
+        return {
+            label: {stage: samples.summary() for stage, samples in label_stages.items()}
+            for label, label_stages in list(Profiler.stages.items())
+        }
+
+    def get_hud_lines() -> List[str]:
+        """ One line per HUD stage with recorded samples, e.g. `render/total 4.21 p95 6.80` (ms) """
+        label_stages = Profiler.stages.get(Profiler.label, {})
+
+        lines = []
+        for stage in Profiler.HUD_STAGES:
+            samples = label_stages.get(stage)
+            if samples is None:
+                continue
+            summary = samples.summary()
+            lines.append(f"{stage} {summary['p50_ms']:.2f} p95 {summary['p95_ms']:.2f}")
+        return lines
+
+    def write(extra: Dict | None = None) -> None:
+        """ Writes the summary of every stage to `latest_profile.csv` and `latest_profile.json`.
+        Rewrites every time, same as `Logger.write`. `extra` gets added to the json (e.g. cache stats). """
+
+        if len(Profiler.stages) == 0:
+            print(f"\x1b[0mProfiler has no samples, did not write to file.")
+            return
+
+        summary = Profiler.get_summary()
+
+        columns = ["count", "mean_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms"]
+        with open("latest_profile.csv", "w", encoding='utf-8', newline='') as csv_f:
+            writer = csv.writer(csv_f)
+            writer.writerow(["label", "stage", *columns])
+            for label, label_stages in summary.items():
+                for stage, stats in label_stages.items():
+                    writer.writerow([label, stage, *(round(stats[column], 4) for column in columns)])
+
+        with open("latest_profile.json", "w", encoding='utf-8') as json_f:
+            json.dump({"timestamp": time(), "stages": summary, **(extra or {})}, json_f, indent=4)
+
+        print(f"\x1b[0mWrote profile of {sum(len(label_stages) for label_stages in summary.values())} stages to latest_profile.csv/json.")
@@ -2,16 +2,17 @@ import blessed
 from typing import TYPE_CHECKING, List, Tuple
 from math import floor, ceil
 import traceback
-from time import time_ns
 
 from logger import Logger
+from profiler import Profiler
 from render.constants import CameraConstants
 from engine.constants import EngineConstants
 from render.utils import fcode, closest_quarter, len_no_ansi
 from render.texture_manager import TextureManager
 from render.camera_frame import CameraFrame
+from render.frame_pool import FramePool
+from render.level_raster import LevelRaster
 from gd_constants import GDConstants
-from skimage.draw import line_aa
 from engine.player import Player
 
 if TYPE_CHECKING:
@@ -33,6 +34,13 @@ class Camera:
         self.level = level
         self.curr_frame: CameraFrame = None
         
+        self.frame_pool = FramePool()
+        """ Preallocated buffers that frames get drawn into, so nothing gets allocated per frame """
+        self.level_raster = LevelRaster(level)
+        """ Pre-rendered level objects, so each frame only has to copy the visible slice instead of drawing every object """
+        self.overlay_frame: CameraFrame | None = None
+        """ Separate buffer for drawing things on top of the current frame from outside the render loop (e.g. level complete popup). See `get_overlay_frame` """
+        
         self.camera_left: float = 0 # start at 0. player starts at 10 (we get a nice padding)
         """ Measured in blocks from the beginning of the level. """
         self.camera_bottom: float = -CameraConstants.GROUND_HEIGHT
@@ -112,9 +120,16 @@ class Camera:
 
     def render_init(self) -> None:
         """ Initializes the screen with the background color, and sets self.curr_frame for the first time. """
-        self.curr_frame = CameraFrame()
+        self.curr_frame = self.frame_pool.acquire()
         self.curr_frame.fill(self.level.bg_color)
         self.curr_frame.render_raw()
+        
+    def get_overlay_frame(self) -> CameraFrame:
+        """ Returns a copy of the current frame to draw on top of, without touching the render loop's buffers.
+        The same buffer is reused every call, so only hold onto one at a time. """
+        if self.overlay_frame is None or self.overlay_frame.pixels.shape != self.curr_frame.pixels.shape:
+            self.overlay_frame = CameraFrame((self.curr_frame.width, self.curr_frame.height), self.curr_frame.pos)
+        return self.curr_frame.copy(into=self.overlay_frame)
 
     def render(self, game: "Game", render_raw = False) -> None:
         """
@@ -124,94 +139,58 @@ class Camera:
         and to only redraw the differences.
         """
         
-        times = {}
-        total_start_time = time_ns()
+        total_start_time = Profiler.start()
         
         if game.is_crashed:
             # if crashed, don't render anything
             #Logger.log("crashed")
             return
         
-        start_time = time_ns()
-        new_frame = CameraFrame()
+        start_time = Profiler.start()
+        new_frame = self.frame_pool.acquire(avoid=self.curr_frame)
         new_frame.fill(self.level.bg_color)
-        times['create frame'] = (time_ns() - start_time)/1e6
+        Profiler.stop("render/create frame", start_time)
         
-        # move camera to player
-        start_time = time_ns()
-        self.update_camera_y_pos(game.player.pos)
-        times['update camera y pos'] = (time_ns() - start_time)/1e6
+        # move camera to player (interpolated between physics ticks)
+        player_pos = game.get_player_render_pos()
+        self.update_camera_y_pos(player_pos)
         #Logger.log(f"[2] screen pos for playher: {self.player_y_info['screen_pos']}")
-        self.camera_left = game.player.pos[0] - CameraConstants.CAMERA_LEFT_OFFSET
+        self.camera_left = player_pos[0] - CameraConstants.CAMERA_LEFT_OFFSET
         camera_right = self.camera_left + CameraConstants.screen_width_blocks()
         camera_top = self.camera_bottom + CameraConstants.screen_height_blocks()
 
         #Logger.log(f"[Camera/render] {self.camera_bottom=:2f}, {self.player_y_info['screen_pos']=:4f}, {game.player.pos=}")
 
-        visible_vert_range = max(0, floor(self.camera_bottom)), min(self.level.height, 1+ceil(self.camera_bottom + CameraConstants.screen_height_blocks()))
-        # this should be smth like (5, 12) which is the range of y-pos of the grid that is visible on the screen. Exclusive of the second number.
-
         # first calc where the ground would be rendered
         ground_screen_y_pos = camera_top * CameraConstants.BLOCK_HEIGHT
+
+        # copy the visible part of the pre-rendered level onto the new frame
+        start_time = Profiler.start()
+        self.level_raster.blit(new_frame, self.camera_left, ground_screen_y_pos)
+        Profiler.stop("render/blit level", start_time)
         
-        # we start rendering the row at ground - (y+1)*block_height, and decrement by block_height after each row
-        curr_screen_y_pos = ground_screen_y_pos - CameraConstants.BLOCK_HEIGHT*(1+visible_vert_range[0])
-
-        #Logger.log(f"[Camera/render] visible_vert_slice = {visible_vert_slice}, initial curr_screen_y_pos = {curr_screen_y_pos}")
-        start_time = time_ns()
-        for row in range(*visible_vert_range):
-            # horizontal range of grid cells that are in the camera range. Includes any partially visible cells on the sides.
-            visible_horiz_range = (max(0, floor(self.camera_left)), min(self.level.length, ceil(camera_right))) # last index is exclusive
-
-            #Logger.log(f"[Camera/render] {self.camera_left=}, {row=}, {curr_screen_y_pos=}, player@{game.player.pos=}, {visible_horiz_range=}, {visible_vert_range=}")
-
-            # add textures of all the visible objects in this row to the new frame
-            for obj in self.level.get_row(row, *visible_horiz_range):
-                if obj is not None:
-                    
-                    #Logger.log(f"NotNone obj!!!! {obj} @ {obj.x, obj.y}")
-                    
-                    # calculate where it will truly be rendered on the screen
-                    xpos_on_screen = round((obj.x - self.camera_left) * CameraConstants.BLOCK_WIDTH)
-                    ypos_on_screen = curr_screen_y_pos
-                    
-                    # convert from topleft to center
-                    xpos_on_screen += CameraConstants.BLOCK_WIDTH // 2
-                    ypos_on_screen += CameraConstants.BLOCK_HEIGHT // 2
-                    
-                    # get transformed texture, with rotations, color, etc. (attempts to use cache for optimization)
-                    obj_texture = TextureManager.get_transformed_texture(self.level, obj, hide_invis=True)
-                    
-                    #Logger.log(f"[LevelEditor/render_main_editor] Adding texture w shape={obj_texture.shape} @ {xpos_on_screen, ypos_on_screen}")
-                    new_frame.add_pixels_centered_at(xpos_on_screen, round(ypos_on_screen), obj_texture)
-                    
-            curr_screen_y_pos -= CameraConstants.BLOCK_HEIGHT
-        
-        times['add objs TOTAL'] = (time_ns() - start_time)/1e6
         #Logger.log(f"[Camera/render] camera_top: {camera_top:2f}, camera_bottom: {self.camera_bottom:2f}")
         #Logger.log(f"slice: {visible_vert_slice}, range: {visible_vert_range}")
         
+        start_time = Profiler.start()
+        
         # draw ground. The top of the ground ground should be at physics y=0.
         # TODO - make ground recolorable/move
-        new_frame.add_pixels_topleft(0, ground_screen_y_pos, TextureManager.get_curr_ground_texture(self.level, game.player.get_dist_from_start()))
+        new_frame.add_pixels_topleft(0, ground_screen_y_pos, TextureManager.get_curr_ground_texture(self.level, player_pos[0] - game.player.ORIGINAL_START_POS[0]))
 
         # draw player
         player_xpos_on_screen = CameraConstants.CAMERA_LEFT_OFFSET * CameraConstants.BLOCK_WIDTH
         new_frame.add_pixels_topleft(round(player_xpos_on_screen), round(self.player_y_info['screen_pos']), TextureManager.get_curr_player_icon(game.player))
         
         # draw attempt number
-        start_time = time_ns()
         self.draw_attempt(new_frame, game.player.ORIGINAL_START_POS[0], game.attempt_number) # draw the attempt number
-        times['draw attempt #'] = (time_ns() - start_time)/1e6
         
         # draw wave trail
         if game.player.gamemode == "wave":
-            self.render_wave_trail(new_frame, game)
+            self.render_wave_trail(new_frame, game, player_pos)
         
         # draw progress bar
-        start_time = time_ns()
         self.render_progress_bar(new_frame, game.get_progress_percentage())
-        times['draw progress bar'] = (time_ns() - start_time)/1e6
         
         # draw any checkpoints TODO - render multiple checkpoints, OOP-ize practice mode?
         # draw most recent checkpoint if the game is in practice mode and has a checkpoint
@@ -219,7 +198,12 @@ class Camera:
             x, y = game.practicemodeobj.get_last_checkpoint()
             self.draw_checkpoint(new_frame, x, y)
         
-        # render the new frame
+        if Profiler.hud_enabled:
+            self.draw_profiler_hud(new_frame)
+        
+        Profiler.stop("render/overlays", start_time)
+        
+        # render the new frame (the frame itself records "render/encode" and "render/write")
         #Logger.log(f"[Camera/render] BEGIN LOGS (cf first) --------------------------- ")
         if not render_raw:
             new_frame.render(self.curr_frame)
@@ -228,13 +212,22 @@ class Camera:
             
         self.curr_frame = new_frame
         
+        Profiler.stop("render/total", total_start_time)
+    
+    def draw_profiler_hud(self, frame: CameraFrame) -> None:
+        """ Draws the profiler's per-stage timings (p50 and p95, in ms) at the top left of the frame. """
         
-        #for time_key in times:
-            #Logger.log(f"[Camera/render] {time_key}: {times[time_key]:.2f}ms")
-        #Logger.log(f"[Camera/render] END LOG, TOTAL TIME: {(time_ns() - total_start_time)/1e6:.2f}ms ")
+        font = TextureManager.font_small1
+        line_height = font.font_height + 1
+        lines = Profiler.get_hud_lines()
+        
+        # darken the area behind the text so its readable over anything
+        frame.add_rect((0, 0, 0, 160), 0, 0, max((font.get_width_of(len(line)) for line in lines), default=0) + 2, line_height*len(lines) + 1)
+        for i, line in enumerate(lines):
+            frame.add_text(1, 1 + i*line_height + font.font_height//2, font, line, anchor="left")
 
-    def render_wave_trail(self, frame: CameraFrame, game: "Game") -> None:
-        "draws a line between all the wave pivots that are on the screen"
+    def render_wave_trail(self, frame: CameraFrame, game: "Game", player_pos: List[float]) -> None:
+        "draws a line between all the wave pivots that are on the screen, then from the last one to the player (drawn at `player_pos`)"
         
         onscreen_pivots = self._get_wave_pivots_in_range(game.player)
         for i in range(1, len(onscreen_pivots)):
@@ -245,7 +238,7 @@ class Camera:
             
         # draw line from last pivot to player center
         last_pivot = onscreen_pivots[-1]
-        player_center = (game.player.pos[0] + game.player.get_hitbox_size()[0]/2, game.player.pos[1] + game.player.get_hitbox_size()[1]/2)
+        player_center = (player_pos[0] + game.player.get_hitbox_size()[0]/2, player_pos[1] + game.player.get_hitbox_size()[1]/2)
         
         frame.add_line(
             self.get_screen_coordinates(last_pivot[0], last_pivot[1]),
@@ -282,9 +275,6 @@ class Camera:
         if leftmost_pivot_idx is None: leftmost_pivot_idx = 0
         if rightmost_pivot_idx is None: rightmost_pivot_idx = len(player.wave_pivot_points)-1
         
-        Logger.log(f"camera left: {self.camera_left}, camera right: {self.camera_left + CameraConstants.screen_width_blocks()}")
-        Logger.log(f"xpos of leftmost pivot: {player.wave_pivot_points[leftmost_pivot_idx][0]}, 2nd leftmost: {player.wave_pivot_points[leftmost_pivot_idx+1][0] if len(player.wave_pivot_points) > leftmost_pivot_idx+1 else None}")
-
         return player.wave_pivot_points[leftmost_pivot_idx:rightmost_pivot_idx+1]
     
     def render_progress_bar(self, frame: CameraFrame, percent: float) -> None:
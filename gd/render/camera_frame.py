@@ -1,14 +1,18 @@
 import curses
 from typing import TYPE_CHECKING, Literal, Tuple, List
 from render.utils import (
-    fcode_opt as fco, blend_rgba_img_onto_rgb_img_inplace, 
+    fcode_opt as fco, 
     first_diff_color, last_diff_color, lesser, greater, draw_line,
-    get_diff_intervals, combine_intervals, distances_to_false, get_false_chunk_sizes
+    get_diff_intervals, combine_intervals, distances_to_false, get_false_chunk_sizes, pack_cells
 )
-from draw_utils import print3
+from render.frame_encoder import get_cell_changes, get_color_breaks, get_first_to_last_spans, encode_spans
+from render.damage import get_damage_runs, merge_damage_runs
+from render.compositing import blend_texture_inplace, blend_color_inplace
+from draw_utils import print3, print3_bytes
 from time import perf_counter
 from threading import Thread
 from logger import Logger
+from profiler import Profiler
 import numpy as np
 from render.font import Font
 from render.constants import CameraConstants
@@ -45,6 +49,28 @@ class CameraFrame:
         
         self.pixels: np.ndarray = np.zeros((self.height, self.width, 3), dtype=np.uint8)
         """ 2d array of pixels. Each pixel is an rgb tuple. (0, 0) is the top left of the frame, not the top left of the screen. """
+        
+        self._packed_cells: np.ndarray | None = None
+        """ Cache for `packed_cells()`. Cleared by every method that draws onto the frame. """
+        
+        self.bytes_emitted: int | None = None
+        """ Number of bytes written to the terminal the last time this frame was rendered.
+        Only tracked by the bytes-based backends ("vectorized", "damage"), None otherwise. """
+
+    def packed_cells(self) -> np.ndarray:
+        """ Returns the frame as an (height//2, width) uint64 array, one int per terminal cell (see `render.utils.pack_cells`).
+        
+        Cached until the frame is drawn on again, so a frame that was packed when it was rendered
+        doesn't get packed a second time when it's used as the previous frame for the next render.
+        
+        NOTE: if you write to `self.pixels` directly (instead of through the add_/fill methods), call `mark_dirty` afterwards. """
+        if self._packed_cells is None:
+            self._packed_cells = pack_cells(self.pixels)
+        return self._packed_cells
+    
+    def mark_dirty(self) -> None:
+        """ Invalidates the cached packed representation. Needed after writing to `self.pixels` directly. """
+        self._packed_cells = None
 
     def render_raw(self) -> None:
         """ Simply prints the frame to the screen, without the need for a previous frame. 
@@ -76,17 +102,13 @@ class CameraFrame:
                 print3(GDConstants.term.move_xy(self.pos[0], (self.pos[1]+self.height)//2 + 1) + string2)
             
         else:
+            # every row pair in full, through the same encoder (and escape cache) as render_vectorized
+            packed_cells = self.packed_cells()
+            spans = [(row, 0, self.width) for row in range(self.height//2)]
             
-            #compiled_str = "" # try printing the whole thing at once
-            
-            for i in range(0, self.height, 2):
-                string = ""
-                for j in range(self.width):
-                    string += fco(self.pixels[i,j], self.pixels[i+1,j]) + '▀' # for quick copy: ▀
-                
-                #compiled_str += string + "\n"
-                print3(GDConstants.term.move_xy(self.pos[0], (i+self.pos[1])//2) + string)
-            #print3(GDConstants.term.move_xy(self.pos[0], self.pos[1]//2) + compiled_str)
+            output = encode_spans(packed_cells, spans, get_color_breaks(packed_cells), self.pos)
+            self.bytes_emitted = len(output)
+            print3_bytes(output)
 
     def curses_render_raw(self) -> None:
         for top_row_index in range(0, self.height, 2):       
@@ -129,9 +151,73 @@ class CameraFrame:
         #Logger.log(f"(raw) refreshing curses screen")
         GDConstants.screen.refresh()
 
+    RENDER_BACKENDS = {
+        "default": "render_default",
+        "intervaled": "render_intervaled",
+        "usingwhile": "render_usingwhile",
+        "vectorized": "render_vectorized",
+        "damage": "render_damage",
+    }
+    """ Backend name (see `CameraConstants.RENDER_BACKEND`) -> name of the method that implements it """
+
+    def render(self, prev_frame: "CameraFrame") -> None:
+        """ Prints the frame to the screen, only printing the changes from the previous frame.
+        Uses whichever backend is selected by `CameraConstants.RENDER_BACKEND`, so they can be swapped for comparison. """
+        getattr(self, CameraFrame.RENDER_BACKENDS[CameraConstants.RENDER_BACKEND])(prev_frame)
+
+    def render_vectorized(self, prev_frame: "CameraFrame") -> None:
+        """ Prints the frame to the screen. Prints the same region as `render_default` (first diff -> last diff of each row),
+        but finds color runs for whole row pairs with numpy and builds the output as bytes from precomputed tables,
+        so there is no per-pixel python loop and no string concatenation. """
+        
+        start_time = Profiler.start()
+        packed_cells = self.packed_cells()
+        cell_changes = get_cell_changes(packed_cells, prev_frame.packed_cells())
+        spans = get_first_to_last_spans(cell_changes)
+        
+        if len(spans) == 0:
+            self.bytes_emitted = 0
+            Profiler.stop("render/encode", start_time)
+            return
+        
+        output = encode_spans(packed_cells, spans, get_color_breaks(packed_cells), self.pos)
+        self.bytes_emitted = len(output)
+        Profiler.stop("render/encode", start_time)
+        
+        start_time = Profiler.start()
+        print3_bytes(output)
+        Profiler.stop("render/write", start_time)
+
+    def render_damage(self, prev_frame: "CameraFrame") -> None:
+        """ Prints the frame to the screen. Instead of first diff -> last diff, prints every changed run of cells,
+        merging runs on the same row only when reprinting the unchanged cells between them costs fewer bytes than a
+        move_xy escape (see `damage.merge_damage_runs` and `CameraConstants.DAMAGE_MERGE_THRESHOLD`). """
+        
+        start_time = Profiler.start()
+        packed_cells = self.packed_cells()
+        cell_changes = get_cell_changes(packed_cells, prev_frame.packed_cells())
+        runs = get_damage_runs(cell_changes)
+        
+        if len(runs) == 0:
+            self.bytes_emitted = 0
+            Profiler.stop("render/encode", start_time)
+            return
+        
+        color_breaks = get_color_breaks(packed_cells)
+        spans = merge_damage_runs(runs, color_breaks, CameraConstants.DAMAGE_MERGE_THRESHOLD, self.pos[1])
+        
+        output = encode_spans(packed_cells, spans, color_breaks, self.pos)
+        self.bytes_emitted = len(output)
+        Profiler.stop("render/encode", start_time)
+        
+        start_time = Profiler.start()
+        print3_bytes(output)
+        Profiler.stop("render/write", start_time)
+
     # XXX - main render func, This can still be improved by adding a huge chunk of pixels at once
     # if there is a lot of pixels with the same color, then skipping to the next different color
-    def render(self, prev_frame: "CameraFrame") -> None:
+    # (^^ see render_vectorized)
+    def render_default(self, prev_frame: "CameraFrame") -> None:
         """ Prints the frame to the screen.
         Optimized by only printing the changes from the previous frame. """
         
@@ -697,6 +783,7 @@ class CameraFrame:
         """ Fills the entire canvas with the given color. RGB (3-tuple) required. Should be pretty efficient because of numpy. """
         assert len(color) == 3, f"[FrameLayer/fill]: color must be an rgb (3 ints) tuple, instead got {color}"
         self.pixels[:,:] = color
+        self._packed_cells = None
         
     def fill_with_gradient(
         self, 
@@ -707,6 +794,8 @@ class CameraFrame:
         """ Fills the entire canvas with a gradient from color1 to color2.
         The gradient can be either horizontal or vertical. """
         
+        self._packed_cells = None
+        
         # create a gradient
         if direction == "horizontal":
             gradient = np.linspace(color1, color2, self.width)
@@ -760,11 +849,6 @@ class CameraFrame:
         width = round(width)
         height = round(height)
             
-        rect_as_pixels = np.full((height+outline_width*2, width+outline_width*2, 4), outline_color, dtype=np.uint8)
-        
-        # set the middle of rect_as_pixels to the color
-        rect_as_pixels[outline_width:outline_width+height, outline_width:outline_width+width] = color
-        
         y1 = y - outline_width
         y2 = y + height + outline_width
         x1 = x - outline_width
@@ -804,29 +888,29 @@ class CameraFrame:
                 x1 -= width
                 x2 -= width
         
-        # if any coords go out of bounds, set it to the edge of the frame and clip the rect_as_pixels
+        # blend the inside, then the 4 sides of the outline, straight onto the frame (no rect-sized pixel array needed)
+        self._packed_cells = None
+        self._blend_color_area(y1+outline_width, y2-outline_width, x1+outline_width, x2-outline_width, color)
+        
+        if outline_width > 0:
+            self._blend_color_area(y1, y1+outline_width, x1, x2, outline_color) # top
+            self._blend_color_area(y2-outline_width, y2, x1, x2, outline_color) # bottom
+            self._blend_color_area(y1+outline_width, y2-outline_width, x1, x1+outline_width, outline_color) # left
+            self._blend_color_area(y1+outline_width, y2-outline_width, x2-outline_width, x2, outline_color) # right
+    
+    def _blend_color_area(self, y1: int, y2: int, x1: int, x2: int, color: CameraConstants.RGBATuple) -> None:
+        """ Blends an rgba color over the area [y1, y2) x [x1, x2) of the frame. Coords get clipped to the frame. """
+        
+        # if any coords go out of bounds, set it to the edge of the frame
         clipped_y1 = max(0, y1)
         clipped_y2 = min(self.height, y2)
         clipped_x1 = max(0, x1)
         clipped_x2 = min(self.width, x2)
         
-        offset_y1 = clipped_y1 - y1
-        offset_y2 = clipped_y2 - y2
-        offset_x1 = clipped_x1 - x1
-        offset_x2 = clipped_x2 - x2
-        
-        # clip the rect_as_pixels
-        clipped_rect_as_pixels = rect_as_pixels[
-            int(offset_y1):int(rect_as_pixels.shape[0]-offset_y2), 
-            int(offset_x1):int(rect_as_pixels.shape[1]-offset_x2)
-        ]
-        
-        blend_rgba_img_onto_rgb_img_inplace(
-            self.pixels[
-                clipped_y1:clipped_y2,
-                clipped_x1:clipped_x2
-            ], clipped_rect_as_pixels
-        )
+        if clipped_y2 <= clipped_y1 or clipped_x2 <= clipped_x1:
+            return
+        
+        blend_color_inplace(self.pixels[clipped_y1:clipped_y2, clipped_x1:clipped_x2], color)
         
     def add_text(
         self, 
@@ -871,9 +955,10 @@ class CameraFrame:
         #if offset_top >= pixels.shape[0] or offset_left >= pixels.shape[1]:
         #    return
 
-        blend_rgba_img_onto_rgb_img_inplace(
+        self._packed_cells = None
+        blend_texture_inplace(
             self.pixels[clipped_top:clipped_top+pixels.shape[0]-offset_top, clipped_left:clipped_left+pixels.shape[1]-offset_left],
-            pixels[offset_top:, offset_left:]
+            pixels, offset_top, offset_left
         )
 
     def add_pixels_topleft(self, x: int, y: int, pixels: np.ndarray) -> None:
@@ -897,9 +982,10 @@ class CameraFrame:
             #Logger.log(f"[FrameLayer/add_pixels_topleft]: clipped off all pixels, returning")
             return
 
-        blend_rgba_img_onto_rgb_img_inplace(
+        self._packed_cells = None
+        blend_texture_inplace(
             self.pixels[int(clipped_y1):int(clipped_y1+pixels.shape[0]-offset_y1), int(clipped_x1):int(clipped_x1+pixels.shape[1]-offset_x1)],
-            pixels[int(offset_y1):self.height, int(offset_x1):self.width]
+            pixels, int(offset_y1), int(offset_x1)
         )
     
     def add_pixels_centered_at(self, x: int, y: int, pixels: np.ndarray) -> None:
@@ -937,17 +1023,29 @@ class CameraFrame:
         
         #Logger.log(f"indices for self.pixels: self.pixels[{clipped_top}:{clipped_top+pixels.shape[0]-offset_top}, {clipped_left}:{clipped_left+pixels.shape[1]-offset_left}]")
         
-        blend_rgba_img_onto_rgb_img_inplace(
+        self._packed_cells = None
+        blend_texture_inplace(
             self.pixels[clipped_top:int(clipped_top+pixels.shape[0]-offset_top), clipped_left:int(clipped_left+pixels.shape[1]-offset_left)],
-            pixels[offset_top:, offset_left:]
+            pixels, offset_top, offset_left
         )
     
     def add_line(self, pos1: Tuple[int, int], pos2: Tuple[int, int], color: CameraConstants.RGBTuple) -> None:
         """ Draws a non-antialiased, 1-wide line between two points on the frame. """
         draw_line(self.pixels, pos1, pos2, color)
+        self._packed_cells = None
     
-    def copy(self) -> "CameraFrame":
-        """ Returns a deep copy of this CameraFrame. (except for the terminal reference) """
-        new_frame = CameraFrame((self.width, self.height), self.pos)
-        new_frame.pixels = np.copy(self.pixels)
+    def copy(self, into: "CameraFrame | None" = None) -> "CameraFrame":
+        """ Returns a deep copy of this CameraFrame. (except for the terminal reference)
+        
+        If `into` is given (e.g. a buffer from a FramePool), the pixels are copied into that frame
+        in place instead of allocating a new one. It must be the same size as this frame. """
+        if into is None:
+            new_frame = CameraFrame((self.width, self.height), self.pos)
+            new_frame.pixels = np.copy(self.pixels)
+        else:
+            assert into.pixels.shape == self.pixels.shape, f"[CameraFrame/copy]: can't copy a {self.pixels.shape} frame into a {into.pixels.shape} frame"
+            new_frame = into
+            np.copyto(new_frame.pixels, self.pixels)
+            
+        new_frame._packed_cells = self._packed_cells # never modified in place, safe to share
         return new_frame
\ No newline at end of file
@@ -0,0 +1,131 @@
+from typing import Dict, Literal, Tuple
+import threading
+import weakref
+import numpy as np
+
+AlphaKind = Literal["empty", "opaque", "mask", "alpha"]
+"""
+How a texture's alpha channel needs to be handled when blending it:
+- "empty": fully transparent, nothing to draw
+- "opaque": no alpha channel, or every alpha is 255 - plain copy
+- "mask": every alpha is either 0 or 255 - copy through a boolean mask
+- "alpha": real partial transparency - integer blend with premultiplied colors
+"""
+
+def classify_alpha(texture: np.ndarray) -> AlphaKind:
+    """ Returns how the texture should be blended (see `AlphaKind`). """
+    if texture.shape[2] == 3:
+        return "opaque"
+
+    alpha = texture[..., 3]
+    if alpha.size == 0 or alpha.max() == 0:
+        return "empty"
+    if alpha.min() == 255:
+        return "opaque"
+    if np.all((alpha == 0) | (alpha == 255)):
+        return "mask"
+    return "alpha"
+
+class PreparedTexture:
+    """ A texture, along with whatever precomputed data its alpha kind needs to be blended with integer math only. """
+
+    def __init__(self, texture: np.ndarray) -> None:
+
+        if texture.dtype != np.uint8: # e.g. colorized textures are floats
+            texture = texture.astype(np.uint8)
+
+        self.kind: AlphaKind = classify_alpha(texture)
+
+        self.rgb: np.ndarray = texture[..., :3]
+        """ (h, w, 3) uint8 colors """
+        self.mask: np.ndarray | None = None
+        """ (h, w, 1) bool, True where the texture is drawn. Only for "mask" textures. """
+        self.premultiplied: np.ndarray | None = None
+        """ (h, w, 3) uint16, rgb * alpha. Only for "alpha" textures. """
+        self.inv_alpha: np.ndarray | None = None
+        """ (h, w, 1) uint16, 255 - alpha. Only for "alpha" textures. """
+
+        if self.kind == "mask":
+            self.mask = texture[..., 3:4] == 255
+        elif self.kind == "alpha":
+            alpha = texture[..., 3:4].astype(np.uint16)
+            self.premultiplied = self.rgb * alpha
+            self.inv_alpha = 255 - alpha
+
+_prepared: Dict[int, PreparedTexture] = {}
+""" id of a read-only texture -> its PreparedTexture. Entries are removed when the texture gets garbage collected. """
+
+_scratch = threading.local()
+""" Per-thread uint16 buffer for the "alpha" blends, so they don't allocate. (the camera renders on its own thread) """
+
+def prepare_texture(texture: np.ndarray) -> PreparedTexture:
+    """ Classifies a texture and precomputes its blend data.
+
+    Read-only textures (e.g. the ones loaded by `TextureManager.compile_texture`) can't change under us,
+    so they're only prepared once and cached. Writable ones are prepared again on every call. """
+
+    if texture.flags.writeable:
+        return PreparedTexture(texture)
+
+    prepared = _prepared.get(id(texture))
+    if prepared is None:
+        prepared = PreparedTexture(texture.copy()) # copy, so the cache doesn't keep the texture itself alive
+        _prepared[id(texture)] = prepared
+        weakref.finalize(texture, _prepared.pop, id(texture), None)
+    return prepared
+
+def _get_scratch(shape: Tuple[int, ...]) -> np.ndarray:
+    """ Returns a uint16 buffer of the given shape. Contents are garbage. """
+    size = int(np.prod(shape))
+    buffer = getattr(_scratch, "buffer", None)
+    if buffer is None or buffer.size < size:
+        buffer = np.empty(size, dtype=np.uint16)
+        _scratch.buffer = buffer
+    return buffer[:size].reshape(shape)
+
+def _blend_premultiplied(dest: np.ndarray, premultiplied: np.ndarray, inv_alpha: np.ndarray) -> None:
+    """ dest = (premultiplied + dest * inv_alpha) // 255, in place. Everything stays within uint16 (max 255*255). """
+    scratch = _get_scratch(dest.shape)
+    np.multiply(dest, inv_alpha, out=scratch)
+    scratch += premultiplied
+    scratch //= 255
+    np.copyto(dest, scratch, casting="unsafe")
+
+def blend_texture_inplace(dest: np.ndarray, texture: np.ndarray, offset_y: int = 0, offset_x: int = 0) -> None:
+    """
+    Blends `texture[offset_y:, offset_x:]` onto the top left of `dest` (an rgb view into a frame), in place.
+    The texture gets clipped to the size of `dest`. Same result as `render.utils.blend_rgba_img_onto_rgb_img_inplace`
+    (up to float rounding), but without any float/temporary arrays.
+    """
+
+    height = min(dest.shape[0], texture.shape[0] - offset_y)
+    width = min(dest.shape[1], texture.shape[1] - offset_x)
+    if height <= 0 or width <= 0:
+        return
+
+    prepared = prepare_texture(texture)
+    if prepared.kind == "empty":
+        return
+
+    dest = dest[:height, :width]
+    area = (slice(offset_y, offset_y+height), slice(offset_x, offset_x+width))
+
+    if prepared.kind == "opaque":
+        dest[...] = prepared.rgb[area]
+    elif prepared.kind == "mask":
+        np.copyto(dest, prepared.rgb[area], where=prepared.mask[area])
+    else:
+        _blend_premultiplied(dest, prepared.premultiplied[area], prepared.inv_alpha[area])
+
+def blend_color_inplace(dest: np.ndarray, color: Tuple[int, int, int, int]) -> None:
+    """ Blends a single rgba color over all of `dest` (an rgb view into a frame), in place. """
+
+    alpha = color[3]
+    if alpha == 0 or dest.size == 0:
+        return
+    if alpha == 255:
+        dest[...] = color[:3]
+        return
+
+    premultiplied = np.array(color[:3], dtype=np.uint16) * alpha
+    _blend_premultiplied(dest, premultiplied, np.uint16(255 - alpha))
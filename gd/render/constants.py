@@ -37,6 +37,32 @@ class CameraConstants:
     # I've tested, it still runs at ~30fps.
     RENDER_FRAMERATE = 90 
     """ Framerate of the renderer. In practice, works a bit wonky, =60 brings 1000FPS down to ~40 ish, probably because windows clock isnt super accurate. """
+    
+    RENDER_BACKEND = "damage"
+    """ Which CameraFrame render method `CameraFrame.render` uses. One of the keys of `CameraFrame.RENDER_BACKENDS`:
+    - "default": the original per-pixel loop, printing first diff -> last diff of each row
+    - "intervaled": per-pixel loop, but only over the changed intervals of each row
+    - "usingwhile": per-pixel while loop that skips runs of repeated colors
+    - "vectorized": numpy color runs + precomputed byte tables, joined into a single bytes buffer
+    - "damage": same encoder as "vectorized", but only prints the changed runs of each row (see DAMAGE_MERGE_THRESHOLD)
+    """
+    
+    FRAME_POOL_SIZE = 2
+    """ Number of preallocated frames a FramePool swaps between. 2 = plain double buffering. """
+    
+    DAMAGE_MERGE_THRESHOLD = 0
+    """ (bytes) For the "damage" backend: two changed runs on the same row get printed as one if reprinting the unchanged
+    cells between them costs at most this many more bytes than jumping over them with a move_xy.
+    0 = cheapest output according to the cost model, higher = fewer but longer writes. """
+
+    LEVEL_RASTER_CHUNK_WIDTH = 16
+    """ (blocks) Width of the column chunks the level gets pre-rendered in (see `render.level_raster.LevelRaster`) """
+    
+    LEVEL_RASTER_MAX_CHUNKS = 256
+    """ Max number of pre-rendered level chunks kept in memory. Least recently used ones get dropped first. """
+
+    TEXTURE_CACHE_MAX_SIZE = 2048
+    """ Max number of transformed (rotated/reflected/colored) object textures kept in `TextureManager.texture_cache`. Least recently used ones get dropped first. """
 
     class OBJECT_ROTATIONS(Enum):
         UP = "up"
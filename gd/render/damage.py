@@ -0,0 +1,78 @@
+from typing import List
+import numpy as np
+from render.frame_encoder import Span
+
+ESCAPE_BYTES_ESTIMATE = 38
+""" Rough size of one fg+bg truecolor escape code ('\\033[38;2;r;g;bm\\033[48;2;r;g;bm' with ~2.5 digits per channel) """
+
+CELL_BYTES = len('▀'.encode())
+""" Bytes it takes to (re)print a single cell, not counting escape codes """
+
+def get_damage_runs(cell_changes: np.ndarray) -> np.ndarray:
+    """ Returns every run of changed cells in the frame as an (N, 3) int array of [row, start, end (exclusive)],
+    ordered by row then start. Works on all row pairs at once.
+
+    `cell_changes` should be the (height//2, width) bool array from `frame_encoder.get_cell_changes`. """
+
+    rows, width = cell_changes.shape
+
+    # pad each row with a False on both sides, so every run has a rising and a falling edge in the same row
+    padded = np.zeros((rows, width + 2), dtype=np.int8)
+    padded[:, 1:-1] = cell_changes
+    edges = np.diff(padded, axis=1) # (rows, width+1)
+
+    run_rows, run_starts = np.nonzero(edges == 1)
+    _, run_ends = np.nonzero(edges == -1)
+
+    return np.stack((run_rows, run_starts, run_ends), axis=1)
+
+def estimate_move_bytes(rows: np.ndarray, cols: np.ndarray, pos_y: int = 0) -> np.ndarray:
+    """ Vectorized size estimate of move_xy escapes ('\\033[{y+1};{x+1}H') to each of the given cells """
+    def num_digits(arr: np.ndarray) -> np.ndarray:
+        return np.floor(np.log10(np.maximum(arr, 1))).astype(np.int64) + 1
+
+    return 4 + num_digits(rows + pos_y//2 + 1) + num_digits(cols + 1)
+
+def merge_damage_runs(runs: np.ndarray, color_breaks: np.ndarray, threshold: int = 0, pos_y: int = 0) -> List[Span]:
+    """ Merges runs on the same row when reprinting the unchanged gap between them is (about) as cheap as jumping over it.
+
+    For each gap, the two options are:
+    - jump: one move_xy escape + one color escape for the start of the next run
+    - reprint: one half-block per gap cell + one color escape for every color break in the gap (and at the next run's start)
+
+    Gaps are merged when `reprint - jump <= threshold` (in bytes). A threshold of 0 gives the cheapest output under the
+    cost model, positive values merge more eagerly (fewer, longer writes), and negative values merge less.
+
+    `color_breaks` should be the (height//2, width-1) bool array from `frame_encoder.get_color_breaks`.
+    """
+
+    if len(runs) == 0:
+        return []
+
+    rows, starts, ends = runs[:, 0], runs[:, 1], runs[:, 2]
+
+    # prefix sums of color breaks, so we can count breaks in any gap in O(1).
+    # breaks_before[r, j] = number of color breaks between cells (0,1), ..., (j-2,j-1) (0 for j < 2),
+    # so breaks_before[r, b+1] - breaks_before[r, a] counts the breaks at boundaries (j-1, j) for j in [a, b]
+    breaks_before = np.zeros((color_breaks.shape[0], color_breaks.shape[1] + 2), dtype=np.int32)
+    np.cumsum(color_breaks, axis=1, out=breaks_before[:, 2:])
+
+    # gap i is between run i and run i+1. only gaps within the same row can be merged
+    gap_rows = rows[:-1]
+    gap_starts = ends[:-1] # first unchanged cell
+    gap_ends = starts[1:] # first cell of the next run
+    same_row = rows[1:] == gap_rows
+
+    # breaks at boundaries (j-1, j) for j in [gap_start, gap_end] - each of those cells would need a new escape
+    gap_breaks = breaks_before[gap_rows, gap_ends + 1] - breaks_before[gap_rows, gap_starts]
+
+    reprint_cost = CELL_BYTES * (gap_ends - gap_starts) + ESCAPE_BYTES_ESTIMATE * gap_breaks
+    jump_cost = estimate_move_bytes(gap_rows, gap_ends, pos_y) + ESCAPE_BYTES_ESTIMATE
+
+    merge = same_row & (reprint_cost - jump_cost <= threshold)
+
+    # a new span starts at every run that doesnt get merged into the previous one
+    span_firsts = np.flatnonzero(np.concatenate(([True], ~merge)))
+    span_lasts = np.concatenate((span_firsts[1:] - 1, [len(runs) - 1]))
+
+    return list(zip(rows[span_firsts].tolist(), starts[span_firsts].tolist(), ends[span_lasts].tolist()))
@@ -0,0 +1,147 @@
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+import numpy as np
+
+_BYTE_DECIMALS: List[bytes] = [str(i).encode() for i in range(256)]
+""" Lookup table: 0-255 -> the ascii decimal bytes of that number. Saves a str.format per color channel. """
+
+_FG_PREFIX = b'\033[38;2;'
+_BG_PREFIX = b'\033[48;2;'
+_SEP = b';'
+_END = b'm'
+
+def pack_color(color: Tuple[int, int, int] | np.ndarray) -> int:
+    """ Packs an rgb color into a python int (0xRRGGBB), same layout as `render.utils.pack_pixels`. """
+    return (int(color[0]) << 16) | (int(color[1]) << 8) | int(color[2])
+
+def encode_fg(color: int) -> bytes:
+    """ Truecolor fg escape for a packed color, built from the precomputed decimal table. """
+    return b''.join((
+        _FG_PREFIX, _BYTE_DECIMALS[(color >> 16) & 255], _SEP, _BYTE_DECIMALS[(color >> 8) & 255], _SEP, _BYTE_DECIMALS[color & 255], _END
+    ))
+
+def encode_bg(color: int) -> bytes:
+    """ Truecolor bg escape for a packed color, built from the precomputed decimal table. """
+    return b''.join((
+        _BG_PREFIX, _BYTE_DECIMALS[(color >> 16) & 255], _SEP, _BYTE_DECIMALS[(color >> 8) & 255], _SEP, _BYTE_DECIMALS[color & 255], _END
+    ))
+
+class LRUCache:
+    """ Small bounded least-recently-used cache, with hit/miss counters. """
+
+    def __init__(self, max_size: int) -> None:
+        self.max_size = max_size
+        self.entries: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """ Returns the cached value, or None (and counts a miss) if not cached """
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return value
+
+    def put(self, key, value) -> None:
+        self.entries[key] = value
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+class EscapeCache:
+    """
+    Shared cache of pre-encoded truecolor escape codes, keyed on packed colors
+    (one int per color, or one int per fg+bg cell - see `render.utils.pack_cells`).
+
+    Used by the CameraFrame encoder, img2term and the menus (through `fcode_opt`), so each distinct
+    color pair only ever gets formatted once, no matter how many frames it shows up in.
+    """
+
+    MAX_SIZE = 4096
+    """ Max entries per cache. A level only uses a few hundred distinct colors, so this rarely evicts anything. """
+
+    cells = LRUCache(MAX_SIZE)
+    """ packed cell (fg << 24 | bg) -> fg+bg escape bytes """
+    fgs = LRUCache(MAX_SIZE)
+    """ packed fg color -> fg-only escape bytes """
+    bgs = LRUCache(MAX_SIZE)
+    """ packed bg color -> bg-only escape bytes """
+    strs = LRUCache(MAX_SIZE)
+    """ (packed fg | None, packed bg | None) -> escape str, for the str-based `fcode_opt` callers """
+
+    def get_cell(cell: int) -> bytes:
+        """ fg+bg escape for a packed cell """
+        code = EscapeCache.cells.get(cell)
+        if code is None:
+            code = encode_fg(cell >> 24) + encode_bg(cell & 0xFFFFFF)
+            EscapeCache.cells.put(cell, code)
+        return code
+
+    def get_fg(color: int) -> bytes:
+        """ fg-only escape for a packed color """
+        code = EscapeCache.fgs.get(color)
+        if code is None:
+            code = encode_fg(color)
+            EscapeCache.fgs.put(color, code)
+        return code
+
+    def get_bg(color: int) -> bytes:
+        """ bg-only escape for a packed color """
+        code = EscapeCache.bgs.get(color)
+        if code is None:
+            code = encode_bg(color)
+            EscapeCache.bgs.put(color, code)
+        return code
+
+    def get_transition(prev_cell: int | None, cell: int) -> bytes:
+        """
+        Escape needed to go from the terminal's current SGR state (`prev_cell`) to `cell`.
+        Only emits the half that actually changed - e.g. if just the bottom pixel changed, only the bg code is sent.
+        `prev_cell` of None means the state is unknown, so both halves are emitted.
+        """
+        if prev_cell is None:
+            return EscapeCache.get_cell(cell)
+
+        changed = prev_cell ^ cell
+        if changed & 0xFFFFFF == 0: # same bg
+            if changed == 0:
+                return b''
+            return EscapeCache.get_fg(cell >> 24)
+        if changed >> 24 == 0: # same fg
+            return EscapeCache.get_bg(cell & 0xFFFFFF)
+        return EscapeCache.get_cell(cell)
+
+    def get_str(fg: Tuple[int, int, int] | np.ndarray | None = None, bg: Tuple[int, int, int] | np.ndarray | None = None) -> str:
+        """ Cached str version, same output as the original `fcode_opt(fg, bg)` """
+        key = (pack_color(fg) if fg is not None else None, pack_color(bg) if bg is not None else None)
+        code = EscapeCache.strs.get(key)
+        if code is None:
+            code = ''
+            if key[0] is not None:
+                code += EscapeCache.get_fg(key[0]).decode()
+            if key[1] is not None:
+                code += EscapeCache.get_bg(key[1]).decode()
+            EscapeCache.strs.put(key, code)
+        return code
+
+    def stats() -> Dict[str, Dict[str, int]]:
+        """ Hit/miss counters and current size of each cache (e.g. for the profiler) """
+        return {
+            name: {"hits": cache.hits, "misses": cache.misses, "size": len(cache)}
+            for name, cache in (("cells", EscapeCache.cells), ("fgs", EscapeCache.fgs), ("bgs", EscapeCache.bgs), ("strs", EscapeCache.strs))
+        }
+
+    def reset_stats() -> None:
+        for cache in (EscapeCache.cells, EscapeCache.fgs, EscapeCache.bgs, EscapeCache.strs):
+            cache.hits = 0
+            cache.misses = 0
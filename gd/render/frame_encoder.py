@@ -0,0 +1,70 @@
+from typing import Dict, List, Tuple
+import numpy as np
+from render.escape_cache import EscapeCache
+from gd_constants import GDConstants
+
+HALF_BLOCK = '▀'.encode()
+""" utf-8 bytes of the half-block char. top pixel is the fg color, bottom pixel is the bg color. """
+
+_move_cache: Dict[Tuple[int, int], bytes] = {}
+""" (x, y) terminal coords -> encoded move_xy escape. The screen is small, so this never gets big. """
+
+Span = Tuple[int, int, int]
+""" (row pair index, start col (inclusive), end col (exclusive)) """
+
+def encode_move(x: int, y: int) -> bytes:
+    """ Encoded terminal move_xy escape, cached by position. """
+    code = _move_cache.get((x, y))
+    if code is None:
+        code = GDConstants.term.move_xy(x, y).encode()
+        _move_cache[(x, y)] = code
+    return code
+
+def get_cell_changes(packed_cells: np.ndarray, prev_packed_cells: np.ndarray) -> np.ndarray:
+    """ Returns a (height//2, width) bool array, True where either half of a terminal cell differs from the previous frame.
+    Takes packed cells (see `render.utils.pack_cells`), so this is a single comparison for the whole frame. """
+    return packed_cells != prev_packed_cells
+
+def get_color_breaks(packed_cells: np.ndarray) -> np.ndarray:
+    """ Returns a (height//2, width-1) bool array where [i, j] is True if cell j+1 of row pair i
+    has a different color pair than cell j (so a new escape code is needed). """
+    return packed_cells[:, 1:] != packed_cells[:, :-1]
+
+def get_first_to_last_spans(cell_changes: np.ndarray) -> List[Span]:
+    """ One span per changed row pair, from the first changed cell to the last one (same output region as `CameraFrame.render_default`) """
+    changed_rows = np.flatnonzero(cell_changes.any(axis=1))
+    if len(changed_rows) == 0:
+        return []
+
+    rows = cell_changes[changed_rows]
+    starts = rows.argmax(axis=1)
+    ends = rows.shape[1] - rows[:, ::-1].argmax(axis=1)
+
+    return list(zip(changed_rows.tolist(), starts.tolist(), ends.tolist()))
+
+def encode_spans(packed_cells: np.ndarray, spans: List[Span], color_breaks: np.ndarray, pos: Tuple[int, int] = (0, 0)) -> bytes:
+    """ Encodes the given spans of a frame (as packed cells) into a single bytes buffer, ready to be written to the terminal.
+
+    Color runs inside each span are found with numpy, so python only does work per run (not per pixel).
+    Every run gets an escape code followed by `HALF_BLOCK * run_length`. The SGR state carries over moves,
+    so the escape only contains the half (fg/bg) that changed since the last run, if any (see `EscapeCache.get_transition`). """
+
+    parts = []
+    sgr_state = None # unknown at the start of the write
+
+    for row, start, end in spans:
+        # run starts: the start of the span, plus every color break inside the span
+        # color_breaks[row, j] describes the boundary between cells j and j+1
+        run_starts = np.flatnonzero(color_breaks[row, start:end-1]) + (start + 1)
+        run_starts = np.concatenate(([start], run_starts, [end]))
+
+        run_lengths = np.diff(run_starts).tolist()
+        cells = packed_cells[row, run_starts[:-1]].tolist()
+
+        parts.append(encode_move(start + pos[0], row + pos[1]//2))
+        for cell, run_length in zip(cells, run_lengths):
+            parts.append(EscapeCache.get_transition(sgr_state, cell))
+            parts.append(HALF_BLOCK * run_length)
+            sgr_state = cell
+
+    return b''.join(parts)
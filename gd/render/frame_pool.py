@@ -0,0 +1,64 @@
+from typing import List, Tuple
+from render.camera_frame import CameraFrame
+from render.constants import CameraConstants
+from gd_constants import GDConstants
+
+class FramePool:
+    """
+    Ring of preallocated CameraFrames, so renderers can swap between a few buffers
+    instead of allocating (and zero-filling) a new frame every tick.
+
+    Usual pattern (double buffering):
+    ```python
+    new_frame = pool.acquire(avoid=curr_frame) # never the frame that is currently on screen
+    new_frame.fill(bg_color) # (or .copy(into=...) / any of the add_ methods - everything is in place)
+    new_frame.render(curr_frame)
+    curr_frame = new_frame
+    ```
+
+    Only the `num_buffers-1` most recently acquired frames (plus `avoid`) are guaranteed to be untouched,
+    so with 2 buffers, only hold onto the last acquired frame (the one on screen).
+    """
+
+    def __init__(
+        self,
+        size: Tuple[int | None, int | None] = (None, None),
+        pos: Tuple[int | None, int | None] = (0, 0),
+        num_buffers: int = CameraConstants.FRAME_POOL_SIZE
+        ) -> None:
+        """ `size` and `pos` are the same as for CameraFrame. None sizes follow the terminal size,
+        and the buffers get reallocated if the terminal was resized since the last acquire. """
+
+        assert num_buffers >= 2, f"[FramePool/__init__]: need at least 2 buffers to swap between, got {num_buffers}"
+
+        self.size = size
+        self.pos = pos
+        self.num_buffers = num_buffers
+
+        self.frames: List[CameraFrame] = [CameraFrame(size, pos) for _ in range(num_buffers)]
+        self._next_index = 0
+
+    def _get_target_size(self) -> Tuple[int, int]:
+        return (
+            self.size[0] if self.size[0] is not None else GDConstants.term.width,
+            self.size[1] if self.size[1] is not None else GDConstants.term.height*2
+        )
+
+    def acquire(self, avoid: CameraFrame | None = None) -> CameraFrame:
+        """ Returns the next buffer of the ring. Its contents are whatever was drawn on it
+        `num_buffers` acquires ago, so it should be fully redrawn (fill/copy into) before use.
+        
+        `avoid`: a frame that must not be handed out (usually the one currently on screen, which the new frame gets diffed against). """
+
+        target_width, target_height = self._get_target_size()
+        if self.frames[0].width != target_width or self.frames[0].height != target_height:
+            self.frames = [CameraFrame(self.size, self.pos) for _ in range(self.num_buffers)]
+
+        frame = self.frames[self._next_index]
+        self._next_index = (self._next_index + 1) % self.num_buffers
+        
+        if frame is avoid:
+            frame = self.frames[self._next_index]
+            self._next_index = (self._next_index + 1) % self.num_buffers
+        
+        return frame
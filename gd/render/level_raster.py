@@ -0,0 +1,233 @@
+from typing import TYPE_CHECKING, Dict, Literal, Set, Tuple
+from math import floor
+import threading
+
+from render.camera_frame import CameraFrame
+from render.constants import CameraConstants
+from render.escape_cache import LRUCache
+from render.texture_manager import TextureManager
+from engine.objects import OBJECTS
+
+if TYPE_CHECKING:
+    from level import Level
+
+def _get_overflow_blocks() -> int:
+    """ How many blocks an object texture can stick out past its own grid cell, on any side.
+    Most textures are exactly one block, but some (e.g. big spikes, chains) are bigger and get centered on their cell. """
+    max_size = max(max(TextureManager.base_textures[name].shape[:2]) for name in OBJECTS.MASTERLIST)
+    overflow_px = max(0, max_size - max_size//2 - CameraConstants.BLOCK_WIDTH//2)
+    return -(-overflow_px // CameraConstants.BLOCK_WIDTH) # ceil
+
+OVERFLOW_BLOCKS = _get_overflow_blocks()
+""" Max number of blocks a level object's texture can overflow its cell by (computed from the base textures) """
+
+class LevelRaster:
+    """
+    Pre-rasterized copy of a level's static objects, so the camera doesn't have to blend every visible object every frame.
+
+    The level is split into column chunks of `CameraConstants.LEVEL_RASTER_CHUNK_WIDTH` blocks. Each chunk gets rendered once
+    into a tile (bg color + every object that overlaps it, full level height), and a frame is then just
+    a couple of slice copies out of those tiles (see `blit`), with the player etc. drawn on top.
+
+    Tiles are cached by (chunk, color state of that chunk), where the color state is the bg color plus the current color of
+    every channel the chunk's objects use. So a color change only re-renders the chunks that use that channel, and
+    going back to an old color (e.g. restarting the level) reuses the old tiles if they're still cached.
+    The per-chunk color states are recomputed when the level notifies us about a color change (see `Level.color_channel_listeners`).
+    Tiles for the in-between colors of a fade are dropped right away instead, since they'd only push useful tiles out of the cache.
+
+    Color changes come from the physics thread (color triggers), so the listener only queues the channel ids, and the
+    render thread applies them at the start of `blit`. Everything else here is only touched by the thread that renders.
+    """
+
+    def __init__(self, level: "Level", hide_invis: bool = True) -> None:
+
+        self.level = level
+        self.hide_invis = hide_invis
+        """ Passed on to `TextureManager.get_transformed_texture` - whether invisible objects should be left out """
+
+        self.chunk_width_px = CameraConstants.LEVEL_RASTER_CHUNK_WIDTH * CameraConstants.BLOCK_WIDTH
+        self.pad_px = OVERFLOW_BLOCKS * CameraConstants.BLOCK_HEIGHT
+        """ Extra rows above and below the level in each tile, for textures that stick out past the top/bottom row """
+
+        self.tiles = LRUCache(CameraConstants.LEVEL_RASTER_MAX_CHUNKS)
+        """ (chunk index, level height, color key) -> rendered tile (CameraFrame) """
+
+        self.chunk_channels: Dict[int, Tuple[int, ...]] = {}
+        """ chunk index -> ids of the color channels its objects use. Filled in the first time a chunk is needed. """
+        self.channel_chunks: Dict[int, Set[int]] = {}
+        """ color channel id -> indices of the (scanned) chunks that use it. Reverse of `chunk_channels` """
+        self.chunk_keys: Dict[int, tuple] = {}
+        """ chunk index -> its current color key. Entries get removed when one of the chunk's colors changes. """
+        self.fading_chunks: Set[int] = set()
+        """ Chunks whose current color key was made while one of their channels was in the middle of a fade.
+        Tiles for those colors won't be needed again, so they're dropped as soon as the color moves on (see `apply_color_channel_change`). """
+
+        self.changed_channels: Set[Literal["bg", "grnd"] | int | None] = set()
+        """ Channel ids that changed since the last `blit` (queued by `on_color_channel_change`, guarded by `changed_channels_lock`) """
+        self.changed_channels_lock = threading.Lock()
+
+        level.color_channel_listeners.append(self.on_color_channel_change)
+
+    def get_tile_height(self) -> int:
+        return self.level.height * CameraConstants.BLOCK_HEIGHT + 2*self.pad_px
+
+    def get_chunk_columns(self, chunk: int) -> Tuple[int, int]:
+        """ Range of level columns (blocks, end exclusive) whose objects can show up in the given chunk's tile. """
+        return (
+            max(0, chunk*CameraConstants.LEVEL_RASTER_CHUNK_WIDTH - OVERFLOW_BLOCKS),
+            min(self.level.length, (chunk+1)*CameraConstants.LEVEL_RASTER_CHUNK_WIDTH + OVERFLOW_BLOCKS)
+        )
+
+    def get_chunk_range(self) -> Tuple[int, int]:
+        """ Range of chunk indices (end exclusive) that can contain anything. Can start at -1 if textures overflow past x=0. """
+        overflow_px = OVERFLOW_BLOCKS * CameraConstants.BLOCK_WIDTH
+        return (
+            floor(-overflow_px / self.chunk_width_px),
+            floor((self.level.length*CameraConstants.BLOCK_WIDTH + overflow_px - 1) / self.chunk_width_px) + 1
+        )
+
+    def _scan_chunk(self, chunk: int) -> Tuple[int, ...]:
+        """ Finds (and saves) the color channels used by the objects drawn into the given chunk """
+
+        channels = self.level.grid.get_channels_in(*self.get_chunk_columns(chunk), hide_invis=self.hide_invis)
+
+        self.chunk_channels[chunk] = channels
+        for channel in channels:
+            self.channel_chunks.setdefault(channel, set()).add(chunk)
+        return self.chunk_channels[chunk]
+
+    def get_chunk_key(self, chunk: int) -> tuple:
+        """ Current color state of a chunk - the tile cache key (along with the chunk index) """
+
+        key = self.chunk_keys.get(chunk)
+        if key is None:
+            channels = self.chunk_channels.get(chunk)
+            if channels is None:
+                channels = self._scan_chunk(chunk)
+
+            key = (self.level.bg_color, *(self.level.get_color_channel(channel) for channel in channels))
+            self.chunk_keys[chunk] = key
+            
+            timeline = self.level.color_timeline
+            if timeline.is_fading("bg") or any(timeline.is_fading(channel) for channel in channels):
+                self.fading_chunks.add(chunk)
+        return key
+
+    def render_tile(self, chunk: int) -> CameraFrame:
+        """ Renders a chunk's tile from scratch, with the level's current colors """
+
+        tile = CameraFrame((self.chunk_width_px, self.get_tile_height()))
+        tile.fill(self.level.bg_color)
+
+        chunk_left_px = chunk * self.chunk_width_px
+
+        # same draw order as the camera used to do per frame: bottom row first, left to right
+        for row in range(self.level.height):
+            ypos = self.pad_px + (self.level.height - 1 - row) * CameraConstants.BLOCK_HEIGHT + CameraConstants.BLOCK_HEIGHT // 2
+
+            start, end = self.get_chunk_columns(chunk)
+            for x, obj in enumerate(self.level.get_row(row, start, end), start):
+                if obj is not None:
+                    xpos = x * CameraConstants.BLOCK_WIDTH - chunk_left_px + CameraConstants.BLOCK_WIDTH // 2
+                    tile.add_pixels_centered_at(xpos, ypos, TextureManager.get_transformed_texture(self.level, obj, hide_invis=self.hide_invis))
+
+        return tile
+
+    def get_tile(self, chunk: int) -> CameraFrame:
+        """ Returns the tile for a chunk with the current colors, rendering it if it isn't cached """
+
+        cache_key = (chunk, self.level.height, self.get_chunk_key(chunk)) # height changes if the level grows
+        tile = self.tiles.get(cache_key)
+        if tile is None:
+            tile = self.render_tile(chunk)
+            self.tiles.put(cache_key, tile)
+        return tile
+
+    def blit(self, frame: CameraFrame, camera_left: float, ground_screen_y_pos: float) -> None:
+        """
+        Copies the visible part of the level onto `frame`. Everything outside the level (left of x=0, above the top row, etc.)
+        is left untouched, so the frame should already be filled with the bg color.
+
+        `camera_left` is in blocks (same as `Camera.camera_left`), and `ground_screen_y_pos` is the screen y (px)
+        of the top of the ground (= the bottom of level row 0).
+        """
+
+        self.apply_color_channel_changes()
+
+        # level px column of the frame's leftmost column
+        left_px = round(camera_left * CameraConstants.BLOCK_WIDTH)
+        # tile row that lines up with the frame's top row
+        top_tile_row = self.level.height * CameraConstants.BLOCK_HEIGHT + self.pad_px - round(ground_screen_y_pos)
+
+        tile_height = self.get_tile_height()
+        frame_top = max(0, -top_tile_row)
+        frame_bottom = min(frame.height, tile_height - top_tile_row)
+        if frame_bottom <= frame_top:
+            return
+
+        first_chunk, last_chunk = self.get_chunk_range()
+        first_chunk = max(first_chunk, floor(left_px / self.chunk_width_px))
+        last_chunk = min(last_chunk, floor((left_px + frame.width - 1) / self.chunk_width_px) + 1)
+
+        for chunk in range(first_chunk, last_chunk):
+            chunk_left_px = chunk * self.chunk_width_px
+            frame_left = max(0, chunk_left_px - left_px)
+            frame_right = min(frame.width, chunk_left_px + self.chunk_width_px - left_px)
+
+            tile = self.get_tile(chunk)
+            frame.pixels[frame_top:frame_bottom, frame_left:frame_right] = tile.pixels[
+                frame_top + top_tile_row : frame_bottom + top_tile_row,
+                frame_left + left_px - chunk_left_px : frame_right + left_px - chunk_left_px
+            ]
+
+        frame.mark_dirty()
+
+    def on_color_channel_change(self, id: Literal["bg", "grnd"] | int | None) -> None:
+        """ Listener for `Level.set_color_channel`. Can be called from any thread, so it just queues the channel
+        for the next `blit` (see `apply_color_channel_change`). """
+        with self.changed_channels_lock:
+            self.changed_channels.add(id)
+
+    def apply_color_channel_changes(self) -> None:
+        """ Applies the color changes queued since the last call. Call from the thread that renders. """
+        with self.changed_channels_lock:
+            if not self.changed_channels:
+                return
+            changed_channels, self.changed_channels = self.changed_channels, set()
+
+        for id in ([None] if None in changed_channels else changed_channels):
+            self.apply_color_channel_change(id)
+
+    def apply_color_channel_change(self, id: Literal["bg", "grnd"] | int | None) -> None:
+        """ Drops the color keys of the chunks that use the channel, so they get looked up (and rendered,
+        if there's no tile for the new colors yet) the next time they're visible. `id` of None means every channel may have changed. """
+
+        if id is None or id == "bg":
+            chunks = list(self.chunk_keys)
+        elif id == "grnd":
+            return # ground isn't part of the raster
+        else:
+            chunks = self.channel_chunks.get(id, ())
+
+        for chunk in chunks:
+            key = self.chunk_keys.pop(chunk, None)
+            if key is not None and chunk in self.fading_chunks:
+                self.fading_chunks.discard(chunk)
+                self.tiles.entries.pop((chunk, self.level.height, key), None)
+
+    def invalidate_columns(self, start: int, end: int) -> None:
+        """ Call after the objects in level columns [start, end) change (e.g. placing/deleting objects).
+        Drops the cached tiles of every chunk those objects can be drawn into. """
+
+        first_chunk = floor((start - OVERFLOW_BLOCKS) / CameraConstants.LEVEL_RASTER_CHUNK_WIDTH)
+        last_chunk = floor((end - 1 + OVERFLOW_BLOCKS) / CameraConstants.LEVEL_RASTER_CHUNK_WIDTH) + 1
+        chunks = set(range(first_chunk, last_chunk))
+
+        for chunk in chunks:
+            for channel in self.chunk_channels.pop(chunk, ()):
+                self.channel_chunks[channel].discard(chunk)
+            self.chunk_keys.pop(chunk, None)
+            self.fading_chunks.discard(chunk)
+
+        for cache_key in [cache_key for cache_key in self.tiles.entries if cache_key[0] in chunks]:
+            del self.tiles.entries[cache_key]
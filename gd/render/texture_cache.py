@@ -0,0 +1,125 @@
+from typing import Callable, Dict, Tuple
+import json
+import os
+import numpy as np
+
+from logger import Logger
+
+class CompiledTextureCache:
+    """
+    On-disk cache of compiled textures (decoded pngs, colored player icons), so startup doesn't have to go through PIL
+    for every asset again. Static, like `Logger`.
+
+    Every cached texture lives in one flat uint8 `.npy` file that gets memory-mapped (`np.load(mmap_mode='r')`),
+    so loading the cache is just reading the index - a texture's bytes are only paged in once something draws it.
+    (One `.npy` instead of an `.npz`, since numpy can't memory-map the arrays inside an `.npz`.)
+
+    Entries are keyed by asset path + build options (e.g. the player colors), and only trusted while the asset's
+    mtime and size still match - anything else gets rebuilt and the cache rewritten on the next `save`.
+    """
+
+    DATA_FILEPATH = "./assets/.compiled_textures.npy"
+    INDEX_FILEPATH = "./assets/.compiled_textures.json"
+    VERSION = 1
+
+    entries: Dict[str, dict] | None = None
+    """ key -> {"mtime_ns", "size", "offset", "shape", "dtype"}, for the textures in `data`. None until loaded (see `load`) """
+
+    data: np.ndarray | None = None
+    """ The memory-mapped texture data (flat uint8) """
+
+    new_textures: Dict[str, Tuple[np.ndarray, os.stat_result]] = {}
+    """ key -> (texture, stat of its asset) for textures built since the cache was last written """
+
+    def load() -> None:
+        """ Maps the cache file, if it hasn't been yet. A missing or broken cache just starts out empty. """
+
+        if CompiledTextureCache.entries is not None:
+            return
+
+        CompiledTextureCache.entries = {}
+        try:
+            with open(CompiledTextureCache.INDEX_FILEPATH, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+            if index.get("version") != CompiledTextureCache.VERSION:
+                return
+
+            data = np.load(CompiledTextureCache.DATA_FILEPATH, mmap_mode='r')
+            if data.dtype != np.uint8 or data.ndim != 1 or data.size != index["data_size"]:
+                raise ValueError("data file doesn't match the index")
+
+            CompiledTextureCache.data = data
+            CompiledTextureCache.entries = index["entries"]
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError, AttributeError) as e:
+            Logger.log(f"[CompiledTextureCache/load]: ignoring broken texture cache ({e!r})")
+
+    def get(filepath: str, build: Callable[[], np.ndarray], *options) -> np.ndarray:
+        """
+        The compiled texture of an asset. Returns the cached one if the asset hasn't changed since it was cached,
+        otherwise calls `build()` (and caches the result). `options` are whatever else the texture depends on besides the file.
+        The returned texture is read-only.
+        """
+
+        CompiledTextureCache.load()
+
+        key = json.dumps([filepath, *map(str, options)])
+        stat = os.stat(filepath)
+
+        entry = CompiledTextureCache.entries.get(key)
+        if entry is not None and key not in CompiledTextureCache.new_textures \
+            and entry["mtime_ns"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+            dtype = np.dtype(entry["dtype"])
+            nbytes = int(np.prod(entry["shape"])) * dtype.itemsize
+            # view(np.ndarray) so it's a plain array and not a np.memmap (which every result computed from it would be, too)
+            return CompiledTextureCache.data[entry["offset"]:entry["offset"]+nbytes].view(np.ndarray).view(dtype).reshape(entry["shape"])
+
+        texture = np.ascontiguousarray(build())
+        texture.flags.writeable = False
+        CompiledTextureCache.new_textures[key] = (texture, stat)
+        return texture
+
+    def save() -> None:
+        """ Writes the cache files if any textures were built since they were last written.
+        Written to temporary files first, so they're never half written. """
+
+        if not CompiledTextureCache.new_textures:
+            return
+
+        entries = {}
+        chunks = []
+        offset = 0
+
+        def add(key: str, texture: np.ndarray, mtime_ns: int, size: int) -> None:
+            nonlocal offset
+            chunks.append(texture.reshape(-1).view(np.uint8))
+            entries[key] = {"mtime_ns": mtime_ns, "size": size, "offset": offset, "shape": list(texture.shape), "dtype": texture.dtype.str}
+            offset += texture.nbytes
+
+        for key, entry in CompiledTextureCache.entries.items():
+            if key not in CompiledTextureCache.new_textures:
+                nbytes = int(np.prod(entry["shape"])) * np.dtype(entry["dtype"]).itemsize
+                add(key, CompiledTextureCache.data[entry["offset"]:entry["offset"]+nbytes].view(np.ndarray), entry["mtime_ns"], entry["size"])
+        for key, (texture, stat) in CompiledTextureCache.new_textures.items():
+            add(key, np.ascontiguousarray(texture), stat.st_mtime_ns, stat.st_size)
+
+        try:
+            temp_filepath = CompiledTextureCache.DATA_FILEPATH + ".tmp"
+            with open(temp_filepath, 'wb') as f:
+                np.save(f, np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.uint8))
+            os.replace(temp_filepath, CompiledTextureCache.DATA_FILEPATH)
+
+            temp_filepath = CompiledTextureCache.INDEX_FILEPATH + ".tmp"
+            with open(temp_filepath, 'w', encoding='utf-8') as f:
+                json.dump({"version": CompiledTextureCache.VERSION, "data_size": offset, "entries": entries}, f)
+            os.replace(temp_filepath, CompiledTextureCache.INDEX_FILEPATH)
+        except OSError as e:
+            # e.g. on windows, where a file that's still mapped can't be replaced. just try again next time
+            Logger.log(f"[CompiledTextureCache/save]: couldn't write the texture cache ({e!r})")
+            return
+
+        # textures handed out earlier keep the old mapping alive, the new one is only for later lookups
+        CompiledTextureCache.data = np.load(CompiledTextureCache.DATA_FILEPATH, mmap_mode='r')
+        CompiledTextureCache.entries = entries
+        CompiledTextureCache.new_textures = {}
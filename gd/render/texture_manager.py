@@ -1,12 +1,16 @@
-from typing import Literal, Dict, List, TypedDict, TYPE_CHECKING
+from typing import Literal, Dict, List, Set, Tuple, TypedDict, TYPE_CHECKING
 from PIL import Image
+import threading
+import weakref
 import numpy as np
 
 from gd_constants import GDConstants
 from logger import Logger
-from render.utils import mix_colors_opt as mco
 from render.font import Font
+from render.compositing import prepare_texture
 from render.constants import CameraConstants
+from render.escape_cache import LRUCache
+from render.texture_cache import CompiledTextureCache
 from level import Level, LevelObject, AbstractLevelObject
 from engine.objects import OBJECTS
 
@@ -38,21 +42,43 @@ class TextureManager:
     player_color2: CameraConstants.RGBTuple = (90, 250, 255)
     player_icons: Dict[str, List[np.ndarray]] = {}
     """ A dict of gamemode : list of frames for player icon. Cube has 4 frames, ball has 2, ufo has 1. """
+    player_icons_flipped: Dict[str, List[np.ndarray]] = {}
+    """ Same as `player_icons`, but flipped vertically (for reverse gravity). Built once, so it's the same (read-only) array
+    every frame and compositing only has to prepare it once. """
     
     base_textures = {}
-    texture_cache = {}
+    texture_cache = LRUCache(CameraConstants.TEXTURE_CACHE_MAX_SIZE)
     """
-    Caches transformed textures that we've seen before.
+    Caches transformed textures that we've seen before. Least recently used ones get dropped past `CameraConstants.TEXTURE_CACHE_MAX_SIZE`,
+    and ones built from a color a channel doesn't have anymore get dropped when the channel changes (see `evict_stale_textures`).
     
-    Cache keys are stored in the following format:
+    Cache keys are stored in the following format (see `get_transformed_key`):
     
-    `{object name}_{rotation}_{reflection}_{color1|None}_{color2|None}`
+    `(object texture key, color1 | None, color2 | None)`
+    
+    Cached textures are read-only and get handed out as-is (no copy), so don't modify them.
+    Ask for `writable=True` if you need to (e.g. for `set_transparency`).
     """
+    channel_textures: "weakref.WeakKeyDictionary[Level, Dict[int, Dict[tuple, int]]]" = weakref.WeakKeyDictionary()
+    """ level -> color channel id -> {texture cache key of a texture colored with that channel in that level: the level's
+    `Level.color_channel_versions` of the channel when it was built}. Levels that `evict_stale_textures` listens to are
+    exactly the ones in here. Weak, so a level (and its listener) goes away once nothing else uses it. """
+    texture_channels: Dict[tuple, Tuple[int, ...]] = {}
+    """ texture cache key -> the channels it's listed under in `channel_textures` (so it can be unlisted from all of them at once) """
+    changed_channels: "weakref.WeakKeyDictionary[Level, Set[Literal['bg', 'grnd'] | int | None]]" = weakref.WeakKeyDictionary()
+    """ level -> ids of its channels that changed since the last `evict_changed_channels` (None = all of them).
+    Color triggers change channels on the physics thread, so the listener only queues them here (guarded by `changed_channels_lock`),
+    and the eviction happens on the thread that renders, which is the only one that touches `texture_cache`. """
+    changed_channels_lock = threading.Lock()
+    
+    empty_texture = np.zeros((1, 1, 4), dtype=np.uint8)
+    """ Shared, fully transparent 1x1 texture (e.g. for hidden invisible objects) """
+    empty_texture.flags.writeable = False
     
-    # currently unused
-    ground_texture_cache = {}
-    """ Cache for ground textures.
-    Key is color, value is a list of CameraConstants.GROUND_TEXTURE_PERIOD textures that correspond to the different offsets."""
+    ground_texture_cache: "Tuple[CameraConstants.RGBTuple, np.ndarray, List[np.ndarray | None]] | None" = None
+    """ (ground color, recolored ground strip, ground texture per offset) for the last ground color that was drawn (see `get_curr_ground_texture`).
+    The strip is the recolored ground texture plus its first `CameraConstants.GROUND_TEXTURE_PERIOD` columns again, so each offset is a slice of it.
+    The per-offset textures are filled in the first time each offset is drawn. Everything gets rebuilt when the ground color changes. """
     
     # load fonts
     font_small1 = Font("./assets/fonts/small1.png")
@@ -85,8 +111,27 @@ class TextureManager:
         Turns the png file to a 2d list of pixel objects (rgba np arrays) (see ./camera_frame.py)
         
         `convert_red_to_black` is a special option that converts all (255, 0, 0, Any) pixels to black. This is used for the player icons.
+        
+        Cached on disk (see `CompiledTextureCache`), so the returned texture is read-only.
         """
         
+        return CompiledTextureCache.get(
+            filepath,
+            lambda: TextureManager.colorize_grayscale_image(filepath, color1, color2, scale, rotation, reflections, convert_red_to_black),
+            color1, color2, scale, rotation, reflections, convert_red_to_black
+        )
+    
+    def colorize_grayscale_image(
+        filepath: str,
+        color1: CameraConstants.RGBTuple,
+        color2: CameraConstants.RGBTuple,
+        scale: int,
+        rotation: CameraConstants.OBJECT_ROTATIONS,
+        reflections: CameraConstants.OBJECT_REFLECTIONS,
+        convert_red_to_black: bool
+        ) -> np.ndarray:
+        """ Uncached `build_grayscale_texture_to_pixels` """
+        
         im = Image.open(filepath)
         
         # apply scaling if necessary
@@ -95,27 +140,21 @@ class TextureManager:
             im = im.resize((im.width * scale, im.height * scale))
 
         pixels = np.array(im)
-        colored_pixels: np.ndarray = np.zeros((len(pixels), len(pixels[0]), 4), dtype=np.uint8)
-
-        for i in range(len(pixels)):
-            for j in range(len(pixels[i])):
-                
-                # NOTE - this is slow, and there are vectorized ways to do this
-                
-                px_data = pixels[i][j] # should be a 4-long ndarray of the rgba values
-                alpha = px_data[3] if len(px_data) == 4 else 255
-
-                # find the grayscale values of the pixel (average of rgb).
-                # with the grayscale % (0-100) where 0 is black and 100 is white,
-                # use a color mix between the edge color and bg color
-                # 0 is edge color, 100 is bg color
-                
-                gray = sum(px_data[0:3]) / 3 / 255
-                
-                colored_px = mco(color1, color2, gray)
-                if convert_red_to_black and np.all(px_data[:3] == [255, 0, 0]):
-                    colored_px = (0, 0, 0)
-                colored_pixels[i][j] = (*colored_px, alpha)
+        colored_pixels: np.ndarray = np.zeros((pixels.shape[0], pixels.shape[1], 4), dtype=np.uint8)
+        
+        # find the grayscale values of the pixels (average of rgb).
+        # with the grayscale % (0-100) where 0 is black and 100 is white,
+        # use a color mix between the edge color and bg color
+        # 0 is edge color, 100 is bg color
+        gray = pixels[:, :, :3].sum(axis=2, dtype=np.float64)[:, :, np.newaxis] / 3 / 255
+        
+        # same math as mix_colors_opt, for every pixel at once (astype truncates like its int())
+        color1_arr = np.array(color1, dtype=np.float64)
+        colored_pixels[:, :, :3] = (color1_arr + (np.array(color2, dtype=np.float64) - color1_arr) * gray).astype(np.uint8)
+        colored_pixels[:, :, 3] = pixels[:, :, 3] if pixels.shape[2] == 4 else 255
+        
+        if convert_red_to_black:
+            colored_pixels[np.all(pixels[:, :, :3] == (255, 0, 0), axis=2), :3] = 0
         
         # apply any changes
         final_pixels = np.rot90(colored_pixels, ROTATION_VALUES[rotation])
@@ -164,8 +203,14 @@ class TextureManager:
     
     def compile_texture(filepath: str) -> np.ndarray:
         """ Basically build_grayscale_texture_to_pixels or build_colorful_texture_to_pixels but without any options,
-        since those seem pretty useless lol """
-        return np.array(Image.open(filepath))
+        since those seem pretty useless lol 
+        
+        The returned texture is read-only (it gets shared by everything that draws it), which also lets
+        `render.compositing` classify its alpha once here instead of on every draw.
+        Cached on disk, so png decoding only happens the first time (see `CompiledTextureCache`). """
+        texture = CompiledTextureCache.get(filepath, lambda: np.array(Image.open(filepath)))
+        prepare_texture(texture)
+        return texture
 
     def reflect_texture(pixels: np.ndarray, reflection: CameraConstants.OBJECT_REFLECTIONS) -> np.ndarray:
         """
@@ -225,124 +270,188 @@ class TextureManager:
     def set_transparency(pixels: np.ndarray, alpha: int) -> np.ndarray:
         """ Sets the alpha channel of a texture to a specific value. `alpha` should be from 0 to 255 inclusive.
         Mixes alpha values if image is already transparent.
+        
+        Modifies `pixels` in place, so it has to be writable (e.g. `get_transformed_texture(..., writable=True)`).
         """
         
         # if pixels doesn't have an alpha channel, add one
         if pixels.shape[2] == 3:
             pixels = np.concatenate((pixels, np.full((pixels.shape[0], pixels.shape[1], 1), 255, dtype=np.uint8)), axis=2)
-            return
         
         orig_alpha = pixels[:, :, 3]
         pixels[:, :, 3] = alpha * (orig_alpha / 255)
         #Logger.log_on_screen(GDConstants.term, f"[TextureManager/set_transparency] Set a={alpha}.")
         return pixels
     
-    def get_base_texture(object: "LevelObject | AbstractLevelObject", hide_invis: bool = False) -> np.ndarray:
+    def get_base_texture(object: "LevelObject | AbstractLevelObject", hide_invis: bool = False, writable: bool = False) -> np.ndarray:
         """ 
         Returns the base texture (no options like rotations, reflections, colorization applied)
-        for a given LevelObject | AbstractLevelObject. If hide_invis is True, returns a blank texture if the object is invisible. """
+        for a given LevelObject | AbstractLevelObject. If hide_invis is True, returns a blank texture if the object is invisible.
+        
+        The returned texture is shared and read-only, unless `writable` is True (then it's a copy). """
         if TextureManager.base_textures.get(object.type) is None:
             raise ValueError(f"Base texture for object {object.type} not found.")
         
         if hide_invis and object.data.get("invisible", False):
-            return np.zeros((1, 1, 4), dtype=np.uint8)
+            texture = TextureManager.empty_texture
         else:    
-            return TextureManager.base_textures[object.type].copy()
+            texture = TextureManager.base_textures[object.type]
+            
+        return texture.copy() if writable else texture
     
-    def get_transformed_texture(level: "Level", object: "LevelObject | AbstractLevelObject", hide_invis: bool = False) -> np.ndarray:
+    def get_transformed_texture(level: "Level", object: "LevelObject | AbstractLevelObject", hide_invis: bool = False, writable: bool = False) -> np.ndarray:
         """
         Given a `LevelObject` or `AbstractLevelObject`, attempts to search & return its specific texture in the cache.
         If not found, calculates the transformed texture of the object,
         with the correct rotation, reflection, and color (based on the object's color channel
         and what that color channel is currently set to in the `Level` object.
         
-        Saves to texture cache. Returns the texture.
+        Saves to texture cache. Returns the texture, which is shared and read-only unless `writable` is True (then it's a copy).
         """
         
         if hide_invis and object.data.get("invisible"):
-            return np.zeros((1, 1, 4), dtype=np.uint8)
+            texture = TextureManager.empty_texture
         
-        # if object is trigger (cant be rotated/reflected) return ase
-        if object.type == "color_trigger": # TODO - this is very hacky
-            return TextureManager.get_base_texture(object).copy()
+        # if object is trigger (cant be rotated/reflected) return base
+        elif object.type == "color_trigger": # TODO - this is very hacky
+            texture = TextureManager.get_base_texture(object)
         
-        # search in cache
-        transformed_key = TextureManager.get_transformed_key(level, object)
-        cached = TextureManager.texture_cache.get(transformed_key)
+        else:
+            # search in cache
+            transformed_key = TextureManager.get_transformed_key(level, object)
+            texture = TextureManager.texture_cache.get(transformed_key)
+            
+            if texture is None: 
+                # drop the textures of old colors first, so e.g. a fade replaces its textures instead of piling them up
+                TextureManager.evict_changed_channels()
+                
+                # else, construct texture, save to cache, and return it
+                texture = TextureManager.transform_texture(level, object)
+                TextureManager.texture_cache.put(transformed_key, texture)
+                TextureManager.register_channel_texture(level, object, transformed_key)
+                #Logger.log(f"[TextureManager/get_transformed_texture] Saved new texture to cache: key={transformed_key}")
         
-        if cached is not None: 
-            #Logger.log(f"[TextureManager/get_transformed_texture] Cache hit! key={transformed_key}, object={object}")
-            return cached.copy()
+        return texture.copy() if writable else texture
+    
+    def register_channel_texture(level: "Level", object: "LevelObject | AbstractLevelObject", transformed_key: tuple) -> None:
+        """ Remembers which channels (and which versions of them) a newly cached texture was colored with """
+        
+        level_textures = TextureManager.channel_textures.get(level)
+        if level_textures is None:
+            level_textures = TextureManager.channel_textures[level] = {}
+            # only the level itself holds on to this, so it doesn't keep the level alive
+            level.color_channel_listeners.append(lambda id: TextureManager.queue_changed_channel(level, id))
+        
+        # textures the LRU dropped on its own are still listed, so clean those up once in a while
+        if len(TextureManager.texture_channels) > 2 * TextureManager.texture_cache.max_size:
+            for key in [key for key in TextureManager.texture_channels if key not in TextureManager.texture_cache.entries]:
+                TextureManager.unregister_channel_texture(key)
+        
+        channels = tuple(channel for channel in (object.color1_channel, object.color2_channel) if channel is not None)
+        for channel in channels:
+            level_textures.setdefault(channel, {})[transformed_key] = level.color_channel_versions.get(channel, 0)
+        if channels:
+            TextureManager.texture_channels[transformed_key] = channels
+    
+    def unregister_channel_texture(transformed_key: tuple) -> None:
+        channels = TextureManager.texture_channels.pop(transformed_key, ())
+        for level_textures in TextureManager.channel_textures.values():
+            for channel in channels:
+                level_textures.get(channel, {}).pop(transformed_key, None)
+    
+    def queue_changed_channel(level: "Level", id: "Literal['bg', 'grnd'] | int | None") -> None:
+        """ Listener for `Level.set_color_channel` (can be called from any thread): queues the channel for `evict_changed_channels` """
+        with TextureManager.changed_channels_lock:
+            TextureManager.changed_channels.setdefault(level, set()).add(id)
+    
+    def evict_changed_channels() -> None:
+        """ Runs `evict_stale_textures` for every channel queued since the last call. Call from the thread that renders. """
+        with TextureManager.changed_channels_lock:
+            if len(TextureManager.changed_channels) == 0:
+                return
+            changed_channels = list(TextureManager.changed_channels.items())
+            TextureManager.changed_channels.clear()
+        
+        for level, ids in changed_channels:
+            for id in ([None] if None in ids else ids):
+                TextureManager.evict_stale_textures(level, id)
+    
+    def evict_stale_textures(level: "Level", id: "Literal['bg', 'grnd'] | int | None") -> None:
+        """ Drops the cached textures that were colored with an older version of one of `level`'s channels
+        (None = check every channel), so e.g. the in-between colors of a fade don't pile up in the cache. """
+        
+        level_textures = TextureManager.channel_textures.get(level, {})
+        channels = list(level_textures) if id is None else [id]
+        for channel in channels:
+            textures = level_textures.get(channel)
+            if not textures:
+                continue
+            
+            version = level.color_channel_versions.get(channel, 0)
+            for transformed_key in [key for key, built_version in textures.items() if built_version != version]:
+                TextureManager.unregister_channel_texture(transformed_key)
+                TextureManager.texture_cache.entries.pop(transformed_key, None)
+    
+    def transform_texture(level: "Level", object: "LevelObject | AbstractLevelObject") -> np.ndarray:
+        """ Builds an object's transformed texture from its base texture (uncached - see `get_transformed_texture`).
+        Returns it as a read-only uint8 array. """
         
-        # else, construct texture, save to cache, and return it
-        # get base texture
         base_texture = TextureManager.get_base_texture(object)
         
-        #if isinstance(object, AbstractLevelObject):
-        #    return base_texture.copy()
-        
         # apply all the stuff
         transformed_texture = TextureManager.reflect_texture(base_texture, object.reflection)
         transformed_texture = TextureManager.rotate_texture(transformed_texture, object.rotation)
         transformed_texture = TextureManager.colorize_texture(transformed_texture, *level.get_colors_of(object))
         
-        TextureManager.texture_cache[transformed_key] = transformed_texture
-        #Logger.log(f"[TextureManager/get_transformed_texture] Saved new texture to cache: key={transformed_key}")
-        return transformed_texture.copy()
+        # colorize_texture gives floats - drawing truncates them anyway, so store the uint8 version
+        transformed_texture = np.ascontiguousarray(transformed_texture, dtype=np.uint8)
+        transformed_texture.flags.writeable = False
+        return transformed_texture
     
-    def get_transformed_key(level: "Level", object: "LevelObject | AbstractLevelObject") -> str:
+    def get_transformed_key(level: "Level", object: "LevelObject | AbstractLevelObject") -> tuple:
         """
-        Returns the "name" (key) that this object would have in the texture cache. 
+        Returns the key that this object would have in the texture cache. 
         
         Format: 
-        `{object name}_{rotation}_{reflection}_{color1|None}_{color2|None}`
+        `(object texture key, color1 | None, color2 | None)`, where the object texture key is an int
+        that stands for its type/rotation/reflection/color channels (see `LevelObject.get_texture_key`).
         
         Level object is required as this function checks for the current
         color of the color channels that `object` is assigned to.
         """
         
-        curr_color1, curr_color2 = level.get_colors_of(object)
-        return f"{object.type}_{object.rotation}_{object.reflection}_{curr_color1}_{curr_color2}"
+        return (object.get_texture_key(), *level.get_colors_of(object))
     
     def get_curr_player_icon(player: "Player") -> np.ndarray:
         """ Returns the current player icon based on the player's current rotation. """
         # if gravity reverse, flip vertically
-        texture_base = TextureManager.player_icons[player.gamemode][player.get_animation_frame_index()]
-        if player.gravity < 0:
-            return np.flipud(texture_base)
-        else:
-            return texture_base
+        icons = TextureManager.player_icons_flipped if player.gravity < 0 else TextureManager.player_icons
+        return icons[player.gamemode][player.get_animation_frame_index()]
     
     def get_curr_ground_texture(level: "Level", player_x: float) -> np.ndarray:
-        """ Returns current ground texture, recolored and offset based on the player's position and level colors. """
+        """ Returns current ground texture, recolored and offset based on the player's position and level colors.
+        The result is cached and read-only (see `ground_texture_cache`), so don't modify it. """
         
-        ground_offset = round(player_x*CameraConstants.BLOCK_WIDTH)%CameraConstants.GROUND_TEXTURE_PERIOD
-        
-        # ground texture cache system, disabled cuz it wasnt working and not using a cache is fine cuz its numpy...
-        #Logger.log(f"player dist from start={player.get_dist_from_start()}: offset={ground_offset}")
-        
-        #ground_color = tuple(level.ground_color)
-        
-        # try to find in cache
-        #cached_list = TextureManager.ground_texture_cache.get(ground_color)
-        #if cached_list is None:
-        #    TextureManager.ground_texture_cache[ground_color] = [] # init cache list
-        #else: # cache list exists, but index might not
-        #    if ground_offset < len(cached_list):
-        #        # cache hit!
-        #        Logger.log(f"ground offset: {ground_offset}, len: {len(cached_list)}")
-        #        return cached_list[ground_offset].copy()
-            
-        # not found in cache, calculate and save
-        
-        recolored_ground = TextureManager.colorize_texture(TextureManager.base_textures["ground"].copy(), level.ground_color, None)
-    
         # the ground texture is periodic with period CameraConstants.GROUND_TEXTURE_PERIOD px. 
         # calculate player position in px, mod ^^, and offset the texture by that amount
-        recolored_ground = np.roll(recolored_ground, -ground_offset, axis=1)
-        #TextureManager.ground_texture_cache[ground_color].append(recolored_ground)
+        ground_offset = round(player_x*CameraConstants.BLOCK_WIDTH)%CameraConstants.GROUND_TEXTURE_PERIOD
         
-        return recolored_ground
+        ground_color = tuple(level.ground_color)
+        cached = TextureManager.ground_texture_cache
+        if cached is None or cached[0] != ground_color:
+            recolored_ground = TextureManager.colorize_texture(TextureManager.base_textures["ground"].copy(), ground_color, None)
+            strip = np.concatenate((recolored_ground, recolored_ground[:, :CameraConstants.GROUND_TEXTURE_PERIOD]), axis=1)
+            TextureManager.ground_texture_cache = cached = (ground_color, strip, [None] * CameraConstants.GROUND_TEXTURE_PERIOD)
+        
+        texture = cached[2][ground_offset]
+        if texture is None:
+            # slicing [offset : offset + width] out of the strip gives the same thing as rolling the texture left by offset.
+            # copied out (and read-only), so it's the same array every time and compositing only has to prepare it once
+            width = TextureManager.base_textures["ground"].shape[1]
+            texture = cached[1][:, ground_offset:ground_offset+width].copy()
+            texture.flags.writeable = False
+            cached[2][ground_offset] = texture
+        return texture
     
 ####### preload all objects' base textures
 for object_name in OBJECTS.MASTERLIST:
@@ -396,4 +505,12 @@ TextureManager.player_icons['wave'] = [
         TextureManager.player_color2,
         convert_red_to_black=True
     ) for i in range(3)
-]
\ No newline at end of file
+]
+
+for gamemode, icons in TextureManager.player_icons.items():
+    TextureManager.player_icons_flipped[gamemode] = [np.ascontiguousarray(np.flipud(icon)) for icon in icons]
+    for icon in TextureManager.player_icons_flipped[gamemode]:
+        icon.flags.writeable = False
+
+# write any textures that had to be built (textures compiled later on, e.g. by the menus, get saved on exit - see main.py)
+CompiledTextureCache.save()
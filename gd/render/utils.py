@@ -3,9 +3,9 @@ from logger import Logger
 import re
 import os
 import numpy as np
-from skimage.draw import line, disk
 from gd_constants import GDConstants
 from draw_utils import print3
+from render.escape_cache import EscapeCache
 
 if TYPE_CHECKING:
     from render.constants import CameraConstants
@@ -82,16 +82,10 @@ def fcode_opt(fg: Tuple[int, int, int] = None, bg: Tuple[int, int, int] = None)
     - no letter styling (bold, italic, etc.)
     - no predefined color names
     Mainly used for drawing block elements (pixels) in the terminal.
-    '''
-    
-    format_str = ''
     
-    if fg is not None:
-        format_str += '\033[38;2;{};{};{}m'.format(*fg)
-    if bg is not None:
-        format_str += '\033[48;2;{};{};{}m'.format(*bg)
-        
-    return format_str
+    Results are cached by packed color in the shared `EscapeCache`, so repeated colors skip the formatting.
+    '''
+    return EscapeCache.get_str(fg, bg)
 
 def mix_colors(color1: Union[str, tuple], color2: Union[str, tuple], amount: float) -> str:
     """
@@ -213,6 +207,9 @@ def draw_line(image: np.ndarray, pos1: tuple, pos2: tuple, color: "CameraConstan
     modifies `image` in place, does not return anything.
     """
     
+    # imported here since skimage is slow to import and this is the only thing that needs it
+    from skimage.draw import line, disk
+    
     x1, y1 = pos1
     x2, y2 = pos2
     
@@ -327,17 +324,47 @@ def nearest_quarter(x: float) -> float:
     """
     return round(x * 4) / 4
 
+def pack_pixels(pixels: np.ndarray) -> np.ndarray:
+    """
+    Packs an (..., 3) uint8 array of rgb pixels into an (...) uint32 array, one int per pixel (0x00RRGGBB).
+    Two pixels are the same color iff their packed values are equal, so diffs dont need an np.any over the channels.
+    """
+    pixels = pixels.astype(np.uint32)
+    return (pixels[..., 0] << 16) | (pixels[..., 1] << 8) | pixels[..., 2]
+
+def pack_cells(pixels: np.ndarray) -> np.ndarray:
+    """
+    Packs an (H, W, 3) uint8 frame (H even) into an (H//2, W) uint64 array, one int per terminal cell (▀).
+    The top pixel (fg) is stored in bits 24-47 and the bottom pixel (bg) in bits 0-23.
+    """
+    packed = pack_pixels(pixels).astype(np.uint64)
+    return (packed[0::2] << 24) | packed[1::2]
+
+def unpack_cell(cell: int) -> Tuple[Tuple[int, int, int], Tuple[int, int, int]]:
+    """ Inverse of `pack_cells` for a single cell. Returns (fg, bg) rgb tuples. """
+    return (
+        ((cell >> 40) & 255, (cell >> 32) & 255, (cell >> 24) & 255),
+        ((cell >> 16) & 255, (cell >> 8) & 255, cell & 255)
+    )
+
+def _color_differences(arr1: np.ndarray, arr2: np.ndarray) -> np.ndarray:
+    """ Elementwise "is this color different" for either rgb rows (2d) or packed rows (1d, see `pack_pixels`/`pack_cells`) """
+    if arr1.ndim == 1:
+        return arr1 != arr2
+    return np.any(arr1 != arr2, axis=1)
+
 def first_diff_color(arr1: np.ndarray, arr2: np.ndarray) -> int | None:
     """
     Returns the index of the first different color in the two arrays. If exactly the same, returns None.
-    Both arrays must be 2d numpy arrays, with the 2d axis being 4 long (r,g,b,a)
+    Both arrays must be 2d numpy arrays, with the 2d axis being 4 long (r,g,b,a),
+    or 1d packed rows (see `pack_pixels`/`pack_cells`)
     
     For example:
     
     `first_diff_color([[1, 2], [3, 6], [4, 200]], [[1, 2], [3, 9], [4, 202]]) -> 1`
     (both i=2 and i=3 are different, but returns 1 since the second pixel is the first different one)
     """
-    differences = np.any(arr1 != arr2, axis=1)
+    differences = _color_differences(arr1, arr2)
     #Logger.log(f"first diff: arr1 first 10 elements: {arr1[:10]}, arr2 first 10 elements: {arr2[:10]}" )
     first_diff = np.argmax(differences)
     
@@ -350,14 +377,15 @@ def first_diff_color(arr1: np.ndarray, arr2: np.ndarray) -> int | None:
 def last_diff_color(arr1: np.ndarray, arr2: np.ndarray) -> int | None:
     """
     Returns the index of the last different color in the two arrays. If exactly the same, returns None.
-    Both arrays must be 2d numpy arrays, with the 2d axis being 4 long (r,g,b,a)
+    Both arrays must be 2d numpy arrays, with the 2d axis being 4 long (r,g,b,a),
+    or 1d packed rows (see `pack_pixels`/`pack_cells`)
     
     For example:
     
     `last_diff_color([[1, 2], [3, 6], [4, 200]], [[1, 9], [3, 9], [4, 200]]) -> 1`
     (both i=0 and i=1 are different, but returns 1 since the second pixel is the last different one)
     """
-    differences = np.any(arr1 != arr2, axis=1)
+    differences = _color_differences(arr1, arr2)
     last_diff = len(differences) - np.argmax(differences[::-1]) - 1
     
     # if flat index is last, investigate: it could be that all are the same, or that the first element is actually different
@@ -400,9 +428,11 @@ def get_diff_intervals(arr1: np.ndarray, arr2: np.ndarray) -> Tuple[np.ndarray,
     of ndarrays (starts, ends) that represent the intervals on which the original arrays are different.
 
     (the intervals are go from start -> end-1, inclusive.)
+    
+    Rows can be either rgb (2d) or packed (1d, see `pack_pixels`/`pack_cells`)
     """
 
-    diffs = np.any(arr1 != arr2, axis=1).astype(int)
+    diffs = _color_differences(arr1, arr2).astype(int)
     
     changes = np.diff(diffs, prepend=0, append=0)
     starts = np.where(changes == 1)[0]
@@ -0,0 +1,169 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from importlib import import_module
+from time import perf_counter_ns
+from typing import Callable, Dict, List, Tuple
+import threading
+import sys
+
+from logger import Logger
+
+class Startup:
+    """
+    Gets the game to the main menu as fast as possible. Static, like `Logger`.
+
+    Only what the main menu needs is imported up front. Everything else (the other menus, the editor, the game,
+    and with them most of the textures, fonts and pygame's mixer) gets loaded by a background thread pool while the
+    main menu is up and waiting for input (see `begin_preloading`). Code that needs one of those things before
+    it's done (e.g. `MenuHandler.get_menu`) just imports it as usual - the import waits for the preloader to finish it.
+
+    `python main.py --profile-startup` also times every import (see `begin_profiling`) and writes a breakdown
+    to `latest_startup_profile.txt` at exit.
+    """
+
+    PRELOAD_TASKS: Dict[str, List[str]] = {
+        "audio": ["audio:init_mixer"],
+        "menus": [
+            "menus.official_levels_menu", "menus.custom_levels_menu", "menus.create_level_menu",
+            "menus.created_levels_menu", "menus.online_levels_menu",
+        ],
+        "game": ["game", "editor.level_editor", "skimage.draw"],
+    }
+    """
+    task name -> what it loads, in order. Entries are module names, or `module:function` to call a function of the module.
+    Each task runs on its own worker. Tasks can share modules, but there mustn't be any circular imports between them
+    (two threads importing modules that import each other can deadlock on the import locks).
+    """
+
+    PROFILE_FILEPATH = "latest_startup_profile.txt"
+
+    start_ns = perf_counter_ns()
+    """ When this module was imported, which is about when the game started (main.py imports it first) """
+
+    milestones: List[Tuple[str, int]] = []
+    """ (name, ns since `start_ns`) of the startup milestones reached so far (see `mark`) """
+
+    tasks: Dict[str, Future] = {}
+    """ task name -> its future, once `begin_preloading` was called """
+
+    import_times: List[Tuple[int, int, int, str]] | None = None
+    """ (depth, self ns, cumulative ns, module name) of every import since `begin_profiling`, in the order they finished.
+    None if not profiling. """
+
+    _milestones_lock = threading.Lock()
+
+    def mark(name: str) -> None:
+        """ Records that a startup milestone was reached (e.g. "first menu drawn") """
+        with Startup._milestones_lock:
+            Startup.milestones.append((name, perf_counter_ns() - Startup.start_ns))
+
+    def begin_preloading() -> None:
+        """ Starts loading everything in `PRELOAD_TASKS` in the background. Doesn't block. """
+
+        pool = ThreadPoolExecutor(max_workers=len(Startup.PRELOAD_TASKS), thread_name_prefix="preload")
+        for name, targets in Startup.PRELOAD_TASKS.items():
+            Startup.tasks[name] = pool.submit(Startup._run_task, name, targets)
+        pool.shutdown(wait=False) # the workers still finish their tasks, this just doesn't accept new ones
+
+    def _run_task(name: str, targets: List[str]) -> None:
+        try:
+            for target in targets:
+                module_name, _, function_name = target.partition(":")
+                module = import_module(module_name)
+                if function_name:
+                    getattr(module, function_name)()
+        except Exception as e:
+            # whatever failed gets loaded again (and raises properly) on the main thread when it's actually needed
+            Logger.log(f"[Startup/_run_task]: preloading {name} failed ({e!r})")
+            raise
+        finally:
+            Startup.mark(f"preloaded {name}")
+
+    def wait_for(name: str) -> None:
+        """ Blocks until a preload task is done (no-op if preloading wasn't started). Doesn't raise if the task failed. """
+        task = Startup.tasks.get(name)
+        if task is not None:
+            task.exception()
+
+    def wait_for_all() -> None:
+        """ Blocks until every preload task is done, e.g. before exiting (see main.py) """
+        for name in Startup.tasks:
+            Startup.wait_for(name)
+
+    def begin_profiling() -> None:
+        """ Starts timing every module import. Call as early as possible, only imports after this are seen. """
+        if Startup.import_times is None:
+            Startup.import_times = []
+            sys.meta_path.insert(0, _ImportTimer())
+
+    def write_profile() -> None:
+        """ Writes the milestones and the import times to `PROFILE_FILEPATH`. Only does anything if profiling. """
+
+        if Startup.import_times is None:
+            return
+
+        # let the preloader finish, so its imports are in the profile too
+        Startup.wait_for_all()
+
+        lines = ["startup milestones (ms since start):"]
+        lines.extend(f"{ms / 1e6:10.1f}  {name}" for name, ms in Startup.milestones)
+
+        slowest = sorted(Startup.import_times, key=lambda entry: entry[1], reverse=True)[:20]
+        lines.append("")
+        lines.append("slowest imports (self time, ms):")
+        lines.extend(f"{self_ns / 1e6:10.1f}  {module}" for _, self_ns, _, module in slowest)
+
+        # same format as python -X importtime
+        lines.append("")
+        lines.append("import time: self [us] | cumulative | imported package")
+        lines.extend(
+            f"import time: {self_ns // 1000:>9} | {cumulative_ns // 1000:>10} | {'  ' * depth}{module}"
+            for depth, self_ns, cumulative_ns, module in Startup.import_times
+        )
+
+        with open(Startup.PROFILE_FILEPATH, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        print(f"\x1b[0mWrote startup profile ({len(Startup.import_times)} imports) to {Startup.PROFILE_FILEPATH}.")
+
+class _ImportTimer:
+    """
+    Meta path finder that times how long each module takes to execute, for `Startup.begin_profiling`.
+    Finds modules with the finders after it, and wraps the `exec_module` of the loader it gets back.
+    Only per-module loader objects get wrapped (not e.g. the builtin importer, which is shared by every builtin module).
+    """
+
+    def __init__(self) -> None:
+        self.stacks = threading.local()
+        """ Per thread: list of [child ns] for the imports currently running on that thread """
+
+    def find_spec(self, name: str, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(name, path, target)
+            if spec is not None:
+                break
+        else:
+            return None
+
+        loader = spec.loader
+        if loader is not None and not isinstance(loader, type) and hasattr(loader, "exec_module"):
+            loader.exec_module = self._get_timed_exec_module(name, loader.exec_module)
+        return spec
+
+    def _get_timed_exec_module(self, name: str, exec_module: Callable) -> Callable:
+        def timed_exec_module(module) -> None:
+            stack = getattr(self.stacks, "stack", None)
+            if stack is None:
+                stack = self.stacks.stack = []
+
+            stack.append([0])
+            start_ns = perf_counter_ns()
+            try:
+                exec_module(module)
+            finally:
+                cumulative_ns = perf_counter_ns() - start_ns
+                child_ns = stack.pop()[0]
+                if stack:
+                    stack[-1][0] += cumulative_ns
+                Startup.import_times.append((len(stack), cumulative_ns - child_ns, cumulative_ns, name))
+        return timed_exec_module